@@ -8,8 +8,18 @@
 
 """
 
+import argparse
 import math
-import pygame
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from differential_drive.export import Exporter
+from differential_drive.profiler import Profiler, instrument, save, timed
+from differential_drive.recorder import Recorder
+from differential_drive.telemetry import TelemetryServer, address
+from differential_drive.robot import ManualRobot
 
 # delta t
 dt = 0.005
@@ -19,190 +29,158 @@ dt = 0.005
 map_width = 1400
 map_height = 750
 
+# trail length (points)
+trail_length = 1250
+
 # === ROBOT PROPERTIES (INITIAL VALUES) ===
 # robot initial pose
 start_x = 200
 start_y = 600
 start_theta = math.pi / 4
 
+# robot image (relative to the script directory)
+images_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'images')
+robot_img = os.path.join(images_dir, "differential_drive_robot.png")
+
+
+def control(robot, event):  # keypad commands for the wheel velocities
+    import pygame
+
+    if event.type == pygame.KEYDOWN:
+        if event.key == pygame.K_KP4:
+            robot.increment_left()
+        elif event.key == pygame.K_KP1:
+            robot.decrement_left()
+        elif event.key == pygame.K_KP6:
+            robot.increment_right()
+        elif event.key == pygame.K_KP3:
+            robot.decrement_right()
+        elif event.key == pygame.K_KP8:
+            robot.increment_both()
+        elif event.key == pygame.K_KP2:
+            robot.stop()
+        elif event.key == pygame.K_KP5:
+            robot.equalize()
+
+
+def info(robot, width, height):  # robot information displayed on the screen
+    return [(f"Vl = {round(robot.vl, 2)}", (width - 200, height - 150)),
+            (f"Vr = {round(robot.vr, 2)}", (width - 200, height - 100)),
+            (f"theta = {round(math.degrees(robot.theta), 2)}", (width - 200, height - 50))]
+
+
+def run_headless(steps, vl=0, vr=0, record=None, telemetry=None, export=None):
+    # simulation without a window, wheel velocities are fixed
+    robot = ManualRobot(start_x, start_y, start_theta, dt)
+    robot.vl = vl
+    robot.vr = vr
+    recorder = Recorder(record) if record is not None else None
+
+    for i in range(steps):
+        robot.step()
+        if recorder is not None:
+            recorder.record_robot(i * dt, robot)
+        if telemetry is not None:
+            telemetry.publish(i * dt, robot)
+        if export is not None:
+            export.publish(i * dt, robot)
+
+    if recorder is not None:
+        recorder.close()
+
+    return robot
+
+
+def main(profiler=None, dirty=False):
+    import pygame
+    from differential_drive.render import Environment, Sprite, Trail
 
-class Environment:
-    def __init__(self, window_width, window_height):
-        # colors
-        self.black = (0, 0, 0)
-        self.white = (255, 255, 255)
-        self.green = (0, 255, 0)
-
-        # window (map) dimensions
-        self.width = window_width
-        self.height = window_height
-
-        # window settings
-        pygame.display.set_caption('Differential Drive Robot')
-        self.map = pygame.display.set_mode((self.width, self.height))
-
-        # text variables
-        self.font = pygame.font.Font('freesansbold.ttf', 30)
-        self.text = self.font.render('default', True, self.white, self.black)
-        self.textRect = self.text.get_rect()
-
-        # trail
-        self.trail_set = []   
-
-    def trail(self, pose_x, pose_y):
-        for i in range(0, len(self.trail_set) - 1):
-            pygame.draw.line(self.map, self.green, (self.trail_set[i][0], self.trail_set[i][1]),
-                             (self.trail_set[i + 1][0], self.trail_set[i + 1][1]))
-        if self.trail_set.__sizeof__() > 10000:
-            self.trail_set.pop(0)
-        self.trail_set.append((pose_x, pose_y))    
-
-    def write_info(self, Vl, Vr, theta):
-        txt = f"Vl = {round(Vl, 2)}"
-        self.text = self.font.render(txt, True, self.white, self.black)
-        self.textRect.center = (self.width - 200, self.height - 150)
-        self.map.blit(self.text, self.textRect)
-
-        txt = f"Vr = {round(Vr, 2)}"
-        self.text = self.font.render(txt, True, self.white, self.black)
-        self.textRect.center = (self.width - 200, self.height - 100)
-        self.map.blit(self.text, self.textRect)
-
-        txt = f"theta = {round(math.degrees(theta), 2)}"
-        self.text = self.font.render(txt, True, self.white, self.black)
-        self.textRect.center = (self.width - 200, self.height - 50)
-        self.map.blit(self.text, self.textRect)
-
-
-class Robot:
-    def __init__(self, robot_x, robot_y, robot_theta, robotImg, robotWidth=0.03):
-        # meter -> pixel transform
-        self.meter_to_pixel = 3779.52
-
-        # robot data
-        self.x = robot_x
-        self.y = robot_y
-        self.theta = robot_theta
-        self.width = robotWidth * self.meter_to_pixel
-        self.vr = 0
-        self.vl = 0
-        self.w_velocity = 0
-        self.v_velocity = 0
-
-        # differential drive behaviour (Instantaneous Center of Curvature - ICC) data
-        self.ICCx = 0
-        self.ICCy = 0
-        self.r_distance = 0
-
-        # robot graphics
-        self.img = pygame.image.load(robotImg)
-        self.rotated = self.img
-        self.rect = self.rotated.get_rect(center=(self.x, self.y))       
-
-    def draw(self, map):
-        map.blit(self.rotated, self.rect)       
-
-    def calc_v_velocity(self):
-        self.v_velocity = (self.vr + self.vl) / 2        
-
-    def calc_w_velocity(self):
-        self.w_velocity = (self.vr - self.vl) / self.width        
-
-    def calc_r_distance(self):  # calculate distance to ICC
-        self.r_distance = ((self.width / 2) * ((self.vr + self.vl) / (self.vr - self.vl)))
-
-    def calc_icc(self):  # calculate ICC point
-        self.ICCx = self.x + (self.r_distance * math.sin(self.theta))
-        self.ICCy = self.y + (self.r_distance * math.cos(self.theta))        
-        
-    def move(self, event=None):  # robot move function
-        if event is not None:
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_KP4:
-                    self.vl += 0.001 * self.meter_to_pixel
-                elif event.key == pygame.K_KP1:
-                    self.vl -= 0.001 * self.meter_to_pixel
-                elif event.key == pygame.K_KP6:
-                    self.vr += 0.001 * self.meter_to_pixel
-                elif event.key == pygame.K_KP3:
-                    self.vr -= 0.001 * self.meter_to_pixel
-                elif event.key == pygame.K_KP8:
-                    self.vr += 0.001 * self.meter_to_pixel
-                    self.vl += 0.001 * self.meter_to_pixel
-                elif event.key == pygame.K_KP2:
-                    self.vr = 0
-                    self.vl = 0
-                elif event.key == pygame.K_KP5:
-                    if self.vr < self.vl:
-                        self.vl = self.vr
-                    else:
-                        self.vr = self.vl
-
-        self.calc_w_velocity()
-        self.calc_v_velocity()
-
-        # robot pose update (differential drive behaviour)
-        if self.vl == self.vr:
-            self.x += self.v_velocity * math.cos(self.theta) * dt
-            self.y -= self.v_velocity * math.sin(self.theta) * dt
-            self.theta += self.w_velocity * dt
-
-            # reset theta
-            if self.theta > 2 * math.pi or self.theta < -2 * math.pi:
-                self.theta = 0
-
-        elif self.vl != self.vr:
-            self.calc_icc()
-            self.calc_r_distance()
-
-            # rotation matrix (pose update)
-            self.x = (math.cos(self.w_velocity * dt) * (self.x - self.ICCx)) - (math.sin(self.w_velocity * dt) * (self.y - self.ICCy)) + self.ICCx
-            self.y = (math.sin(self.w_velocity * dt) * (self.x - self.ICCx)) + (math.cos(self.w_velocity * dt) * (self.y - self.ICCy)) + self.ICCy
-            self.theta = self.theta + (self.w_velocity * dt)
-
-            # reset theta
-            if self.theta > 2 * math.pi or self.theta < -2 * math.pi:
-                self.theta = 0
-
-        # show moving of robot
-        self.rotated = pygame.transform.rotozoom(self.img, math.degrees(self.theta), 1)
-        self.rect = self.rotated.get_rect(center=(self.x, self.y))
-
-
-def main():
     pygame.init()
 
     # environment object
-    environment = Environment(map_width, map_height)
+    environment = Environment(map_width, map_height, dirty=dirty)
+    trail = Trail(environment.width, environment.height, environment.green, trail_length)
 
     # robot object
-    robot = Robot(start_x, start_y, start_theta,
-                  r"C:/Users/AbdullahDangac/Differential-Drive-Robot-Simulations/Differential_Drive_Robot_Simulator/images/differential_drive_robot.png")
+    robot = ManualRobot(start_x, start_y, start_theta, dt)
+    sprite = Sprite(robot_img)
+
+    # profiling hooks (the loop calls the original functions without a profiler)
+    get_events = timed(profiler, 'events', pygame.event.get)
+    instrument(profiler, robot, 'controller', 'calc_v_velocity', 'calc_w_velocity', 'calc_r_distance', 'calc_icc')
+    instrument(profiler, robot, 'integration', 'integrator')
+    instrument(profiler, sprite, 'sprite', 'update')
+    instrument(profiler, environment, 'trail', 'trail')
+    instrument(profiler, environment, 'hud', 'write_info')
+    instrument(profiler, environment, 'display', 'update_display')
 
     # simulation loop
     loop = True
     while loop:
-        for event in pygame.event.get():
+        for event in get_events():
             if event.type == pygame.QUIT:
                 loop = False
-            robot.move(event)
-
-        pygame.display.update()
-        environment.map.fill(environment.black)
+            control(robot, event)
 
-        robot.move()
-        robot.draw(environment.map)
+        environment.update_display()
+        environment.clear()
 
-        # for robot information displayed on the screen
-        if robot.theta < 0:
-            robot.theta = 2 * math.pi + robot.theta
+        robot.step()
+        sprite.update(robot.x, robot.y, robot.theta)
+        environment.draw(sprite)
 
-        environment.write_info(robot.vl, robot.vr, robot.theta)
-        environment.trail(robot.x, robot.y)
+        environment.write_info(info(robot, environment.width, environment.height))
+        environment.trail(robot.x, robot.y, trail)
+        if profiler is not None:
+            environment.write_overlay(profiler.overlay())
 
 
 if __name__ == '__main__':
-    try:
-        main()
-    except RuntimeError:
-        pass
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Differential Drive Robot Simulation')
+    parser.add_argument('--headless', action='store_true', help='run without a window')
+    parser.add_argument('--steps', type=int, default=10000, help='number of steps in headless mode')
+    parser.add_argument('--record', default=None, help='trajectory log file of the headless run')
+    parser.add_argument('--vl', type=float, default=0, help='left wheel velocity in headless mode')
+    parser.add_argument('--vr', type=float, default=0, help='right wheel velocity in headless mode')
+    parser.add_argument('--telemetry', default=None, metavar='ADDRESS',
+                        help='publish telemetry of the headless run (port, host:port or Unix socket path)')
+    parser.add_argument('--telemetry-every', type=int, default=10, help='steps per telemetry record')
+    parser.add_argument('--telemetry-wait', type=int, default=0, help='subscribers to wait for before the run starts')
+    parser.add_argument('--export', default=None, metavar='PATH',
+                        help='export frames of the headless run (PNG directory, or .rgb raw video stream)')
+    parser.add_argument('--export-fps', type=float, default=60, help='exported frames per second of simulation time')
+    parser.add_argument('--dirty', action='store_true', help='update only the changed regions of the window')
+    parser.add_argument('--profile', action='store_true', help='time the loop phases (on-screen overlay)')
+    parser.add_argument('--profile-json', default=None, help='save the phase timings as json at exit')
+    parser.add_argument('--profile-trace', default=None, help='save the phase timings as a chrome trace at exit')
+    parser.add_argument('--trail-length', type=int, default=trail_length, help='trail length in points')
+    args = parser.parse_args()
+    trail_length = args.trail_length
+    if args.headless and (args.profile or args.profile_json or args.profile_trace):
+        parser.error('--profile, --profile-json and --profile-trace time the window loop, not --headless runs')
+    profiler = None
+    if args.profile or args.profile_json or args.profile_trace:
+        profiler = Profiler(trace=args.profile_trace is not None)
+
+    if args.headless:
+        telemetry = None
+        if args.telemetry is not None:
+            telemetry = TelemetryServer(every=args.telemetry_every, **address(args.telemetry)).start()
+            telemetry.wait(args.telemetry_wait)
+        export = None
+        if args.export is not None:
+            export = Exporter(args.export, args.export_fps, width=map_width, height=map_height, flip=False,
+                              trail_length=trail_length, robot_img=robot_img)
+        robot = run_headless(args.steps, args.vl, args.vr, args.record, telemetry, export)
+        if telemetry is not None:
+            telemetry.stop()
+        if export is not None:
+            print(f"{export.close()} frames written to {args.export}")
+        print(f"x = {robot.x}, y = {robot.y}, theta = {robot.theta}")
+    else:
+        try:
+            main(profiler, args.dirty)
+        except RuntimeError:
+            pass
+        finally:
+            save(profiler, args.profile_json, args.profile_trace)
@@ -8,9 +8,21 @@
 
 """
 
-import pygame
+import argparse
 import math
-import time
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from differential_drive.clock import MODES, SimulationClock, interpolate
+from differential_drive.export import Exporter
+from differential_drive.profiler import Profiler, instrument, save, timed
+from differential_drive.recorder import Recorder
+from differential_drive import snapshot
+from differential_drive.telemetry import TelemetryServer, address
+from differential_drive.robot import FollowTrajectoryRobot, Target, TrackingRobot
+from differential_drive.trajectory import TRACKERS, Trajectory
 
 # delta t
 dt = 0.01
@@ -20,6 +32,9 @@ dt = 0.01
 map_width = 1400
 map_height = 750
 
+# trail length (points)
+trail_length = 1250
+
 # === ROBOT PROPERTIES (INITIAL VALUES) ===
 # start position of the robot (pose)
 start_x = 300
@@ -35,243 +50,203 @@ Ki_v = 0.01  # I-Control gain for linear velocity
 Kd_v = 0.1  # D-Control gain for linear velocity
 Kp_w = 1  # P-Control gain for angular velocity
 
+# reference trajectory of the trackers (target path until it leaves the map)
+path_duration = (map_width - 300) / 50
+path_samples = 20000
+
+# robot and target images (relative to the script directory)
+images_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'images')
+robot_img = os.path.join(images_dir, "differential_drive_robot.png")
+target_img = os.path.join(images_dir, "target.png")
+
+
+def create_robot(tracker=None, path=None):  # PID target follower, or a lookahead tracker of the trajectory
+    if tracker is None:
+        return FollowTrajectoryRobot(start_x, start_y, start_theta, follow_distance, dt, Kp_v, Ki_v, Kd_v, Kp_w)
+
+    if path is None:
+        trajectory = Trajectory.from_function(Target.position, 0, path_duration, path_samples)
+    else:
+        trajectory = Trajectory.from_file(path)
+    return TrackingRobot(start_x, start_y, start_theta, TRACKERS[tracker](trajectory), dt)
+
+
+def step_robot(robot, target):
+    if isinstance(robot, TrackingRobot):
+        robot.step()
+    else:
+        robot.step((target.x, target.y))
+
+
+def info(robot, width, height):  # robot information displayed on the screen
+    if isinstance(robot, TrackingRobot):
+        distance = f"Cross Track = {round(robot.cross_track(), 2)}"
+    else:
+        distance = f"Follow Distance = {round(robot.follow_dist, 2)}"
+    return [(f"Vl = {round(robot.vl, 2)}", (width - 200, height - 200)),
+            (f"Vr = {round(robot.vr, 2)}", (width - 200, height - 150)),
+            (f"theta = {round(math.degrees(robot.theta), 2)}", (width - 200, height - 100)),
+            (distance, (width - 350, height - 50))]
+
+
+def run_headless(steps, record=None, tracker=None, path=None, telemetry=None, resume=None, checkpoint=None,
+                 export=None):
+    # simulation without a window, optionally continued from a snapshot file and saved to one at the end
+    robot = create_robot(tracker, path)
+    target = Target()
+    clock = SimulationClock(dt, 'max')
+    if resume is not None:
+        snapshot.restore(snapshot.read(resume), robot=robot, target=target, clock=clock)
+    recorder = Recorder(record) if record is not None else None
+
+    for _ in range(steps):
+        t = clock.tick()
+        target.move(t)
+        step_robot(robot, target)
+        if recorder is not None:
+            recorder.record_robot(t, robot)
+        if telemetry is not None:
+            telemetry.publish(t, robot)
+        if export is not None:
+            export.publish(t, robot)
+
+    if recorder is not None:
+        recorder.close()
+    if checkpoint is not None:
+        snapshot.save(checkpoint, snapshot.capture(robot=robot, target=target, clock=clock))
+
+    return robot, target
+
+
+def main(clock_mode='fixed', speed=1, fps=60, tracker=None, path=None, profiler=None, dirty=False):
+    import pygame
+    from differential_drive.render import Environment, Sprite, Trail
 
-class Environment:
-    def __init__(self, window_width, window_height):
-
-        # colors
-        self.black = (0, 0, 0)
-        self.white = (255, 255, 255)
-        self.green = (0, 255, 0)
-        self.red = (255, 0, 0)
-
-        # window (map) dimensions
-        self.width = window_width
-        self.height = window_height
-
-        # window settings
-        pygame.display.set_caption('Differential Drive Robot')
-        self.map = pygame.display.set_mode((self.width, self.height))
-
-        # text variables
-        self.font = pygame.font.Font('freesansbold.ttf', 30)
-        self.text = self.font.render('default', True, self.white, self.black)
-        self.textRect = self.text.get_rect()
-
-        # trails
-        self.trail_set_target = []
-        self.trail_set_robot = []
-
-    def trail(self, pose_x, pose_y, trail_set, color):
-        for i in range(0, len(trail_set) - 1):
-            pygame.draw.line(self.map, color, (trail_set[i][0], trail_set[i][1]),
-                             (trail_set[i + 1][0], trail_set[i + 1][1]))
-        if trail_set.__sizeof__() > 10000:
-            trail_set.pop(0)
-        trail_set.append((pose_x, pose_y))
-
-    def write_info(self, Vl, Vr, theta, follow_dist):
-        txt = f"Vl = {round(Vl, 2)}"
-        self.text = self.font.render(txt, True, self.white, self.black)
-        self.textRect.center = (self.width - 200, self.height - 200)
-        self.map.blit(self.text, self.textRect)
-
-        txt = f"Vr = {round(Vr, 2)}"
-        self.text = self.font.render(txt, True, self.white, self.black)
-        self.textRect.center = (self.width - 200, self.height - 150)
-        self.map.blit(self.text, self.textRect)
-
-        txt = f"theta = {round(math.degrees(theta), 2)}"
-        self.text = self.font.render(txt, True, self.white, self.black)
-        self.textRect.center = (self.width - 200, self.height - 100)
-        self.map.blit(self.text, self.textRect)
-
-        txt = f"Follow Distance = {round(follow_dist, 2)}"
-        self.text = self.font.render(txt, True, self.white, self.black)
-        self.textRect.center = (self.width - 350, self.height - 50)
-        self.map.blit(self.text, self.textRect)
-
-
-class Target:
-    def __init__(self, targetImg):
-
-        # target data
-        self.x = 0
-        self.y = 0
-
-        # target graphics
-        self.img = pygame.image.load(targetImg)
-        self.rotated = self.img
-        self.rect = self.rotated.get_rect(center=(self.x, self.y))
-
-    def draw(self, map):
-        map.blit(self.rotated, self.rect)
-
-    def move(self, t):  # movement function of the target
-        self.x = 300 + t * 50
-        self.y = 200 + 60 * math.cos(t)
-
-        self.rotated = pygame.transform.rotozoom(self.img, math.degrees(0), 1)
-        self.rect = self.rotated.get_rect(center=(self.x, self.y))
-
-
-class Robot:
-    def __init__(self, robot_x, robot_y, robot_theta, distance_star, robotImg, robotWidth=0.03):
-
-        # meter -> pixel transform
-        self.meter_to_pixel = 3779.52
-
-        # robot data
-        self.x = robot_x
-        self.y = robot_y
-        self.theta = robot_theta
-        self.x_target = 0
-        self.y_target = 0
-        self.width = robotWidth * self.meter_to_pixel
-        self.R = 0.1 * self.meter_to_pixel  # radius of the wheels
-        self.d_star = distance_star  # desired follow distance
-        self.follow_dist = 0  # current follow distance
-        self.vr = 0  # vr = wr * self.R
-        self.vl = 0
-        self.wr = 0
-        self.wl = 0
-        self.w_velocity = 0
-        self.v_velocity = 0
-
-        # PID attributes
-        self.e_distance_sum = 0
-        self.e_distance_prev = 0
-
-        # robot graphics
-        self.img = pygame.image.load(robotImg)
-        self.rotated = self.img
-        self.rect = self.rotated.get_rect(center=(self.x, self.y))
-
-    def draw(self, map):
-        map.blit(self.rotated, self.rect)
-
-    def error_distance(self):
-        self.follow_dist = math.sqrt((self.x_target - self.x) ** 2 + (self.y_target - self.y) ** 2)
-        e_distance = self.follow_dist - self.d_star
-        return e_distance
-
-    def linear_velocity(self):
-        e_distance = self.error_distance()
-        P = Kp_v * e_distance
-        I = Ki_v * self.e_distance_sum * dt
-        D = Kd_v * (e_distance - self.e_distance_prev) / dt
-        self.v_velocity = P + I + D
-        self.e_distance_prev = e_distance
-        self.e_distance_sum += e_distance
-        return self.v_velocity
-
-    def target_angle(self):
-        theta_star = math.atan2(self.y_target - self.y, self.x_target - self.x)
-        return theta_star
-
-    def error_theta(self):
-        theta_star = self.target_angle()
-        theta = theta_star - self.theta
-        e_theta = math.atan2(math.sin(theta), math.cos(theta))
-        return e_theta
-
-    def angular_velocity(self):
-        e_theta = self.error_theta()
-        self.w_velocity = Kp_w * e_theta
-        return self.w_velocity
-
-    def wheel_linear_velocity(self):
-        v_velocity = self.linear_velocity()
-        w_velocity = self.angular_velocity()
-        self.vr = (2 * v_velocity + w_velocity * self.width) / 2  # vr = wr * self.R
-        self.vl = (2 * v_velocity - w_velocity * self.width) / 2  # vl = wl * self.R
-        return self.vr, self.vl
-
-    def wheel_angular_velocity(self):
-        vr = self.wheel_linear_velocity()[0]
-        vl = self.wheel_linear_velocity()[1]
-        self.wr = vr / self.R
-        self.wl = vl / self.R
-        return self.wr, self.wl
-
-    def move(self, target_pos):  # movement function of the robot
-        # target position input
-        self.x_target = target_pos[0]
-        self.y_target = target_pos[1]
-
-        # for angular velocity input
-        """
-        [wr, wl] = self.wheel_angular_velocity()
-
-        vr = wr * self.R
-        vl = wl * self.R
-        """
-
-        # for linear velocity input
-        [vr, vl] = self.wheel_linear_velocity()
-
-        v_velocity = (vr + vl) / 2
-        w_velocity = self.angular_velocity()
-
-        # robot pose update
-        self.x = self.x + v_velocity * math.cos(self.theta) * dt
-        self.y = self.y + v_velocity * math.sin(self.theta) * dt
-        self.theta = self.theta + w_velocity * dt
-
-        # reset theta
-        if self.theta > 2 * math.pi or self.theta < -2 * math.pi:
-            self.theta = 0
-
-        # movement of robot image on the map
-        self.rotated = pygame.transform.rotozoom(self.img, -math.degrees(self.theta), 1)
-        self.rect = self.rotated.get_rect(center=(self.x, self.y))
-
-
-def main():
     pygame.init()
 
     # environment object
-    environment = Environment(map_width, map_height)
+    environment = Environment(map_width, map_height, dirty=dirty)
+    trail_target = Trail(environment.width, environment.height, environment.red, trail_length)
+    trail_robot = Trail(environment.width, environment.height, environment.green, trail_length)
 
     # robot object
-    robot = Robot(start_x, start_y, start_theta, follow_distance,
-                  r"C:/Users/AbdullahDangac/Differential-Drive-Robot-Simulations/Follow_Trajectory_Simulation/images/differential_drive_robot.png")
+    robot = create_robot(tracker, path)
+    robot_sprite = Sprite(robot_img, flip=True)
 
     # target object
-    target = Target(r"C:/Users/AbdullahDangac/Differential-Drive-Robot-Simulations/Follow_Trajectory_Simulation/images/target.png")
-
-    # program start time
-    start_time = time.time()
+    target = Target()
+    target_sprite = Sprite(target_img, resolution=360)  # always drawn at angle 0: one frame
+
+    # simulation clock (target time advances by dt each step)
+    clock = SimulationClock(dt, clock_mode, speed, fps)
+    frame_clock = pygame.time.Clock()
+
+    # poses of the previous step, the renderer interpolates between the last two steps
+    robot_prev = [robot.x, robot.y, robot.theta]
+    target_prev = [target.x, target.y, 0]
+
+    def step(t):
+        robot_prev[:] = [robot.x, robot.y, robot.theta]
+        target_prev[:] = [target.x, target.y, 0]
+        target.move(t)
+        step_robot(robot, target)
+
+    # profiling hooks (the loop calls the original functions without a profiler)
+    get_events = timed(profiler, 'events', pygame.event.get)
+    instrument(profiler, robot, 'controller', 'linear_velocity', 'angular_velocity', 'wheel_linear_velocity')
+    instrument(profiler, robot, 'integration', 'integrator')
+    instrument(profiler, robot_sprite, 'sprite', 'update')
+    instrument(profiler, target_sprite, 'sprite', 'update')
+    instrument(profiler, environment, 'trail', 'trail')
+    instrument(profiler, environment, 'hud', 'write_info')
+    instrument(profiler, environment, 'display', 'update_display')
 
     # simulation loop
     loop = True
     while loop:
-        for event in pygame.event.get():
+        for event in get_events():
             if event.type == pygame.QUIT:
                 loop = False
 
-        pygame.display.update()
-        environment.map.fill(environment.black)
+        clock.run_frame(step)
 
-        runtime = time.time() - start_time
+        environment.update_display()
+        environment.clear()
 
-        target.move(runtime)
-        target.draw(environment.map)
-        environment.trail(target.x, target.y, environment.trail_set_target, environment.red)
+        target_x, target_y, _ = interpolate(target_prev, (target.x, target.y, 0), clock.alpha)
+        target_sprite.update(target_x, target_y)
+        environment.draw(target_sprite)
+        environment.trail(target_x, target_y, trail_target)
 
-        robot.move((target.x, target.y))
-        robot.draw(environment.map)
-        environment.trail(robot.x, robot.y, environment.trail_set_robot, environment.green)
+        robot_x, robot_y, robot_theta = interpolate(robot_prev, (robot.x, robot.y, robot.theta), clock.alpha)
+        robot_sprite.update(robot_x, robot_y, robot_theta)
+        environment.draw(robot_sprite)
+        environment.trail(robot_x, robot_y, trail_robot)
 
-        # for robot information displayed on the screen
-        if robot.theta < 0:
-            robot.theta = 2 * math.pi + robot.theta
+        environment.write_info(info(robot, environment.width, environment.height))
+        if profiler is not None:
+            environment.write_overlay(profiler.overlay())
 
-        environment.write_info(robot.vl, robot.vr, robot.theta, robot.follow_dist)
+        # frames are paced (and dropped) independently of the simulation steps
+        frame_clock.tick(fps)
 
 
 if __name__ == '__main__':
-    try:
-        main()
-    except RuntimeError:
-        pass
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Follow-Trajectory Simulation')
+    parser.add_argument('--headless', action='store_true', help='run without a window')
+    parser.add_argument('--steps', type=int, default=10000, help='number of steps in headless mode')
+    parser.add_argument('--record', default=None, help='trajectory log file of the headless run')
+    parser.add_argument('--clock', choices=MODES, default='fixed', help='simulation clock mode')
+    parser.add_argument('--speed', type=float, default=1, help='speed factor of the accelerated clock')
+    parser.add_argument('--fps', type=int, default=60, help='frame rate of the renderer')
+    parser.add_argument('--tracker', choices=sorted(TRACKERS), default=None,
+                        help='follow the trajectory with a lookahead tracker instead of the PID target follower')
+    parser.add_argument('--path', default=None, help='waypoint file (.csv / .npy) of the tracked trajectory')
+    parser.add_argument('--checkpoint', default=None, help='save a snapshot at the end of the headless run')
+    parser.add_argument('--resume', default=None, help='continue the headless run from a snapshot')
+    parser.add_argument('--telemetry', default=None, metavar='ADDRESS',
+                        help='publish telemetry of the headless run (port, host:port or Unix socket path)')
+    parser.add_argument('--telemetry-every', type=int, default=10, help='steps per telemetry record')
+    parser.add_argument('--telemetry-wait', type=int, default=0, help='subscribers to wait for before the run starts')
+    parser.add_argument('--export', default=None, metavar='PATH',
+                        help='export frames of the headless run (PNG directory, or .rgb raw video stream)')
+    parser.add_argument('--export-fps', type=float, default=60, help='exported frames per second of simulation time')
+    parser.add_argument('--dirty', action='store_true', help='update only the changed regions of the window')
+    parser.add_argument('--profile', action='store_true', help='time the loop phases (on-screen overlay)')
+    parser.add_argument('--profile-json', default=None, help='save the phase timings as json at exit')
+    parser.add_argument('--profile-trace', default=None, help='save the phase timings as a chrome trace at exit')
+    parser.add_argument('--trail-length', type=int, default=trail_length, help='trail length in points')
+    args = parser.parse_args()
+    trail_length = args.trail_length
+    if args.headless and (args.profile or args.profile_json or args.profile_trace):
+        parser.error('--profile, --profile-json and --profile-trace time the window loop, not --headless runs')
+    profiler = None
+    if args.profile or args.profile_json or args.profile_trace:
+        profiler = Profiler(trace=args.profile_trace is not None)
+
+    if args.headless:
+        telemetry = None
+        if args.telemetry is not None:
+            telemetry = TelemetryServer(every=args.telemetry_every, **address(args.telemetry)).start()
+            telemetry.wait(args.telemetry_wait)
+        export = None
+        if args.export is not None:
+            export = Exporter(args.export, args.export_fps, width=map_width, height=map_height, flip=True,
+                              trail_length=trail_length, robot_img=robot_img, target_img=target_img)
+        robot, target = run_headless(args.steps, args.record, args.tracker, args.path, telemetry, args.resume,
+                                     args.checkpoint, export)
+        if telemetry is not None:
+            telemetry.stop()
+        if export is not None:
+            print(f"{export.close()} frames written to {args.export}")
+        if args.tracker is None:
+            print(f"x = {robot.x}, y = {robot.y}, theta = {robot.theta}, follow distance = {robot.follow_dist}")
+        else:
+            print(f"x = {robot.x}, y = {robot.y}, theta = {robot.theta}, cross track = {robot.cross_track()}")
+    else:
+        try:
+            main(args.clock, args.speed, args.fps, args.tracker, args.path, profiler, args.dirty)
+        except RuntimeError:
+            pass
+        finally:
+            save(profiler, args.profile_json, args.profile_trace)
@@ -8,8 +8,23 @@
 
 """
 
+import argparse
 import math
-import pygame
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from differential_drive.batch import RobotBatch
+from differential_drive.occupancy import OccupancyGrid
+from differential_drive.planner import Planner
+from differential_drive.export import Exporter
+from differential_drive.profiler import Profiler, instrument, save, timed
+from differential_drive.recorder import Recorder
+from differential_drive.telemetry import TelemetryServer, address
+from differential_drive.robot import GoToGoalRobot
 
 # delta t
 dt = 0.005
@@ -19,6 +34,9 @@ dt = 0.005
 map_width = 1400
 map_height = 750
 
+# trail length (points)
+trail_length = 1250
+
 # === ROBOT PROPERTIES (INITIAL VALUES) ===
 # start position of the robot (pose)
 start_x = 200
@@ -33,201 +51,181 @@ goal_y = 200
 Kp_v = 0.5  # P-Control gain for linear velocity
 Kp_w = 1  # P-Control gain for angular velocity
 
+# robot image (relative to the script directory)
+images_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'images')
+robot_img = os.path.join(images_dir, "differential_drive_robot.png")
+
+
+def load_map(path, resolution=5):  # occupancy grid from a .png or .npy file
+    if path.endswith('.npy'):
+        return OccupancyGrid.from_npy(path, resolution)
+    return OccupancyGrid.from_png(path, resolution)
+
+
+def create_robot(grid=None, jps=False):  # with a map, the robot follows the planned path to the goal
+    robot = GoToGoalRobot(start_x, start_y, start_theta, goal_x, goal_y, dt, Kp_v, Kp_w)
+
+    if grid is not None:
+        planner = Planner(grid, clearance=robot.width / 2)
+        path = planner.smooth(planner.path((start_x, start_y), (goal_x, goal_y), jps))
+        if path is None:
+            raise SystemExit('no path from the start to the goal on the map')
+        robot.set_path(path)
+
+    return robot
+
+
+def info(robot, width, height):  # robot information displayed on the screen
+    return [(f"Vl = {round(robot.vl, 2)}", (width - 200, height - 150)),
+            (f"Vr = {round(robot.vr, 2)}", (width - 200, height - 100)),
+            (f"theta = {round(math.degrees(robot.theta), 2)}", (width - 200, height - 50)),
+            (f"x = {round(robot.x, 2)}", (width - 200, height - 300)),
+            (f"y = {round(robot.y, 2)}", (width - 200, height - 250))]
+
+
+def run_headless(steps, record=None, grid=None, jps=False, telemetry=None, export=None):  # simulation without a window
+    robot = create_robot(grid, jps)
+    recorder = Recorder(record) if record is not None else None
+
+    for i in range(steps):
+        robot.step()
+        if recorder is not None:
+            recorder.record_robot(i * dt, robot)
+        if telemetry is not None:
+            telemetry.publish(i * dt, robot)
+        if export is not None:
+            export.publish(i * dt, robot)
+
+    if recorder is not None:
+        recorder.close()
+
+    return robot
+
+
+def run_fleet(steps, grid, n, seed=0):  # <n> robots from random free cells, all steered by one goal distance field
+    robot = GoToGoalRobot(start_x, start_y, start_theta, goal_x, goal_y, dt, Kp_v, Kp_w)
+    planner = Planner(grid, clearance=robot.width / 2)
+    field = planner.field((goal_x, goal_y))
+
+    rng = np.random.default_rng(seed)
+    cells = np.argwhere(planner.free & np.isfinite(field.cost))
+    if not len(cells):
+        raise SystemExit('the goal can not be reached on the map')
+    row, col = cells[rng.integers(len(cells), size=n)].T
+    batch = RobotBatch((col + 0.5) * grid.resolution, (row + 0.5) * grid.resolution,
+                       rng.uniform(0, 2 * math.pi, n), dt, Kp_v=Kp_v, Kp_w=Kp_w)
+
+    for _ in range(steps):
+        batch.step_go_to_goal(goal_x, goal_y, field)
+
+    return batch, field
+
+
+def main(grid=None, jps=False, profiler=None, dirty=False):
+    import pygame
+    from differential_drive.render import Environment, Sprite, Trail, grid_surface
 
-class Environment:
-    def __init__(self, window_width, window_height):
-
-        # colors
-        self.black = (0, 0, 0)
-        self.white = (255, 255, 255)
-        self.green = (0, 255, 0)
-
-        # window (map) dimensions
-        self.width = window_width
-        self.height = window_height
-
-        # window settings
-        pygame.display.set_caption('Differential Drive Robot')
-        self.map = pygame.display.set_mode((self.width, self.height))
-
-        # text variables
-        self.font = pygame.font.Font('freesansbold.ttf', 30)
-        self.text = self.font.render('default', True, self.white, self.black)
-        self.textRect = self.text.get_rect()
-
-        # trail
-        self.trail_set = []
-        
-    def trail(self, pose_x, pose_y):
-        for i in range(0, len(self.trail_set) - 1):
-            pygame.draw.line(self.map, self.green, (self.trail_set[i][0], self.trail_set[i][1]),
-                             (self.trail_set[i + 1][0], self.trail_set[i + 1][1]))
-        if self.trail_set.__sizeof__() > 10000:
-            self.trail_set.pop(0)
-        self.trail_set.append((pose_x, pose_y))
-        
-    def write_info(self, Vl, Vr, theta, x, y):
-        txt = f"Vl = {round(Vl, 2)}"
-        self.text = self.font.render(txt, True, self.white, self.black)
-        self.textRect.center = (self.width - 200, self.height - 150)
-        self.map.blit(self.text, self.textRect)
-
-        txt = f"Vr = {round(Vr, 2)}"
-        self.text = self.font.render(txt, True, self.white, self.black)
-        self.textRect.center = (self.width - 200, self.height - 100)
-        self.map.blit(self.text, self.textRect)
-
-        txt = f"theta = {round(math.degrees(theta), 2)}"
-        self.text = self.font.render(txt, True, self.white, self.black)
-        self.textRect.center = (self.width - 200, self.height - 50)
-        self.map.blit(self.text, self.textRect)
-
-        txt = f"x = {round(x, 2)}"
-        self.text = self.font.render(txt, True, self.white, self.black)
-        self.textRect.center = (self.width - 200, self.height - 300)
-        self.map.blit(self.text, self.textRect)
-
-        txt = f"y = {round(y, 2)}"
-        self.text = self.font.render(txt, True, self.white, self.black)
-        self.textRect.center = (self.width - 200, self.height - 250)
-        self.map.blit(self.text, self.textRect)
-
-
-class Robot:
-    def __init__(self, robot_x, robot_y, robot_theta, x_goal, y_goal, robotImg, robotWidth=0.03):
-
-        # meter -> pixel transform
-        self.meter_to_pixel = 3779.52
-
-        # robot data
-        self.x = robot_x
-        self.y = robot_y
-        self.theta = robot_theta
-        self.width = robotWidth * self.meter_to_pixel
-        self.R = 0.1 * self.meter_to_pixel  # radius of the wheels
-        self.vr = 0  # vr = wr * self.R
-        self.vl = 0
-        self.wr = 0
-        self.wl = 0
-        self.w_velocity = 0
-        self.v_velocity = 0
-
-        # goal point data
-        self.x_g = x_goal
-        self.y_g = y_goal
-
-        # robot graphics
-        self.img = pygame.image.load(robotImg)
-        self.rotated = self.img
-        self.rect = self.rotated.get_rect(center=(self.x, self.y))
-
-    def draw(self, map):
-        map.blit(self.rotated, self.rect)
-
-    def distance(self):  # calculate distance between the robot and goal
-        distance = math.sqrt((self.x_g - self.x) ** 2 + (self.y_g - self.y) ** 2)
-        return distance
-
-    def linear_velocity(self):
-        distance = self.distance()
-        self.v_velocity = Kp_v * distance
-        return self.v_velocity
-
-    def goal_angle(self):
-        theta_star = math.atan2(self.y_g - self.y, self.x_g - self.x)
-        return theta_star
-
-    def error_theta(self):  # calculate error angle between heading and target direction
-        theta_star = self.goal_angle()
-        theta = theta_star - self.theta
-        e_theta = math.atan2(math.sin(theta), math.cos(theta))
-        return e_theta
-
-    def angular_velocity(self):
-        e_theta = self.error_theta()
-        self.w_velocity = Kp_w * e_theta
-        return self.w_velocity
-
-    def wheel_linear_velocity(self):
-        v_velocity = self.linear_velocity()
-        w_velocity = self.angular_velocity()
-        self.vr = (2 * v_velocity + w_velocity * self.width) / 2  # vr = wr * self.R
-        self.vl = (2 * v_velocity - w_velocity * self.width) / 2  # vl = wl * self.R
-        return self.vr, self.vl
-
-    def wheel_angular_velocity(self):
-        vr = self.wheel_linear_velocity()[0]
-        vl = self.wheel_linear_velocity()[1]
-        self.wr = vr / self.R
-        self.wl = vl / self.R
-        return self.wr, self.wl
-
-    def move(self):
-        # for angular velocity input
-        """
-        [wr, wl] = self.wheel_angular_velocity()
-
-        vr = wr * self.R
-        vl = wl * self.R
-        """
-
-        # for linear velocity input
-        [vr, vl] = self.wheel_linear_velocity()
-
-        if self.distance() == 0.1 * self.meter_to_pixel:
-            v_velocity = 0
-            w_velocity = 0
-        else:
-            v_velocity = (vr + vl) / 2
-            w_velocity = self.angular_velocity()
-
-        # robot pose update
-        self.x = self.x + v_velocity * math.cos(self.theta) * dt
-        self.y = self.y + v_velocity * math.sin(self.theta) * dt
-        self.theta = self.theta + w_velocity * dt
-
-        # reset theta
-        if self.theta > 2 * math.pi or self.theta < -2 * math.pi:
-            self.theta = 0
-
-        # movement of robot image on the map
-        self.rotated = pygame.transform.rotozoom(self.img, -math.degrees(self.theta), 1)
-        self.rect = self.rotated.get_rect(center=(self.x, self.y))
-
-
-def main():
     pygame.init()
 
     # environment object
-    environment = Environment(map_width, map_height)
+    environment = Environment(map_width, map_height, dirty=dirty)
+    trail = Trail(environment.width, environment.height, environment.green, trail_length)
+
+    # map (background surface is created once)
+    if grid is not None:
+        environment.set_background(grid_surface(grid))
 
     # robot object
-    robot = Robot(start_x, start_y, start_theta, goal_x, goal_y,
-                  r"C:/Users/AbdullahDangac/Differential-Drive-Robot-Simulations/Go_to_Goal_Simulation/images/differential_drive_robot.png")
+    robot = create_robot(grid, jps)
+    sprite = Sprite(robot_img, flip=True)
+
+    # profiling hooks (the loop calls the original functions without a profiler)
+    get_events = timed(profiler, 'events', pygame.event.get)
+    instrument(profiler, robot, 'controller', 'linear_velocity', 'angular_velocity', 'wheel_linear_velocity')
+    instrument(profiler, robot, 'integration', 'integrator')
+    instrument(profiler, sprite, 'sprite', 'update')
+    instrument(profiler, environment, 'trail', 'trail')
+    instrument(profiler, environment, 'hud', 'write_info')
+    instrument(profiler, environment, 'display', 'update_display')
 
     # simulation loop
     loop = True
     while loop:
-        for event in pygame.event.get():
+        for event in get_events():
             if event.type == pygame.QUIT:
                 loop = False
 
-        pygame.display.update()
-        environment.map.fill(environment.black)
-
-        robot.move()
-        robot.draw(environment.map)
+        environment.update_display()
+        environment.clear()
 
-        # for robot information displayed on the screen
-        if robot.theta < 0:
-            robot.theta = 2 * math.pi + robot.theta
+        robot.step()
+        sprite.update(robot.x, robot.y, robot.theta)
+        environment.draw(sprite)
 
-        environment.write_info(robot.vl, robot.vr, robot.theta, robot.x, robot.y)
-        environment.trail(robot.x, robot.y)
+        environment.write_info(info(robot, environment.width, environment.height))
+        environment.trail(robot.x, robot.y, trail)
+        if profiler is not None:
+            environment.write_overlay(profiler.overlay())
 
 
 if __name__ == '__main__':
-    try:
-        main()
-    except RuntimeError:
-        pass
+    parser = argparse.ArgumentParser(description='Go-To-Goal Simulation')
+    parser.add_argument('--headless', action='store_true', help='run without a window')
+    parser.add_argument('--steps', type=int, default=10000, help='number of steps in headless mode')
+    parser.add_argument('--record', default=None, help='trajectory log file of the headless run')
+    parser.add_argument('--telemetry', default=None, metavar='ADDRESS',
+                        help='publish telemetry of the headless run (port, host:port or Unix socket path)')
+    parser.add_argument('--telemetry-every', type=int, default=10, help='steps per telemetry record')
+    parser.add_argument('--telemetry-wait', type=int, default=0, help='subscribers to wait for before the run starts')
+    parser.add_argument('--export', default=None, metavar='PATH',
+                        help='export frames of the headless run (PNG directory, or .rgb raw video stream)')
+    parser.add_argument('--export-fps', type=float, default=60, help='exported frames per second of simulation time')
+    parser.add_argument('--dirty', action='store_true', help='update only the changed regions of the window')
+    parser.add_argument('--profile', action='store_true', help='time the loop phases (on-screen overlay)')
+    parser.add_argument('--profile-json', default=None, help='save the phase timings as json at exit')
+    parser.add_argument('--profile-trace', default=None, help='save the phase timings as a chrome trace at exit')
+    parser.add_argument('--trail-length', type=int, default=trail_length, help='trail length in points')
+    parser.add_argument('--map', default=None, help='occupancy grid (.png or .npy), the robot follows a planned path')
+    parser.add_argument('--map-resolution', type=int, default=5, help='cell size of the map in pixels')
+    parser.add_argument('--jps', action='store_true', help='plan with jump point search')
+    parser.add_argument('--fleet', type=int, default=0,
+                        help='headless run of N robots from random free cells of the map (goal distance field)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the fleet start poses')
+    args = parser.parse_args()
+    trail_length = args.trail_length
+    if args.headless and (args.profile or args.profile_json or args.profile_trace):
+        parser.error('--profile, --profile-json and --profile-trace time the window loop, not --headless runs')
+    profiler = None
+    if args.profile or args.profile_json or args.profile_trace:
+        profiler = Profiler(trace=args.profile_trace is not None)
+    grid = load_map(args.map, args.map_resolution) if args.map is not None else None
+    if args.fleet and (grid is None or not args.headless):
+        parser.error('--fleet needs --map and --headless')
+
+    if args.fleet:
+        batch, field = run_fleet(args.steps, grid, args.fleet, args.seed)
+        reached = np.hypot(goal_x - batch.x, goal_y - batch.y) < 20
+        print(f"{reached.sum()} of {len(batch)} robots at the goal, "
+              f"median cost-to-go = {np.median(field.distance(batch.x, batch.y)):.1f}")
+    elif args.headless:
+        telemetry = None
+        if args.telemetry is not None:
+            telemetry = TelemetryServer(every=args.telemetry_every, **address(args.telemetry)).start()
+            telemetry.wait(args.telemetry_wait)
+        export = None
+        if args.export is not None:
+            export = Exporter(args.export, args.export_fps, width=map_width, height=map_height, flip=True,
+                              trail_length=trail_length, robot_img=robot_img)
+        robot = run_headless(args.steps, args.record, grid, args.jps, telemetry, export)
+        if telemetry is not None:
+            telemetry.stop()
+        if export is not None:
+            print(f"{export.close()} frames written to {args.export}")
+        print(f"x = {robot.x}, y = {robot.y}, theta = {robot.theta}")
+    else:
+        try:
+            main(grid, args.jps, profiler, args.dirty)
+        except RuntimeError:
+            pass
+        finally:
+            save(profiler, args.profile_json, args.profile_trace)
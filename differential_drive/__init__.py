@@ -0,0 +1,17 @@
+"""
+
+   Differential Drive Robot Simulation Core
+
+   The stepping core does not import pygame, the renderer lives in differential_drive.render.
+
+"""
+
+from .robot import ManualRobot, GoToGoalRobot, FollowTrajectoryRobot, TrackingRobot, Target
+from .batch import RobotBatch
+from .noise import NoiseModel
+from .estimator import Odometry, EKF
+from .integrators import INTEGRATORS
+from .world import SpatialHash, World
+from .occupancy import OccupancyGrid, RangeSensor
+from .planner import Planner
+from .trajectory import Trajectory, PurePursuit, Stanley
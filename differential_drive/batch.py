@@ -0,0 +1,217 @@
+"""
+
+   Vectorized Batch Simulator for Differential Drive Robots
+
+   The robot data is a struct of arrays (one float64 array per attribute). The step functions write into
+   these arrays and into preallocated scratch buffers (the controller kernels of controllers.py with out=
+   arrays), so the default integrators allocate no arrays per step
+   (the optional noise model of noise.py and the estimators of estimator.py allocate their arrays).
+
+"""
+
+import math
+import numpy as np
+
+from . import controllers
+from .integrators import euler, exact, get_integrator
+
+
+def _array(value, n):  # contiguous float64 array of length n (scalars are broadcast)
+    return np.ascontiguousarray(np.broadcast_to(np.asarray(value, dtype=np.float64), (n,))).copy()
+
+
+class RobotBatch:  # N differential drive robots stepped at once with array operations
+    def __init__(self, robot_x, robot_y, robot_theta, dt=0.005, distance_star=0, Kp_v=0.5, Ki_v=0.01, Kd_v=0.1,
+                 Kp_w=1, integrator=None, robotWidth=0.03, sum_limit=math.inf, noise=None,
+                 estimator=None, feedback='measurement'):
+        # meter -> pixel transform
+        self.meter_to_pixel = 3779.52
+
+        # delta t and pose integrator (None: defaults of the robot models, exact for ICC and euler for unicycle steps;
+        # these defaults are stepped in place, also when they are given by name)
+        self.dt = dt
+        self.integrator = get_integrator(integrator) if integrator is not None else None
+
+        # robot data (one element per robot)
+        self.n = np.broadcast(np.asarray(robot_x), np.asarray(robot_y), np.asarray(robot_theta)).size
+        self.x = _array(robot_x, self.n)
+        self.y = _array(robot_y, self.n)
+        self.theta = _array(robot_theta, self.n)
+        self.width = robotWidth * self.meter_to_pixel
+        self.vr = np.zeros(self.n)
+        self.vl = np.zeros(self.n)
+        self.w_velocity = np.zeros(self.n)
+        self.v_velocity = np.zeros(self.n)
+
+        # follow-trajectory data
+        self.d_star = _array(distance_star, self.n)  # desired follow distance
+        self.follow_dist = np.zeros(self.n)  # current follow distance
+
+        # controller gains (one element per robot, so a batch can sweep gains)
+        self.Kp_v = _array(Kp_v, self.n)
+        self.Ki_v = _array(Ki_v, self.n)
+        self.Kd_v = _array(Kd_v, self.n)
+        self.Kp_w = _array(Kp_w, self.n)
+
+        # PID attributes (sum_limit: anti-windup clamp of the error sum)
+        self.e_distance_sum = np.zeros(self.n)
+        self.e_distance_prev = np.zeros(self.n)
+        self.sum_limit = sum_limit
+
+        # noise, slip and actuator limits (noise.NoiseModel, None: deterministic kinematics)
+        if noise is not None and len(noise) != self.n:
+            raise ValueError("the noise model needs one random stream per robot")
+        self.noise = noise
+
+        # pose estimator (estimator.py) and pose used by the controllers: 'truth', 'measurement' (pose of the
+        # noise model, the truth without one) or 'estimate'
+        if feedback not in ('truth', 'measurement', 'estimate'):
+            raise ValueError(f"unknown feedback: {feedback}")
+        if feedback == 'estimate' and estimator is None:
+            raise ValueError("feedback 'estimate' needs an estimator")
+        if estimator is not None and len(estimator) != self.n:
+            raise ValueError("the estimator needs one estimate per robot")
+        self.estimator = estimator
+        self.feedback = feedback
+
+        # scratch buffers of the step functions
+        self._buffer = np.empty((6, self.n))
+        self._mask = np.empty(self.n, dtype=bool)
+
+    def __len__(self):
+        return self.n
+
+    def _reset_theta(self):  # same heading reset as Robot.move() followed by the wrap done for display
+        a, mask = self._buffer[0], self._mask
+        np.abs(self.theta, out=a)
+        np.greater(a, 2 * math.pi, out=mask)
+        np.putmask(self.theta, mask, 0)
+        np.less(self.theta, 0, out=mask)
+        np.add(self.theta, 2 * math.pi, out=self.theta, where=mask)
+
+    def _integrate(self, y, v_velocity, w_velocity):  # pose update with a generic integrator (new arrays)
+        x, y, theta = self.integrator(self.x, y, self.theta, v_velocity, w_velocity, self.dt)
+        np.copyto(self.x, x)
+        np.copyto(self.theta, theta)
+        return y
+
+    def _unicycle_update(self, v_velocity, w_velocity):  # euler in place (inputs must not be self._buffer[0])
+        if self.integrator not in (None, euler):
+            np.copyto(self.y, self._integrate(self.y, v_velocity, w_velocity))
+        else:
+            a = self._buffer[0]
+            np.cos(self.theta, out=a)
+            a *= v_velocity
+            a *= self.dt
+            self.x += a
+            np.sin(self.theta, out=a)
+            a *= v_velocity
+            a *= self.dt
+            self.y += a
+            np.multiply(w_velocity, self.dt, out=a)
+            self.theta += a
+        self._reset_theta()
+
+    def _wheel_velocity(self):  # v_velocity of the wheel velocities commanded by the controllers
+        np.add(self.vr, self.vl, out=self.v_velocity)
+        self.v_velocity /= 2
+
+    def _sensed(self):  # pose seen by the controllers
+        if self.noise is not None:
+            self.noise.draw()
+        if self.feedback == 'estimate':
+            return self.estimator.x, self.estimator.y, self.estimator.theta
+        if self.feedback == 'measurement' and self.noise is not None:
+            return self.noise.measure(self.x, self.y, self.theta)
+        return self.x, self.y, self.theta
+
+    def _estimate(self):  # estimator step: odometry of the encoder wheel velocities and measurement update
+        if self.estimator is None:
+            return
+        if self.noise is not None:  # the encoders read the actuators, slip and wheel noise are not seen
+            self.estimator.predict(self.noise.vr, self.noise.vl, self.width, self.dt)
+        else:
+            self.estimator.predict(self.vr, self.vl, self.width, self.dt)
+        self.estimator.observe(self.x, self.y, self.theta, self.noise)
+
+    def _noisy_wheels(self):  # v_velocity and w_velocity of the wheel velocities after noise, slip and limits
+        vr, vl = self.noise.wheels(self.vr, self.vl, self.dt)
+        np.subtract(vr, vl, out=self.w_velocity)
+        self.w_velocity /= self.width
+        np.add(vr, vl, out=self.v_velocity)
+        self.v_velocity /= 2
+
+    def step_icc(self):  # pose update of the manual simulator, wheel velocities are inputs (no estimator)
+        if self.noise is not None:
+            self.noise.draw()
+            self._noisy_wheels()
+        else:
+            np.subtract(self.vr, self.vl, out=self.w_velocity)
+            self.w_velocity /= self.width
+            np.add(self.vr, self.vl, out=self.v_velocity)
+            self.v_velocity /= 2
+
+        # the model is integrated with the y axis up (heading counterclockwise on the window)
+        if self.integrator not in (None, exact):
+            np.negative(self.y, out=self.y)
+            np.negative(self._integrate(self.y, self.v_velocity, self.w_velocity), out=self.y)
+        else:  # exact arc update (integrators.exact) in place
+            a, half, chord = self._buffer[:3]
+            np.multiply(self.w_velocity, self.dt, out=half)
+            half /= 2
+
+            # chord = v * dt * np.sinc(half / pi)
+            np.divide(half, math.pi, out=chord)
+            np.equal(chord, 0, out=self._mask)
+            np.putmask(chord, self._mask, 1.0e-20)
+            chord *= math.pi
+            np.sin(chord, out=a)
+            np.divide(a, chord, out=chord)
+            np.multiply(self.v_velocity, self.dt, out=a)
+            chord *= a
+
+            half += self.theta
+            np.cos(half, out=a)
+            a *= chord
+            self.x += a
+            np.sin(half, out=a)
+            a *= chord
+            self.y -= a
+            np.multiply(self.w_velocity, self.dt, out=a)
+            self.theta += a
+        self._reset_theta()
+
+    # P-control towards the goal point(s) and unicycle update, with a planner.DistanceField of the goal the robots
+    # drive to their next waypoint of the field (around the obstacles of its map)
+    def step_go_to_goal(self, x_goal, y_goal, field=None):
+        distance, scratch = self._buffer[1], self._buffer[2:]
+        x, y, theta = self._sensed()
+        if field is not None:
+            x_goal, y_goal = field.next_waypoint(x, y)
+        controllers.go_to_goal(x, y, theta, x_goal, y_goal, self.Kp_v, self.Kp_w, self.width,
+                               (self.vr, self.vl, self.w_velocity, distance), scratch)
+        self._wheel_velocity()
+        if self.noise is not None:
+            self._noisy_wheels()
+
+        # the robot stops at the goal
+        dx, dy = scratch[:2]
+        np.equal(distance, 0.1 * self.meter_to_pixel, out=self._mask)
+        np.copyto(dx, self.v_velocity)
+        np.putmask(dx, self._mask, 0)
+        np.copyto(dy, self.w_velocity)
+        np.putmask(dy, self._mask, 0)
+        self._unicycle_update(dx, dy)
+        self._estimate()
+
+    def step_follow_trajectory(self, x_target, y_target):  # PID follow-distance control and unicycle update
+        x, y, theta = self._sensed()
+        controllers.follow_distance(x, y, theta, x_target, y_target, self.d_star, self.e_distance_sum,
+                                    self.e_distance_prev, self.Kp_v, self.Ki_v, self.Kd_v, self.Kp_w, self.dt,
+                                    self.width, self.sum_limit, (self.vr, self.vl, self.w_velocity, self.follow_dist),
+                                    self._buffer[1:])
+        self._wheel_velocity()
+        if self.noise is not None:
+            self._noisy_wheels()
+        self._unicycle_update(self.v_velocity, self.w_velocity)
+        self._estimate()
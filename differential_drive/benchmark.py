@@ -0,0 +1,263 @@
+"""
+
+   Benchmark Suite for Differential Drive Robot Simulations
+
+   usage:
+     python -m differential_drive.benchmark --save baseline.json
+     python -m differential_drive.benchmark --compare baseline.json --threshold 0.2
+
+   Every benchmark reports the time per operation (one step, one robot-step, one controller call or one frame)
+   as percentiles over repeated samples, the comparison fails if a median is slower than the baseline by more
+   than the threshold.
+
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+from . import controllers
+from . import kernels
+from .batch import RobotBatch
+from .estimator import EKF
+from .noise import NoiseModel
+from .robot import FollowTrajectoryRobot, GoToGoalRobot, ManualRobot, Target, TrackingRobot
+from .trajectory import TRACKERS, Trajectory
+
+PERCENTILES = (50, 90, 99)
+
+# robot image of the render benchmarks
+ROBOT_IMG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'Go_to_Goal_Simulation', 'images', 'differential_drive_robot.png')
+
+
+def measure(fn, ops, repeats=20, min_time=0.01):  # percentiles of the time per operation, fn runs <ops> operations
+    number = 1
+    while True:  # calibrate the calls per sample
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        if time.perf_counter() - start >= min_time:
+            break
+        number *= 2
+
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / (number * ops))
+
+    return {f"p{p}": float(np.percentile(samples, p)) for p in PERCENTILES}
+
+
+# === PHYSICS BENCHMARKS ===
+def bench_manual():
+    robot = ManualRobot(200, 600, math.pi / 4)
+    robot.vl = 100
+    robot.vr = 120
+    return robot.step, 1
+
+
+def bench_go_to_goal():
+    robot = GoToGoalRobot(200, 600, 2 * math.pi, 800, 200)
+    return robot.step, 1
+
+
+def bench_follow_trajectory():
+    robot = FollowTrajectoryRobot(300, 700, math.pi, 150)
+    target = Target()
+    target.move(0)
+    return lambda: robot.step((target.x, target.y)), 1
+
+
+def bench_batch(n, noise=False):
+    def bench():
+        rng = np.random.default_rng(0)
+        batch = RobotBatch(rng.uniform(0, 1400, n), rng.uniform(0, 750, n), rng.uniform(0, 2 * math.pi, n), 0.01,
+                           distance_star=150, noise=NoiseModel(np.arange(n), 20, 0.05, 0.02) if noise else None)
+        return lambda: batch.step_follow_trajectory(800, 200), n
+    return bench
+
+
+def bench_estimator(n):  # EKF prediction and pose correction of a fleet
+    def bench():
+        rng = np.random.default_rng(0)
+        x, y, theta = rng.uniform(0, 1400, n), rng.uniform(0, 750, n), rng.uniform(0, 2 * math.pi, n)
+        ekf = EKF(x, y, theta, wheel_sigma=10, position_sigma=5, theta_sigma=0.03)
+        vr = rng.uniform(50, 150, n)
+        vl = rng.uniform(50, 150, n)
+
+        def step():
+            ekf.predict(vr, vl, 113.3856, 0.01)
+            ekf.correct(x, y, theta, None)
+        return step, n
+    return bench
+
+
+def bench_kernel(steps):  # compiled multi-step kernel (robot.step() loop without numba)
+    def bench():
+        robot = FollowTrajectoryRobot(300, 700, math.pi, 150)
+        kernels.advance(robot, 1)  # compile outside of the measurement
+        return lambda: kernels.advance(robot, steps), steps
+    return bench
+
+
+# === CONTROLLER BENCHMARKS ===
+def bench_controller_go_to_goal():
+    robot = GoToGoalRobot(200, 600, 2 * math.pi, 800, 200)
+    return robot.wheel_linear_velocity, 1
+
+
+def bench_controller_follow_trajectory():
+    robot = FollowTrajectoryRobot(300, 700, math.pi, 150)
+    robot.x_target = 800
+    robot.y_target = 200
+    return robot.wheel_linear_velocity, 1
+
+
+def bench_controller_tracker(name):
+    def bench():
+        trajectory = Trajectory.from_function(Target.position, 0, 22, 20000)
+        robot = TrackingRobot(300, 700, math.pi, TRACKERS[name](trajectory), 0.01)
+
+        def step():
+            robot.step()
+            if robot.tracker.index == len(trajectory) - 1:  # restart at the end of the trajectory
+                robot.x, robot.y, robot.theta = 300, 700, math.pi
+                robot.tracker.reset()
+        return step, 1
+    return bench
+
+
+def bench_controller_fleet(n):  # follow-distance kernel over a fleet (one call per step)
+    def bench():
+        rng = np.random.default_rng(0)
+        x = rng.uniform(0, 1400, n)
+        y = rng.uniform(0, 750, n)
+        theta = rng.uniform(0, 2 * math.pi, n)
+        error_sum = np.zeros(n)
+        error_prev = np.zeros(n)
+        width = 0.03 * 3779.52
+        return lambda: controllers.follow_distance(x, y, theta, 800, 200, 150, error_sum, error_prev, 0.5, 0.01, 0.1,
+                                                   1, 0.01, width), n
+    return bench
+
+
+# === RENDER BENCHMARKS ===
+def bench_render(rotation=True, trail=True, hud=True, dirty=False):
+    def bench():
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        import pygame
+        from .render import Environment, Sprite, Trail
+
+        pygame.init()
+        environment = Environment(1400, 750, dirty=dirty)
+        sprite = Sprite(ROBOT_IMG, flip=True)
+        robot_trail = Trail(environment.width, environment.height, environment.green)
+        robot = GoToGoalRobot(200, 600, 2 * math.pi, 800, 200)
+
+        def frame():
+            environment.update_display()
+            environment.clear()
+            robot.step()
+            sprite.update(robot.x, robot.y, robot.theta if rotation else 0)
+            environment.draw(sprite)
+            if hud:
+                environment.write_info([(f"Vl = {round(robot.vl, 2)}", (1200, 600)),
+                                        (f"Vr = {round(robot.vr, 2)}", (1200, 650)),
+                                        (f"theta = {round(math.degrees(robot.theta), 2)}", (1200, 700))])
+            if trail:
+                environment.trail(robot.x, robot.y, robot_trail)
+        return frame, 1
+    return bench
+
+
+BENCHMARKS = {
+    'physics_manual': bench_manual,
+    'physics_go_to_goal': bench_go_to_goal,
+    'physics_follow_trajectory': bench_follow_trajectory,
+    'batch_follow_trajectory_1k': bench_batch(1000),
+    'batch_follow_trajectory_100k': bench_batch(100000),
+    'batch_noise_100k': bench_batch(100000, noise=True),
+    'kernel_follow_trajectory': bench_kernel(100000),
+    'estimator_ekf_100k': bench_estimator(100000),
+    'controller_go_to_goal': bench_controller_go_to_goal,
+    'controller_follow_trajectory': bench_controller_follow_trajectory,
+    'controller_fleet_100k': bench_controller_fleet(100000),
+    'controller_pure_pursuit': bench_controller_tracker('pure_pursuit'),
+    'controller_stanley': bench_controller_tracker('stanley'),
+    'render_bare': bench_render(rotation=False, trail=False, hud=False),
+    'render_rotation': bench_render(rotation=True, trail=False, hud=False),
+    'render_trail': bench_render(rotation=False, trail=True, hud=False),
+    'render_hud': bench_render(rotation=False, trail=False, hud=True),
+    'render_full': bench_render(rotation=True, trail=True, hud=True),
+    'render_dirty': bench_render(rotation=True, trail=True, hud=True, dirty=True),
+}
+
+
+def run(names=None, repeats=20, min_time=0.01):  # results: {name: {p50, p90, p99}} (seconds per operation)
+    results = {}
+    for name, bench in BENCHMARKS.items():
+        if names and not any(name.startswith(prefix) for prefix in names):
+            continue
+        if name.startswith('render'):
+            try:
+                import pygame  # noqa: F401 (render benchmarks need the optional renderer)
+            except ImportError:
+                continue
+        fn, ops = bench()
+        results[name] = measure(fn, ops, repeats, min_time)
+    return results
+
+
+def compare(results, baseline, threshold):  # names of benchmarks slower than the baseline by more than threshold
+    regressions = []
+    for name, result in results.items():
+        if name in baseline and result['p50'] > baseline[name]['p50'] * (1 + threshold):
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark suite of the differential drive simulations')
+    parser.add_argument('names', nargs='*', help='benchmark name prefixes (default: all)')
+    parser.add_argument('--repeats', type=int, default=20, help='samples per benchmark')
+    parser.add_argument('--min-time', type=float, default=0.01, help='minimum duration of a sample in seconds')
+    parser.add_argument('--save', default=None, help='save the results as a json baseline')
+    parser.add_argument('--compare', default=None, help='json baseline to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1, help='allowed slowdown of the median (0.1 = 10%%)')
+    args = parser.parse_args()
+
+    results = run(args.names, args.repeats, args.min_time)
+
+    baseline = {}
+    if args.compare is not None:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+
+    print(f"{'benchmark':32} {'p50':>12} {'p90':>12} {'p99':>12} {'ops/s':>14} {'change':>8}")
+    for name, result in results.items():
+        change = ''
+        if name in baseline:
+            change = f"{(result['p50'] / baseline[name]['p50'] - 1) * 100:+.1f}%"
+        print(f"{name:32} {result['p50'] * 1e6:10.3f}us {result['p90'] * 1e6:10.3f}us {result['p99'] * 1e6:10.3f}us "
+              f"{1 / result['p50']:14.0f} {change:>8}")
+
+    if args.save is not None:
+        with open(args.save, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"regression (> {args.threshold * 100:.0f}% slower): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+
+   Fixed-Timestep Simulation Clock
+
+   Simulation time advances by dt each step (t = steps * dt), independent of the frame rate:
+     fixed       -> real time, steps are paced by the wall clock
+     accelerated -> speed x real time
+     max         -> as many steps as fit in the frame budget of the renderer
+
+"""
+
+import math
+import time
+
+MODES = ('fixed', 'accelerated', 'max')
+
+
+class SimulationClock:
+    def __init__(self, dt, mode='fixed', speed=1, fps=60, max_steps_per_frame=100000):
+        if mode not in MODES:
+            raise ValueError(f"unknown clock mode: {mode}")
+
+        # delta t
+        self.dt = dt
+
+        # clock mode
+        self.mode = mode
+        self.speed = speed if mode == 'accelerated' else 1
+        self.frame_budget = 1 / fps  # wall time of a frame in max mode
+        self.max_steps_per_frame = max_steps_per_frame  # cap to recover from stalls of the renderer
+
+        # simulation time data
+        self.steps = 0
+        self.accumulator = 0  # simulation time not yet stepped
+        self.wall_prev = None
+
+    @property
+    def t(self):  # simulation time (no summation of dt, so it is bit-identical for every run)
+        return self.steps * self.dt
+
+    @property
+    def alpha(self):  # fraction of the next step already elapsed, used by the renderer for interpolation
+        if self.mode == 'max':
+            return 0
+        return min(self.accumulator / self.dt, 1)
+
+    def tick(self):  # advance the clock by one step, returns the time at the start of the step
+        t = self.t
+        self.steps += 1
+        return t
+
+    def run_frame(self, step):  # call step(t) for every step due in this frame, returns the number of steps
+        now = time.perf_counter()
+        if self.wall_prev is None:
+            self.wall_prev = now
+        elapsed = now - self.wall_prev
+        self.wall_prev = now
+
+        count = 0
+        if self.mode == 'max':
+            while count < self.max_steps_per_frame and time.perf_counter() - now < self.frame_budget:
+                step(self.tick())
+                count += 1
+            return count
+
+        self.accumulator += elapsed * self.speed
+        while self.accumulator >= self.dt and count < self.max_steps_per_frame:
+            step(self.tick())
+            self.accumulator -= self.dt
+            count += 1
+
+        # frames dropped by the renderer are caught up above, anything beyond the cap is discarded
+        if count == self.max_steps_per_frame:
+            self.accumulator = min(self.accumulator, self.dt)
+        return count
+
+
+def interpolate(prev, current, alpha):  # pose (x, y, theta) between two steps for rendering
+    d_theta = math.atan2(math.sin(current[2] - prev[2]), math.cos(current[2] - prev[2]))
+    return (prev[0] + (current[0] - prev[0]) * alpha,
+            prev[1] + (current[1] - prev[1]) * alpha,
+            prev[2] + d_theta * alpha)
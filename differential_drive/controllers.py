@@ -0,0 +1,146 @@
+"""
+
+   Vectorized Controller Kernels for Differential Drive Robots
+
+   Kernels are plain functions over floats or NumPy arrays (one element per robot), so one call computes the
+   commands of a whole fleet. Controller state (PID error sum and previous error) is passed in and returned,
+   nothing is kept between calls.
+
+   With out= (and scratch=) arrays the kernels write into these preallocated arrays instead of returning new
+   ones, the PID state arrays are then updated in place. RobotBatch steps its robots this way.
+
+"""
+
+import math
+import numpy as np
+
+
+def _lib(*values):  # math for scalars (faster), numpy if any value is an array
+    return np if any(isinstance(value, np.ndarray) for value in values) else math
+
+
+def p(error, Kp, out=None):  # P-control
+    if out is not None:
+        return np.multiply(Kp, error, out=out)
+    return Kp * error
+
+
+# returns (output, error_sum, error_prev)
+def pid(error, error_sum, error_prev, Kp, Ki, Kd, dt, sum_limit=math.inf, out=None, scratch=None):
+    if out is not None:  # error_sum and error_prev arrays are updated in place, scratch: 1 array
+        np.multiply(Kp, error, out=out)
+        np.multiply(Ki, error_sum, out=scratch)
+        scratch *= dt
+        out += scratch
+        np.subtract(error, error_prev, out=scratch)
+        np.multiply(Kd, scratch, out=scratch)
+        scratch /= dt
+        out += scratch
+
+        np.copyto(error_prev, error)
+        error_sum += error
+        if sum_limit != math.inf:
+            np.clip(error_sum, -sum_limit, sum_limit, out=error_sum)
+        return out, error_sum, error_prev
+
+    P = Kp * error
+    I = Ki * error_sum * dt
+    D = Kd * (error - error_prev) / dt
+    output = P + I + D
+
+    # anti-windup: the accumulated error is clamped to +-sum_limit
+    error_sum = error_sum + error
+    if sum_limit != math.inf:
+        if _lib(error_sum) is np:
+            error_sum = np.clip(error_sum, -sum_limit, sum_limit)
+        else:
+            error_sum = min(max(error_sum, -sum_limit), sum_limit)
+    return output, error_sum, error
+
+
+def distance(x, y, x_star, y_star, out=None, scratch=None):  # scratch: 1 array
+    if out is not None:
+        np.subtract(x_star, x, out=out)
+        np.multiply(out, out, out=out)
+        np.subtract(y_star, y, out=scratch)
+        np.multiply(scratch, scratch, out=scratch)
+        out += scratch
+        return np.sqrt(out, out=out)
+    return _lib(x, y, x_star, y_star).sqrt((x_star - x) ** 2 + (y_star - y) ** 2)
+
+
+# error angle between heading and the direction to (x_star, y_star), scratch: 2 arrays
+def error_theta(x, y, theta, x_star, y_star, out=None, scratch=None):
+    if out is not None:
+        a, b = scratch
+        np.subtract(y_star, y, out=a)
+        np.subtract(x_star, x, out=b)
+        np.arctan2(a, b, out=out)
+        out -= theta
+        np.sin(out, out=a)
+        np.cos(out, out=b)
+        return np.arctan2(a, b, out=out)
+    if _lib(x, y, theta, x_star, y_star) is math:
+        theta = math.atan2(y_star - y, x_star - x) - theta
+        return math.atan2(math.sin(theta), math.cos(theta))
+    theta = np.arctan2(y_star - y, x_star - x) - theta
+    return np.arctan2(np.sin(theta), np.cos(theta))
+
+
+# P-control of the heading, returns (w, e_theta), scratch: 3 arrays (e_theta is written into the first)
+def heading(x, y, theta, x_star, y_star, Kp_w, out=None, scratch=None):
+    if out is not None:
+        e_theta = error_theta(x, y, theta, x_star, y_star, scratch[0], scratch[1:3])
+        return np.multiply(Kp_w, e_theta, out=out), e_theta
+    e_theta = error_theta(x, y, theta, x_star, y_star)
+    return Kp_w * e_theta, e_theta
+
+
+def wheel_speeds(v, w, width, out=None, scratch=None):  # (vr, vl) of the linear and angular velocity, scratch: 1 array
+    if out is not None:
+        vr, vl = out
+        np.multiply(w, width, out=scratch)
+        np.multiply(v, 2, out=vr)
+        vr += scratch
+        vr /= 2
+        np.multiply(v, 2, out=vl)
+        vl -= scratch
+        vl /= 2
+        return vr, vl
+    return (2 * v + w * width) / 2, (2 * v - w * width) / 2
+
+
+# returns (vr, vl, w, distance), out: these arrays written in place, scratch: 4 arrays
+def go_to_goal(x, y, theta, x_goal, y_goal, Kp_v, Kp_w, width, out=None, scratch=None):
+    if out is not None:
+        vr, vl, w, d = out
+        distance(x, y, x_goal, y_goal, d, scratch[0])
+        heading(x, y, theta, x_goal, y_goal, Kp_w, w, scratch[1:4])
+        wheel_speeds(p(d, Kp_v, scratch[0]), w, width, (vr, vl), scratch[1])
+        return out
+
+    d = distance(x, y, x_goal, y_goal)
+    w, _ = heading(x, y, theta, x_goal, y_goal, Kp_w)
+    vr, vl = wheel_speeds(p(d, Kp_v), w, width)
+    return vr, vl, w, d
+
+
+# returns (vr, vl, w, follow_dist, error_sum, error_prev)
+# out: (vr, vl, w, follow_dist) arrays written in place (error_sum and error_prev too), scratch: 5 arrays
+def follow_distance(x, y, theta, x_target, y_target, d_star, error_sum, error_prev, Kp_v, Ki_v, Kd_v, Kp_w, dt, width,
+                    sum_limit=math.inf, out=None, scratch=None):
+    if out is not None:
+        vr, vl, w, follow_dist = out
+        error, v = scratch[:2]
+        distance(x, y, x_target, y_target, follow_dist, error)
+        np.subtract(follow_dist, d_star, out=error)
+        pid(error, error_sum, error_prev, Kp_v, Ki_v, Kd_v, dt, sum_limit, v, scratch[2])
+        heading(x, y, theta, x_target, y_target, Kp_w, w, scratch[2:5])
+        wheel_speeds(v, w, width, (vr, vl), error)
+        return vr, vl, w, follow_dist, error_sum, error_prev
+
+    follow_dist = distance(x, y, x_target, y_target)
+    v, error_sum, error_prev = pid(follow_dist - d_star, error_sum, error_prev, Kp_v, Ki_v, Kd_v, dt, sum_limit)
+    w, _ = heading(x, y, theta, x_target, y_target, Kp_w)
+    vr, vl = wheel_speeds(v, w, width)
+    return vr, vl, w, follow_dist, error_sum, error_prev
@@ -0,0 +1,177 @@
+"""
+
+   Pose Estimators for Differential Drive Robots (odometry and extended Kalman filter)
+
+   The estimators run alongside the true pose of a RobotBatch and hold one estimate per robot (arrays),
+   the EKF covariances are stacked (N, 3, 3) arrays, so prediction and correction of a fleet are a few
+   array operations. Odometry integrates the wheel velocities read by the encoders, the EKF corrects it
+   with a measured pose or with range / bearing measurements of the nearest landmark.
+
+"""
+
+import math
+import numpy as np
+
+LANDMARK_EPS = 1e-9  # squared distance below which an estimate is on its landmark
+
+
+def _wrap(angle):  # angle in [-pi, pi)
+    return (angle + math.pi) % (2 * math.pi) - math.pi
+
+
+def _inv3(S):  # inverse of stacked 3x3 matrices (cofactors, faster than np.linalg.inv for small matrices)
+    a, b, c = S[:, 0, 0], S[:, 0, 1], S[:, 0, 2]
+    d, e, f = S[:, 1, 0], S[:, 1, 1], S[:, 1, 2]
+    g, h, i = S[:, 2, 0], S[:, 2, 1], S[:, 2, 2]
+    A = e * i - f * h
+    B = f * g - d * i
+    C = d * h - e * g
+    inverse = np.stack((np.stack((A, c * h - b * i, b * f - c * e), axis=1),
+                        np.stack((B, a * i - c * g, c * d - a * f), axis=1),
+                        np.stack((C, b * g - a * h, a * e - b * d), axis=1)), axis=1)
+    return inverse / (a * A + b * B + c * C)[:, None, None]
+
+
+def _inv2(S):  # inverse of stacked 2x2 matrices
+    a, b, c, d = S[:, 0, 0], S[:, 0, 1], S[:, 1, 0], S[:, 1, 1]
+    inverse = np.stack((np.stack((d, -b), axis=1), np.stack((-c, a), axis=1)), axis=1)
+    return inverse / (a * d - b * c)[:, None, None]
+
+
+class Odometry:  # dead reckoning of N robots from the wheel velocities (euler, same model as the robots)
+    def __init__(self, robot_x, robot_y, robot_theta, every=1):
+        n = np.broadcast(np.asarray(robot_x), np.asarray(robot_y), np.asarray(robot_theta)).size
+
+        # estimated pose (one element per robot)
+        self.x = np.array(np.broadcast_to(robot_x, (n,)), dtype=np.float64)
+        self.y = np.array(np.broadcast_to(robot_y, (n,)), dtype=np.float64)
+        self.theta = np.array(np.broadcast_to(robot_theta, (n,)), dtype=np.float64)
+
+        # measurement updates every <every> steps (odometry has none)
+        self.every = every
+        self.count = 0
+
+    def __len__(self):
+        return self.x.shape[0]
+
+    def predict(self, vr, vl, width, dt):  # pose update of the wheel velocities read by the encoders
+        v_velocity = (vr + vl) / 2
+        w_velocity = (vr - vl) / width
+        self.x += v_velocity * np.cos(self.theta) * dt
+        self.y += v_velocity * np.sin(self.theta) * dt
+        self.theta = _wrap(self.theta + w_velocity * dt)
+        return v_velocity
+
+    def observe(self, x, y, theta, noise=None):  # measurement of the true pose, every <every> calls
+        self.count += 1
+        if self.count < self.every:
+            return False
+        self.count = 0
+        self.correct(x, y, theta, noise)
+        return True
+
+    def correct(self, x, y, theta, noise):  # dead reckoning ignores the measurements
+        pass
+
+
+class EKF(Odometry):  # extended Kalman filter: odometry prediction, pose or nearest-landmark correction
+    def __init__(self, robot_x, robot_y, robot_theta, wheel_sigma=1, position_sigma=1, theta_sigma=0.01,
+                 landmarks=None, every=1, initial_sigma=(1, 1, 0.01)):
+        super().__init__(robot_x, robot_y, robot_theta, every)
+        n = len(self)
+
+        # noise model of the filter (standard deviations, scalars or one element per robot)
+        self.wheel_sigma = wheel_sigma  # encoder wheel velocities
+        self.position_sigma = position_sigma  # measured position / landmark range
+        self.theta_sigma = theta_sigma  # measured heading / landmark bearing
+
+        # landmarks (M, 2) of the range / bearing measurement, None: the pose is measured
+        self.landmarks = None if landmarks is None else np.asarray(landmarks, dtype=np.float64).reshape(-1, 2)
+
+        # covariance of the estimate (N, 3, 3)
+        self.P = np.zeros((n, 3, 3))
+        self.P[:, [0, 1, 2], [0, 1, 2]] = np.square(initial_sigma)
+
+    def predict(self, vr, vl, width, dt):
+        theta = self.theta.copy()
+        v_velocity = super().predict(vr, vl, width, dt)
+        n = len(self)
+
+        # Jacobians of the motion model for the pose (F) and the wheel velocities (G)
+        cos = np.cos(theta) * dt
+        sin = np.sin(theta) * dt
+        F = np.zeros((n, 3, 3))
+        F[:, [0, 1, 2], [0, 1, 2]] = 1
+        F[:, 0, 2] = -v_velocity * sin
+        F[:, 1, 2] = v_velocity * cos
+        G = np.empty((n, 3, 2))
+        G[:, 0, 0] = G[:, 0, 1] = cos / 2
+        G[:, 1, 0] = G[:, 1, 1] = sin / 2
+        G[:, 2, 0] = dt / width
+        G[:, 2, 1] = -dt / width
+
+        # P = F P F^T + G M G^T, M = diag(wheel_sigma^2)
+        M = np.reshape(np.square(self.wheel_sigma), (-1, 1, 1))
+        self.P = F @ self.P @ F.transpose(0, 2, 1) + (G * M) @ G.transpose(0, 2, 1)
+        return v_velocity
+
+    def _update(self, innovation, H, R, inverse):  # Kalman update of the stacked measurements
+        PHT = self.P @ H.transpose(0, 2, 1)
+        K = PHT @ inverse(H @ PHT + R)
+        correction = (K @ innovation[:, :, None])[:, :, 0]
+        self.x += correction[:, 0]
+        self.y += correction[:, 1]
+        self.theta = _wrap(self.theta + correction[:, 2])
+        self.P = self.P - K @ H @ self.P
+
+    def update_pose(self, z_x, z_y, z_theta):  # measured pose
+        n = len(self)
+        innovation = np.stack((z_x - self.x, z_y - self.y, _wrap(z_theta - self.theta)), axis=1)
+        H = np.broadcast_to(np.eye(3), (n, 3, 3))
+        R = np.zeros((n, 3, 3))
+        R[:, 0, 0] = R[:, 1, 1] = np.square(self.position_sigma)
+        R[:, 2, 2] = np.square(self.theta_sigma)
+        self._update(innovation, H, R, _inv3)
+
+    def update_landmark(self, z_range, z_bearing, index):  # range and bearing of landmarks[index] (one per robot)
+        n = len(self)
+        dx = self.landmarks[index, 0] - self.x
+        dy = self.landmarks[index, 1] - self.y
+        q = dx ** 2 + dy ** 2
+        # bearing undefined for an estimate on its landmark: these robots are left out of the update (H = 0)
+        valid = q > LANDMARK_EPS
+        q = np.where(valid, q, 1)
+        r = np.sqrt(q)
+        innovation = np.stack((z_range - r, _wrap(z_bearing - (np.arctan2(dy, dx) - self.theta))), axis=1)
+        innovation[~valid] = 0
+        H = np.zeros((n, 2, 3))
+        H[:, 0, 0] = -dx / r
+        H[:, 0, 1] = -dy / r
+        H[:, 1, 0] = dy / q
+        H[:, 1, 1] = -dx / q
+        H[:, 1, 2] = -1
+        H[~valid] = 0
+        R = np.zeros((n, 2, 2))
+        R[:, 0, 0] = np.square(self.position_sigma)
+        R[:, 1, 1] = np.square(self.theta_sigma)
+        self._update(innovation, H, R, _inv2)
+
+    def nearest(self, x, y):  # index of the nearest landmark of every robot
+        return np.argmin((self.landmarks[:, 0] - x[:, None]) ** 2 + (self.landmarks[:, 1] - y[:, None]) ** 2, axis=1)
+
+    def correct(self, x, y, theta, noise):  # measurement of the true pose (noise: noise.NoiseModel or None)
+        if self.landmarks is None:
+            self.update_pose(*(noise.measure(x, y, theta) if noise is not None else (x, y, theta)))
+        else:
+            index = self.nearest(x, y)
+            lx = self.landmarks[index, 0]
+            ly = self.landmarks[index, 1]
+            if noise is not None:
+                z_range, z_bearing = noise.measure_landmark(x, y, theta, lx, ly)
+            else:
+                z_range = np.hypot(lx - x, ly - y)
+                z_bearing = np.arctan2(ly - y, lx - x) - theta
+            self.update_landmark(z_range, z_bearing, index)
+
+
+ESTIMATORS = {'odometry': Odometry, 'ekf': EKF}
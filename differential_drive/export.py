@@ -0,0 +1,264 @@
+"""
+
+   Offscreen Frame Export (PNG sequence or raw video stream)
+
+   usage:
+     python Follow_Trajectory_Simulation/follow_trajectory_simulation.py --headless --export frames/
+     python -m differential_drive.export run.log --output frames/ --fps 60 --size 1280x720
+     python -m differential_drive.export a.log b.log c.log --output videos/ --format raw --workers 3
+     ffmpeg -f rawvideo -pix_fmt rgb24 -s 1280x720 -r 60 -i run.rgb run.mp4
+
+   Frames are rasterized on an offscreen Environment in simulation time (one frame per 1 / fps seconds of the
+   run, not of the wall clock), so a run is exported as fast as it can be drawn. The frames are handed through
+   a bounded queue to a writer thread: PNG compression (zlib) and file writes release the GIL and overlap with
+   stepping and drawing, and the queue bounds the memory when the writer falls behind.
+
+"""
+
+import argparse
+import math
+import os
+import queue
+import struct
+import threading
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .recorder import RECORD, Replay, robot_record
+
+# robot and target images of the simulations
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROBOT_IMG = os.path.join(ROOT, 'Go_to_Goal_Simulation', 'images', 'differential_drive_robot.png')
+TARGET_IMG = os.path.join(ROOT, 'Follow_Trajectory_Simulation', 'images', 'target.png')
+
+FORMATS = ('png', 'raw')
+
+# record times within this fraction of a frame time of the frame grid are on it (rounding of the times)
+FRAME_TOLERANCE = 1e-6
+
+
+def _chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+
+def encode_png(pixels, width, height, compression=6):  # RGB24 bytes -> PNG file bytes
+    rows = np.frombuffer(pixels, dtype=np.uint8).reshape(height, width * 3)
+    scanlines = np.empty((height, width * 3 + 1), dtype=np.uint8)
+    scanlines[:, 0] = 0  # filter type None
+    scanlines[:, 1:] = rows
+    return (b'\x89PNG\r\n\x1a\n' +
+            _chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)) +
+            _chunk(b'IDAT', zlib.compress(scanlines.tobytes(), compression)) +
+            _chunk(b'IEND', b''))
+
+
+class FrameWriter:  # writes RGB24 frames in a background thread (PNG sequence in a directory or raw stream file)
+    def __init__(self, path, width, height, format='png', queue_size=16, compression=6):
+        if format not in FORMATS:
+            raise ValueError(f"unknown frame format: {format}")
+        self.path = path
+        self.width = width
+        self.height = height
+        self.format = format
+        self.compression = compression  # zlib level of the PNG frames
+
+        if format == 'png':
+            os.makedirs(path, exist_ok=True)
+            self.file = None
+        else:
+            self.file = open(path, 'wb')
+
+        # bounded queue: write() blocks only when <queue_size> frames are waiting
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.count = 0
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        index = 0
+        while True:
+            pixels = self.queue.get()
+            if pixels is None:
+                break
+            if self.error is not None:
+                continue  # drain the queue, the error is raised by write() / close()
+            try:
+                if self.format == 'png':
+                    data = encode_png(pixels, self.width, self.height, self.compression)  # no empty file on errors
+                    with open(os.path.join(self.path, f"frame_{index:06d}.png"), 'wb') as file:
+                        file.write(data)
+                else:
+                    self.file.write(pixels)
+            except Exception as error:  # any error, an exiting thread would leave write() blocked on a full queue
+                self.error = error
+            index += 1
+
+    def write(self, pixels):  # RGB24 bytes of one frame
+        if self.error is not None:
+            raise self.error
+        if len(pixels) != self.width * self.height * 3:
+            raise ValueError(f"frame of {len(pixels)} bytes, expected {self.width}x{self.height} RGB24 "
+                             f"({self.width * self.height * 3} bytes)")
+        self.queue.put(pixels)
+        self.count += 1
+
+    def close(self):
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+            if self.file is not None:
+                self.file.close()
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FrameRenderer:  # offscreen scene of one robot (and its target) drawn from trajectory log records
+    def __init__(self, width=1400, height=750, size=None, flip=True, trail_length=1250, robot_img=ROBOT_IMG,
+                 target_img=TARGET_IMG):
+        import pygame
+        from .render import Environment, Sprite, Trail
+
+        pygame.init()
+        self.pygame = pygame
+        self.environment = Environment(width, height, offscreen=True)
+        self.size = size or (width, height)  # output resolution
+
+        self.robot_sprite = Sprite(robot_img, flip=flip)
+        self.target_sprite = Sprite(target_img, resolution=360)  # always drawn at angle 0: one frame
+        self.trail_robot = Trail(width, height, self.environment.green, trail_length)
+        self.trail_target = Trail(width, height, self.environment.red, trail_length)
+
+    def render(self, record):  # RGB24 bytes of the frame of a record (RECORD fields)
+        environment = self.environment
+        environment.clear()
+
+        if not math.isnan(record['target_x']):
+            self.target_sprite.update(record['target_x'], record['target_y'])
+            environment.draw(self.target_sprite)
+            environment.trail(record['target_x'], record['target_y'], self.trail_target)
+
+        self.robot_sprite.update(record['x'], record['y'], record['theta'])
+        environment.draw(self.robot_sprite)
+        environment.trail(record['x'], record['y'], self.trail_robot)
+
+        width, height = environment.width, environment.height
+        environment.write_info([(f"t = {record['t']:.2f}", (200, height - 50)),
+                                (f"Vl = {round(float(record['vl']), 2)}", (width - 200, height - 150)),
+                                (f"Vr = {round(float(record['vr']), 2)}", (width - 200, height - 100)),
+                                (f"theta = {round(math.degrees(record['theta']), 2)}", (width - 200, height - 50))])
+
+        surface = environment.map
+        if self.size != (width, height):
+            surface = self.pygame.transform.smoothscale(surface, self.size)
+        return self.pygame.image.tobytes(surface, 'RGB')
+
+
+class Exporter:  # frames of a live or recorded run at <fps> frames per second of simulation time
+    def __init__(self, path, fps=60, size=None, format=None, width=1400, height=750, flip=True, queue_size=16,
+                 trail_length=1250, robot_img=ROBOT_IMG, target_img=TARGET_IMG):
+        if format is None:  # raw stream for .rgb / .raw files, PNG sequence otherwise
+            format = 'raw' if os.path.splitext(path)[1] in ('.rgb', '.raw') else 'png'
+        self.renderer = FrameRenderer(width, height, size, flip, trail_length, robot_img, target_img)
+        self.writer = FrameWriter(path, *self.renderer.size, format, queue_size)
+        self.fps = fps
+        self.start_t = None  # time of the first record, frames are taken at start_t + n / fps
+        self.next_frame = 0
+
+    def frame(self, record):  # render and queue the frame of a record
+        self.writer.write(self.renderer.render(record))
+
+    def add(self, record):  # record of a step of the run (in time order), frames are taken on the 1 / fps grid
+        if self.start_t is None:
+            self.start_t = record['t']
+        # position on the frame grid from the start (not summed frame times, which drift from the grid)
+        position = (record['t'] - self.start_t) * self.fps
+        if position >= self.next_frame - FRAME_TOLERANCE:
+            self.frame(record)
+            # gaps of the records are not filled
+            self.next_frame = math.floor(position + FRAME_TOLERANCE) + 1
+
+    def publish(self, t, robot, target=None):  # live run, same call as TelemetryServer.publish
+        self.add(dict(zip(RECORD.names, robot_record(t, robot, target))))
+
+    def close(self):
+        self.writer.close()
+        return self.writer.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def export_log(log, path, fps=60, size=None, format=None, flip=True):  # frames of a trajectory log, returns the count
+    replay = Replay(log)
+    exporter = Exporter(path, fps, size, format, flip=flip)
+    try:
+        if len(replay):
+            # only the records of the frame times are read from the log
+            t = replay.column('t')
+            frames = math.floor((t[-1] - t[0]) * fps + FRAME_TOLERANCE) + 1
+            for frame_t in t[0] + (np.arange(frames) + FRAME_TOLERANCE) / fps:
+                exporter.frame(replay.at(frame_t))
+    finally:
+        count = exporter.close()
+    return count
+
+
+def _export_job(args):  # process pool worker
+    return export_log(*args)
+
+
+def export_logs(jobs, workers=None):  # (log, path, fps, size, format, flip) jobs in parallel processes
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        return list(executor.map(_export_job, jobs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offscreen frame export of recorded trajectory logs')
+    parser.add_argument('logs', nargs='+', help='trajectory log files (--record of the simulations)')
+    parser.add_argument('--output', required=True,
+                        help='frame directory / stream file of one log, or the output directory of several logs')
+    parser.add_argument('--format', choices=FORMATS, default=None, help='png sequence or raw RGB24 stream')
+    parser.add_argument('--fps', type=float, default=60, help='frames per second of simulation time')
+    parser.add_argument('--size', default=None, metavar='WIDTHxHEIGHT', help='output resolution (default: map size)')
+    parser.add_argument('--no-flip', action='store_true', help='y-up heading (manual simulator logs)')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes (default: all cores)')
+    args = parser.parse_args()
+
+    size = None
+    if args.size is not None:
+        try:
+            size = tuple(int(value) for value in args.size.lower().split('x'))
+        except ValueError:
+            size = ()
+        if len(size) != 2 or min(size) < 1:
+            parser.error(f"invalid size (WIDTHxHEIGHT of two positive integers): {args.size}")
+
+    if len(args.logs) == 1:
+        paths = [args.output]
+    else:
+        os.makedirs(args.output, exist_ok=True)
+        extension = '.rgb' if args.format == 'raw' else ''
+        paths = [os.path.join(args.output, os.path.splitext(os.path.basename(log))[0] + extension)
+                 for log in args.logs]
+
+    jobs = [(log, path, args.fps, size, args.format, not args.no_flip) for log, path in zip(args.logs, paths)]
+    counts = export_logs(jobs, args.workers) if len(jobs) > 1 else [export_log(*jobs[0])]
+    for path, count in zip(paths, counts):
+        print(f"{count} frames written to {path}")
+
+
+if __name__ == '__main__':
+    main()
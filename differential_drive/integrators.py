@@ -0,0 +1,122 @@
+"""
+
+   Pose Integrators for the Unicycle Model of the Differential Drive Robot
+
+   All integrators advance (x, y, theta) over dt with the linear (v) and angular (w) velocity held
+   constant during the step, and share one kinematic model:
+
+     x' = v cos(theta)
+     y' = v sin(theta)
+     theta' = w
+
+   Arguments can be floats or NumPy arrays (one element per robot).
+
+"""
+
+import math
+import numpy as np
+
+
+def _lib(theta):  # math for scalars (faster), numpy for arrays
+    return np if isinstance(theta, np.ndarray) else math
+
+
+def unicycle(theta, v, w):  # kinematic model (state derivative)
+    lib = _lib(theta)
+    return v * lib.cos(theta), v * lib.sin(theta), w
+
+
+def euler(x, y, theta, v, w, dt):  # forward Euler (first order)
+    dx, dy, d_theta = unicycle(theta, v, w)
+    return x + dx * dt, y + dy * dt, theta + d_theta * dt
+
+
+def exact(x, y, theta, v, w, dt):  # exact arc integration (same motion as the ICC rotation matrix)
+    if not isinstance(theta, np.ndarray) and (isinstance(v, np.ndarray) or isinstance(w, np.ndarray)):
+        theta = np.full(np.broadcast(v, w).shape, theta, dtype=np.float64)  # one heading for all velocities
+    lib = _lib(theta)
+    half = w * dt / 2
+
+    # sin(half) / half is finite for straight motion (w = 0)
+    if lib is np:
+        sinc = np.sinc(half / math.pi)
+    else:
+        sinc = math.sin(half) / half if half != 0 else 1.0
+
+    chord = v * dt * sinc
+    return (x + chord * lib.cos(theta + half),
+            y + chord * lib.sin(theta + half),
+            theta + w * dt)
+
+
+def rk4(x, y, theta, v, w, dt):  # classical Runge-Kutta (fourth order)
+    dx1, dy1, dt1 = unicycle(theta, v, w)
+    dx2, dy2, dt2 = unicycle(theta + dt1 * dt / 2, v, w)
+    dx3, dy3, dt3 = unicycle(theta + dt2 * dt / 2, v, w)
+    dx4, dy4, dt4 = unicycle(theta + dt3 * dt, v, w)
+    return (x + (dx1 + 2 * dx2 + 2 * dx3 + dx4) * dt / 6,
+            y + (dy1 + 2 * dy2 + 2 * dy3 + dy4) * dt / 6,
+            theta + (dt1 + 2 * dt2 + 2 * dt3 + dt4) * dt / 6)
+
+
+# Dormand-Prince 5(4) coefficients
+_DP_C = (0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1, 1)
+_DP_A = (
+    (),
+    (1 / 5,),
+    (3 / 40, 9 / 40),
+    (44 / 45, -56 / 15, 32 / 9),
+    (19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729),
+    (9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656),
+    (35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84),
+)
+_DP_B5 = (35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84, 0)
+_DP_B4 = (5179 / 57600, 0, 7571 / 16695, 393 / 640, -92097 / 339200, 187 / 2100, 1 / 40)
+
+
+def _dormand_prince(x, y, theta, v, w, h):  # one step, returns the fifth order state and the error estimate
+    k = []
+    for stage in range(7):
+        theta_stage = theta + h * sum(a * kt for a, (_, _, kt) in zip(_DP_A[stage], k))
+        k.append(unicycle(theta_stage, v, w))
+
+    x5 = x + h * sum(b * kx for b, (kx, _, _) in zip(_DP_B5, k))
+    y5 = y + h * sum(b * ky for b, (_, ky, _) in zip(_DP_B5, k))
+    theta5 = theta + h * sum(b * kt for b, (_, _, kt) in zip(_DP_B5, k))
+    x4 = x + h * sum(b * kx for b, (kx, _, _) in zip(_DP_B4, k))
+    y4 = y + h * sum(b * ky for b, (_, ky, _) in zip(_DP_B4, k))
+
+    error = np.max(np.maximum(np.abs(x5 - x4), np.abs(y5 - y4)))
+    return x5, y5, theta5, float(error)
+
+
+def rk45(x, y, theta, v, w, dt, tol=1e-6, max_substeps=1000):  # adaptive Dormand-Prince with error control
+    t = 0
+    h = dt
+    for _ in range(max_substeps):
+        if dt - t <= dt * 1e-12:
+            break
+        h = min(h, dt - t)
+        x_new, y_new, theta_new, error = _dormand_prince(x, y, theta, v, w, h)
+        if error <= tol or h <= dt * 1e-6:
+            x, y, theta = x_new, y_new, theta_new
+            t += h
+        # step size control (safety factor 0.9, growth limited to 5x)
+        scale = 5 if error == 0 else min(5, max(0.2, 0.9 * (tol / error) ** 0.2))
+        h *= scale
+    else:
+        # substeps used up: the rest of dt in one step without error control, the pose always covers dt
+        if dt - t > dt * 1e-12:
+            x, y, theta, _ = _dormand_prince(x, y, theta, v, w, dt - t)
+    return x, y, theta
+
+
+INTEGRATORS = {'euler': euler, 'exact': exact, 'rk4': rk4, 'rk45': rk45}
+
+
+def get_integrator(integrator):  # integrator function from its name (functions are returned unchanged)
+    if callable(integrator):
+        return integrator
+    if integrator not in INTEGRATORS:
+        raise ValueError(f"unknown integrator: {integrator}")
+    return INTEGRATORS[integrator]
@@ -0,0 +1,250 @@
+"""
+
+   Compiled Multi-Step Kernels (optional Numba) for Long-Horizon Runs
+
+   Each kernel runs <steps> steps of a controller and the pose update for every robot of the state arrays
+   (updated in place, with the wheel and body velocities of the last step), so Python is only touched once
+   per call. With Numba installed the kernels are compiled on first use. Without it the kernels run as plain
+   Python, which is slower than robot.step(): advance() then falls back to a loop of robot.step() (same
+   results), advance_batch() still runs the plain Python kernels.
+
+   The kernels follow the robot models of robot.py step for step (euler for the controllers, exact arc for
+   the manual ICC update), including the heading reset and wrap.
+
+"""
+
+import math
+import numpy as np
+
+from .integrators import euler, exact
+from .robot import FollowTrajectoryRobot, GoToGoalRobot, ManualRobot, Target
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:  # pure-Python fallback
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda fn: fn
+
+# distance where the go-to-goal robot stops (GoToGoalRobot.move)
+STOP_DISTANCE = 0.1 * 3779.52
+
+
+@njit(cache=True)
+def _reset_theta(theta):
+    if theta > 2 * math.pi or theta < -2 * math.pi:
+        theta = 0.0
+    if theta < 0:
+        theta = 2 * math.pi + theta
+    return theta
+
+
+@njit(cache=True)
+def go_to_goal(x, y, theta, x_goal, y_goal, Kp_v, Kp_w, width, dt, steps, vr, vl, v_velocity,
+               w_velocity):  # arrays: one element per robot, vr .. w_velocity: commands of the last step
+    for i in range(x.shape[0]):
+        xi = x[i]
+        yi = y[i]
+        ti = theta[i]
+        vr_i = vr[i]
+        vl_i = vl[i]
+        v_command = v_velocity[i]
+        w_command = w_velocity[i]
+        for _ in range(steps):
+            distance = math.sqrt((x_goal[i] - xi) ** 2 + (y_goal[i] - yi) ** 2)
+            v_command = Kp_v[i] * distance
+            e_theta = math.atan2(y_goal[i] - yi, x_goal[i] - xi) - ti
+            e_theta = math.atan2(math.sin(e_theta), math.cos(e_theta))
+            w_command = Kp_w[i] * e_theta
+            vr_i = (2 * v_command + w_command * width) / 2
+            vl_i = (2 * v_command - w_command * width) / 2
+
+            if distance == STOP_DISTANCE:
+                v_move = 0.0
+                w_move = 0.0
+            else:
+                v_move = (vr_i + vl_i) / 2
+                w_move = w_command
+
+            xi = xi + v_move * math.cos(ti) * dt
+            yi = yi + v_move * math.sin(ti) * dt
+            ti = _reset_theta(ti + w_move * dt)
+        x[i] = xi
+        y[i] = yi
+        theta[i] = ti
+        vr[i] = vr_i
+        vl[i] = vl_i
+        v_velocity[i] = v_command
+        w_velocity[i] = w_command
+
+
+@njit(cache=True)
+def follow_trajectory(x, y, theta, d_star, e_distance_sum, e_distance_prev, Kp_v, Ki_v, Kd_v, Kp_w, width, dt,
+                      start_step, steps, sum_limit, follow_dist, vr, vl, v_velocity,
+                      w_velocity):  # PID follower of Target, target time of step k is k * dt
+    for i in range(x.shape[0]):
+        xi = x[i]
+        yi = y[i]
+        ti = theta[i]
+        e_sum = e_distance_sum[i]
+        e_prev = e_distance_prev[i]
+        distance = follow_dist[i]
+        vr_i = vr[i]
+        vl_i = vl[i]
+        v_command = v_velocity[i]
+        w_command = w_velocity[i]
+        for k in range(start_step, start_step + steps):
+            t = k * dt
+            x_target = 300 + t * 50
+            y_target = 200 + 60 * math.cos(t)
+
+            distance = math.sqrt((x_target - xi) ** 2 + (y_target - yi) ** 2)
+            e_distance = distance - d_star[i]
+            P = Kp_v[i] * e_distance
+            I = Ki_v[i] * e_sum * dt
+            D = Kd_v[i] * (e_distance - e_prev) / dt
+            v_command = P + I + D
+            e_prev = e_distance
+            e_sum = min(max(e_sum + e_distance, -sum_limit), sum_limit)  # anti-windup
+
+            e_theta = math.atan2(y_target - yi, x_target - xi) - ti
+            e_theta = math.atan2(math.sin(e_theta), math.cos(e_theta))
+            w_command = Kp_w[i] * e_theta
+            vr_i = (2 * v_command + w_command * width) / 2
+            vl_i = (2 * v_command - w_command * width) / 2
+            v_move = (vr_i + vl_i) / 2
+
+            xi = xi + v_move * math.cos(ti) * dt
+            yi = yi + v_move * math.sin(ti) * dt
+            ti = _reset_theta(ti + w_command * dt)
+        x[i] = xi
+        y[i] = yi
+        theta[i] = ti
+        e_distance_sum[i] = e_sum
+        e_distance_prev[i] = e_prev
+        follow_dist[i] = distance
+        vr[i] = vr_i
+        vl[i] = vl_i
+        v_velocity[i] = v_command
+        w_velocity[i] = w_command
+
+
+@njit(cache=True)
+def icc(x, y, theta, vl, vr, width, dt, steps, v_velocity,
+        w_velocity):  # manual robot with constant wheel velocities (exact arc update)
+    for i in range(x.shape[0]):
+        xi = x[i]
+        yi = -y[i]  # y axis up
+        ti = theta[i]
+        w_i = (vr[i] - vl[i]) / width
+        v_i = (vr[i] + vl[i]) / 2
+        half = w_i * dt / 2
+        sinc = math.sin(half) / half if half != 0 else 1.0
+        chord = v_i * dt * sinc
+        for _ in range(steps):
+            xi = xi + chord * math.cos(ti + half)
+            yi = yi + chord * math.sin(ti + half)
+            ti = _reset_theta(ti + w_i * dt)
+        if steps > 0:
+            v_velocity[i] = v_i
+            w_velocity[i] = w_i
+        x[i] = xi
+        y[i] = -yi
+        theta[i] = ti
+
+
+def _state(*values):
+    return [np.array([value], dtype=np.float64) for value in values]
+
+
+def _step_loop(robot, steps, start_step):  # advance() without Numba, robot.step() beats the uncompiled kernels
+    if isinstance(robot, GoToGoalRobot):
+        if robot.waypoints:
+            raise ValueError("the go-to-goal kernel has no waypoint following")
+        for _ in range(steps):
+            robot.step()
+    elif isinstance(robot, FollowTrajectoryRobot):
+        for k in range(start_step, start_step + steps):
+            robot.step(Target.position(k * robot.dt))
+    elif isinstance(robot, ManualRobot):
+        for _ in range(steps):
+            robot.step()
+    else:
+        raise ValueError(f"no kernel for {type(robot).__name__}")
+    return robot
+
+
+def advance(robot, steps, start_step=0):  # run <steps> steps of a robot of robot.py in one kernel call
+    if robot.integrator is not (exact if isinstance(robot, ManualRobot) else euler):
+        raise ValueError("the kernels only implement the default integrator of the robot")
+
+    if not HAVE_NUMBA:
+        return _step_loop(robot, steps, start_step)
+
+    # wheel and body velocities of the last step (unchanged for steps = 0)
+    vr, vl, v_velocity, w_velocity = _state(robot.vr, robot.vl, robot.v_velocity, robot.w_velocity)
+    if isinstance(robot, GoToGoalRobot):
+        if robot.waypoints:
+            raise ValueError("the go-to-goal kernel has no waypoint following")
+        x, y, theta, x_goal, y_goal, Kp_v, Kp_w = _state(robot.x, robot.y, robot.theta, robot.x_g, robot.y_g,
+                                                         robot.Kp_v, robot.Kp_w)
+        go_to_goal(x, y, theta, x_goal, y_goal, Kp_v, Kp_w, robot.width, robot.dt, steps, vr, vl, v_velocity,
+                   w_velocity)
+    elif isinstance(robot, FollowTrajectoryRobot):
+        x, y, theta, d_star, e_sum, e_prev, Kp_v, Ki_v, Kd_v, Kp_w, follow_dist = _state(
+            robot.x, robot.y, robot.theta, robot.d_star, robot.e_distance_sum, robot.e_distance_prev, robot.Kp_v,
+            robot.Ki_v, robot.Kd_v, robot.Kp_w, robot.follow_dist)
+        follow_trajectory(x, y, theta, d_star, e_sum, e_prev, Kp_v, Ki_v, Kd_v, Kp_w, robot.width, robot.dt,
+                          start_step, steps, math.inf, follow_dist, vr, vl, v_velocity, w_velocity)
+        robot.e_distance_sum = float(e_sum[0])
+        robot.e_distance_prev = float(e_prev[0])
+        robot.follow_dist = float(follow_dist[0])
+        if steps > 0:
+            robot.x_target, robot.y_target = Target.position((start_step + steps - 1) * robot.dt)
+    elif isinstance(robot, ManualRobot):
+        x, y, theta = _state(robot.x, robot.y, robot.theta)
+        icc(x, y, theta, np.array([robot.vl], dtype=np.float64), np.array([robot.vr], dtype=np.float64),
+            robot.width, robot.dt, steps, v_velocity, w_velocity)
+    else:
+        raise ValueError(f"no kernel for {type(robot).__name__}")
+
+    robot.x = float(x[0])
+    robot.y = float(y[0])
+    robot.theta = float(theta[0])
+    robot.vr = float(vr[0])
+    robot.vl = float(vl[0])
+    robot.v_velocity = float(v_velocity[0])
+    robot.w_velocity = float(w_velocity[0])
+    return robot
+
+
+def advance_batch(batch, mode, steps, start_step=0, x_goal=None, y_goal=None):  # RobotBatch in one kernel call
+    if batch.integrator not in (None, exact if mode == 'icc' else euler):
+        raise ValueError("the kernels only implement the default integrator of the batch")
+    if batch.noise is not None or batch.estimator is not None:
+        raise ValueError("the kernels have no noise model or estimator (deterministic kinematics on the true pose)")
+
+    n = len(batch)
+    if mode == 'go_to_goal':
+        go_to_goal(batch.x, batch.y, batch.theta, np.broadcast_to(np.asarray(x_goal, dtype=np.float64), (n,)),
+                   np.broadcast_to(np.asarray(y_goal, dtype=np.float64), (n,)), batch.Kp_v, batch.Kp_w,
+                   batch.width, batch.dt, steps, batch.vr, batch.vl, batch.v_velocity, batch.w_velocity)
+    elif mode == 'follow_trajectory':
+        follow_trajectory(batch.x, batch.y, batch.theta, batch.d_star, batch.e_distance_sum, batch.e_distance_prev,
+                          batch.Kp_v, batch.Ki_v, batch.Kd_v, batch.Kp_w, batch.width, batch.dt, start_step, steps,
+                          batch.sum_limit, batch.follow_dist, batch.vr, batch.vl, batch.v_velocity, batch.w_velocity)
+    elif mode == 'icc':
+        icc(batch.x, batch.y, batch.theta, batch.vl, batch.vr, batch.width, batch.dt, steps, batch.v_velocity,
+            batch.w_velocity)
+    else:
+        raise ValueError(f"unknown kernel mode: {mode}")
+
+    # the batch keeps the body velocity of its wheel velocities (RobotBatch._wheel_velocity)
+    if steps > 0 and mode != 'icc':
+        np.add(batch.vr, batch.vl, out=batch.v_velocity)
+        batch.v_velocity /= 2
+    return batch
@@ -0,0 +1,128 @@
+"""
+
+   Noise, Wheel-Slip and Actuator Limit Models with Reproducible Per-Robot Random Streams
+
+   Every robot has its own counter-based random stream, the Philox4x64-10 stream of NumPy
+   (np.random.Philox(key=seed)). Block k of a stream (random words 4k..4k+3 of random_raw()) is a pure
+   function of the seed and k, so the blocks of all robots of a step are computed at once with array
+   operations, and a run is replayed exactly from its seed whatever batch it ran in.
+
+"""
+
+import math
+import numpy as np
+
+# Philox4x64-10 constants (multipliers and Weyl key increments)
+_M0 = 0xD2E7470EE14C6C93
+_M1 = 0xCA5A826395121157
+_W0 = np.uint64(0x9E3779B97F4A7C15)
+_W1 = np.uint64(0xBB67AE8584CAA73B)
+_LOW = np.uint64(0xFFFFFFFF)
+_SHIFT = np.uint64(32)
+
+# channels of the normal samples of a step
+WHEEL_R, WHEEL_L, SLIP_R, SLIP_L, POSE_X, POSE_Y, POSE_THETA = range(7)
+
+
+def _mulhilo(a, m):  # high and low word of the 128 bit product of the uint64 array a and the constant m
+    ah = a >> _SHIFT
+    al = a & _LOW
+    mh = np.uint64(m >> 32)
+    ml = np.uint64(m & 0xFFFFFFFF)
+    ll = al * ml
+    lh = al * mh
+    hl = ah * ml
+    carry = ((ll >> _SHIFT) + (lh & _LOW) + (hl & _LOW)) >> _SHIFT
+    return ah * mh + (lh >> _SHIFT) + (hl >> _SHIFT) + carry, a * np.uint64(m)
+
+
+def philox(counter, key0, key1):  # Philox4x64-10 block of a 64 bit counter, returns the 4 words (uint64 arrays)
+    zero = np.zeros_like(key0)
+    c0, c1, c2, c3 = counter + zero, zero, zero, zero
+    with np.errstate(over='ignore'):
+        for _ in range(10):
+            hi0, lo0 = _mulhilo(c0, _M0)
+            hi1, lo1 = _mulhilo(c2, _M1)
+            c0, c1, c2, c3 = hi1 ^ c1 ^ key0, lo1, hi0 ^ c3 ^ key1, lo0
+            key0 = key0 + _W0
+            key1 = key1 + _W1
+    return c0, c1, c2, c3
+
+
+class Streams:  # one random stream per robot, indexed by block number
+    def __init__(self, seeds):
+        seeds = [int(seed) for seed in np.atleast_1d(seeds)]
+        if any(seed < 0 or seed >= 1 << 128 for seed in seeds):
+            raise ValueError("seeds must be integers in [0, 2**128)")
+        self.seeds = seeds
+        self.key0 = np.array([seed & 0xFFFFFFFFFFFFFFFF for seed in seeds], dtype=np.uint64)
+        self.key1 = np.array([seed >> 64 for seed in seeds], dtype=np.uint64)
+
+    def __len__(self):
+        return len(self.seeds)
+
+    def raw(self, block):  # (4, n) uint64, words 4 * block .. 4 * block + 3 of np.random.Philox(key=seed)
+        # NumPy increments the counter before a block is generated
+        return np.stack(philox(np.uint64(block + 1), self.key0, self.key1))
+
+    def normal(self, block):  # (8, n) standard normal samples (Box-Muller of the 32 bit halves of the words)
+        words = self.raw(block)
+        u1 = ((words & _LOW) + 1) / 2.0 ** 32  # (0, 1]
+        u2 = (words >> _SHIFT) / 2.0 ** 32  # [0, 1)
+        r = np.sqrt(-2 * np.log(u1))
+        return np.concatenate((r * np.cos(2 * math.pi * u2), r * np.sin(2 * math.pi * u2)))
+
+
+class NoiseModel:  # wheel velocity noise, slip, velocity / acceleration limits and pose sensor noise of N robots
+    def __init__(self, seeds, wheel_sigma=0, slip=0, slip_sigma=0, v_max=math.inf, a_max=math.inf, position_sigma=0,
+                 theta_sigma=0):
+        self.streams = Streams(seeds)
+        n = len(self.streams)
+
+        # parameters (scalars or one element per robot)
+        self.wheel_sigma = wheel_sigma  # standard deviation of the wheel velocities
+        self.slip = slip  # mean slip factor (0: no slip, 1: wheels spin in place)
+        self.slip_sigma = slip_sigma  # standard deviation of the slip factor
+        self.v_max = v_max  # wheel velocity limit
+        self.a_max = a_max  # wheel acceleration limit
+        self.position_sigma = position_sigma  # standard deviation of the measured position (and landmark range)
+        self.theta_sigma = theta_sigma  # standard deviation of the measured heading (and landmark bearing)
+
+        # stream position and samples of the current step
+        self.step = 0
+        self.sample = None
+
+        # wheel velocities of the actuators (acceleration limit), the robots start at rest
+        self.vr = np.zeros(n)
+        self.vl = np.zeros(n)
+
+    def __len__(self):
+        return len(self.streams)
+
+    def draw(self):  # samples of the next step, call once per step before measure() and wheels()
+        self.sample = self.streams.normal(self.step)
+        self.step += 1
+
+    def measure(self, x, y, theta):  # pose seen by the controllers
+        return (x + self.position_sigma * self.sample[POSE_X],
+                y + self.position_sigma * self.sample[POSE_Y],
+                theta + self.theta_sigma * self.sample[POSE_THETA])
+
+    def measure_landmark(self, x, y, theta, x_landmark, y_landmark):  # range (position_sigma) and bearing (theta_sigma)
+        dx = x_landmark - x
+        dy = y_landmark - y
+        return (np.hypot(dx, dy) + self.position_sigma * self.sample[POSE_X],
+                np.arctan2(dy, dx) - theta + self.theta_sigma * self.sample[POSE_THETA])
+
+    def _actuator(self, command, previous, dt):
+        velocity = previous + np.clip(command - previous, -self.a_max * dt, self.a_max * dt)
+        return np.clip(velocity, -self.v_max, self.v_max)
+
+    def wheels(self, vr, vl, dt):  # wheel velocities commanded by the controllers -> wheel velocities of the motion
+        self.vr = self._actuator(vr, self.vr, dt)
+        self.vl = self._actuator(vl, self.vl, dt)
+
+        slip_r = np.clip(self.slip + self.slip_sigma * self.sample[SLIP_R], 0, 1)
+        slip_l = np.clip(self.slip + self.slip_sigma * self.sample[SLIP_L], 0, 1)
+        return (self.vr * (1 - slip_r) + self.wheel_sigma * self.sample[WHEEL_R],
+                self.vl * (1 - slip_l) + self.wheel_sigma * self.sample[WHEEL_L])
@@ -0,0 +1,134 @@
+"""
+
+   Occupancy Grid Map and Vectorized Range Sensors
+
+   The grid is indexed [row, column] = [y, x] in window coordinates (y axis down), like the controller
+   simulations. Headings of the manual simulator (y axis up) are mirrored with theta -> -theta.
+
+"""
+
+import math
+import numpy as np
+
+
+class OccupancyGrid:
+    def __init__(self, grid, resolution=1, outside_occupied=True):
+        # occupancy data (nonzero cells are occupied), a memory-mapped array stays on disk
+        self.grid = grid
+        self.resolution = resolution  # cell size in pixels
+        self.outside_occupied = outside_occupied  # cells outside of the map stop the beams
+        self.rows, self.cols = grid.shape
+
+        # map dimensions in pixels
+        self.width = self.cols * resolution
+        self.height = self.rows * resolution
+
+    @classmethod
+    def from_npy(cls, path, resolution=1, mmap=True, outside_occupied=True):  # large maps are memory-mapped
+        return cls(np.load(path, mmap_mode='r' if mmap else None), resolution, outside_occupied)
+
+    @classmethod
+    def from_png(cls, path, resolution=1, threshold=128, outside_occupied=True):  # dark pixels are occupied
+        import pygame  # image decoding uses the optional renderer dependency
+
+        pixels = pygame.surfarray.array3d(pygame.image.load(path))  # [x, y, rgb]
+        return cls(np.ascontiguousarray(pixels.mean(axis=2).T < threshold), resolution, outside_occupied)
+
+    @classmethod
+    def empty(cls, width, height, resolution=1, outside_occupied=True):
+        return cls(np.zeros((math.ceil(height / resolution), math.ceil(width / resolution)), dtype=bool),
+                   resolution, outside_occupied)
+
+    def save(self, path):
+        np.save(path, np.asarray(self.grid))
+
+    def cell(self, x, y):  # (row, column) of window coordinates
+        return (np.floor(np.asarray(y) / self.resolution).astype(np.int64),
+                np.floor(np.asarray(x) / self.resolution).astype(np.int64))
+
+    def _occupied_cells(self, row, col):
+        inside = (row >= 0) & (row < self.rows) & (col >= 0) & (col < self.cols)
+        occupied = np.full(np.shape(row), self.outside_occupied)
+        occupied[inside] = self.grid[row[inside], col[inside]] != 0
+        return occupied
+
+    def occupied(self, x, y):
+        row, col = self.cell(x, y)
+        return self._occupied_cells(np.atleast_1d(row), np.atleast_1d(col)).reshape(np.shape(row))
+
+    def fill_rect(self, x, y, width, height, value=1):  # mark a rectangle (window coordinates) as occupied
+        row0, col0 = self.cell(x, y)
+        row1, col1 = self.cell(x + width, y + height)
+        if row1 < 0 or col1 < 0 or row0 >= self.rows or col0 >= self.cols:  # off the map
+            return
+        self.grid[max(row0, 0):min(row1, self.rows - 1) + 1, max(col0, 0):min(col1, self.cols - 1) + 1] = value
+
+    def raycast(self, x, y, angle, max_range):  # distances to the first occupied cell, all rays in one DDA pass
+        x, y, angle = np.broadcast_arrays(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64),
+                                          np.asarray(angle, dtype=np.float64))
+        shape = x.shape
+        ox = x.ravel()
+        oy = y.ravel()
+        dx = np.cos(angle.ravel())
+        dy = np.sin(angle.ravel())
+        distance = np.full(ox.size, float(max_range))
+        res = self.resolution
+
+        # current cell and step direction of every ray
+        row, col = self.cell(ox, oy)
+        step_col = np.where(dx > 0, 1, -1)
+        step_row = np.where(dy > 0, 1, -1)
+
+        # ray length to the next vertical / horizontal cell border and between borders
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t_delta_x = np.where(dx != 0, res / np.abs(dx), np.inf)
+            t_delta_y = np.where(dy != 0, res / np.abs(dy), np.inf)
+            t_max_x = np.where(dx != 0, ((col + (step_col > 0)) * res - ox) / dx, np.inf)
+            t_max_y = np.where(dy != 0, ((row + (step_row > 0)) * res - oy) / dy, np.inf)
+        t = np.zeros(ox.size)
+
+        active = np.arange(ox.size)
+        while active.size:
+            hit = self._occupied_cells(row[active], col[active])
+            distance[active[hit]] = np.minimum(t[active[hit]], max_range)
+
+            # rays continue until they hit a cell or leave the range
+            keep = ~hit & (t[active] < max_range)
+            active = active[keep]
+
+            x_first = t_max_x[active] < t_max_y[active]
+            a = active[x_first]
+            col[a] += step_col[a]
+            t[a] = t_max_x[a]
+            t_max_x[a] += t_delta_x[a]
+            a = active[~x_first]
+            row[a] += step_row[a]
+            t[a] = t_max_y[a]
+            t_max_y[a] += t_delta_y[a]
+
+        return distance.reshape(shape)
+
+
+class RangeSensor:  # lidar / range finder with beams spread over the field of view
+    def __init__(self, beams=16, fov=2 * math.pi, max_range=300, offset=0):
+        self.beams = beams
+        self.max_range = max_range
+
+        # beam angles relative to the heading of the robot
+        if beams == 1:
+            self.angles = np.array([offset], dtype=np.float64)
+        elif fov >= 2 * math.pi:
+            self.angles = offset + np.arange(beams) * 2 * math.pi / beams
+        else:
+            self.angles = offset + np.linspace(-fov / 2, fov / 2, beams)
+
+    def scan(self, grid, x, y, theta):  # distances [robot, beam] of all robots in one batched raycast
+        x = np.atleast_1d(np.asarray(x, dtype=np.float64))[:, None]
+        y = np.atleast_1d(np.asarray(y, dtype=np.float64))[:, None]
+        theta = np.atleast_1d(np.asarray(theta, dtype=np.float64))[:, None]
+        return grid.raycast(x, y, theta + self.angles, self.max_range)
+
+    def points(self, x, y, theta, distances):  # end points of the beams (for drawing)
+        angles = np.atleast_1d(theta)[:, None] + self.angles
+        return (np.atleast_1d(x)[:, None] + distances * np.cos(angles),
+                np.atleast_1d(y)[:, None] + distances * np.sin(angles))
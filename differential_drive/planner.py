@@ -0,0 +1,330 @@
+"""
+
+   Grid Path Planner (A*, Jump Point Search) and Cached Goal Distance Fields
+
+   Cells are 8-connected, diagonal moves need both orthogonal neighbours free (no corner cutting).
+   Obstacles can be inflated by a clearance, so the robot body keeps a distance from them.
+   Paths are returned as waypoints (cell centers) in window coordinates.
+
+"""
+
+import heapq
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+SQRT2 = math.sqrt(2)
+
+# neighbour offsets (row, column) and move costs
+_MOVES = ((-1, 0, 1), (1, 0, 1), (0, -1, 1), (0, 1, 1),
+          (-1, -1, SQRT2), (-1, 1, SQRT2), (1, -1, SQRT2), (1, 1, SQRT2))
+
+
+def _octile(row, col, goal):  # admissible heuristic of 8-connected grids
+    d_row = abs(row - goal[0])
+    d_col = abs(col - goal[1])
+    return max(d_row, d_col) + (SQRT2 - 1) * min(d_row, d_col)
+
+
+def _inflate(occupied, radius):  # occupied cells grown by radius cells (disc shaped)
+    rows, cols = occupied.shape
+    padded = np.pad(occupied, radius, constant_values=False)
+    inflated = occupied.copy()
+    for d_row in range(-radius, radius + 1):
+        for d_col in range(-radius, radius + 1):
+            if d_row ** 2 + d_col ** 2 <= radius ** 2:
+                inflated |= padded[radius + d_row:radius + d_row + rows, radius + d_col:radius + d_col + cols]
+    return inflated
+
+
+class Planner:
+    def __init__(self, grid, clearance=0, cache_size=16):
+        self.grid = grid  # OccupancyGrid
+        self.clearance = clearance  # distance kept from obstacles in pixels (e.g. half of the robot width)
+        self.free = self._free()
+
+        # goal distance fields (LRU), valid as long as the grid does not change
+        self.fields = OrderedDict()
+        self.cache_size = cache_size
+
+    def _free(self):
+        occupied = np.asarray(self.grid.grid) != 0
+        radius = math.ceil(self.clearance / self.grid.resolution)
+        if radius > 0:
+            occupied = _inflate(occupied, radius)
+        return ~occupied
+
+    def invalidate(self):  # call after the occupancy grid changed
+        self.free = self._free()
+        self.fields.clear()
+
+    def walkable(self, row, col):
+        return 0 <= row < self.grid.rows and 0 <= col < self.grid.cols and self.free[row, col]
+
+    def _cell(self, point):
+        row, col = self.grid.cell(point[0], point[1])
+        return int(row), int(col)
+
+    def _center(self, cell):
+        return ((cell[1] + 0.5) * self.grid.resolution, (cell[0] + 0.5) * self.grid.resolution)
+
+    # === A* ===
+    def _neighbors(self, row, col):
+        walkable = self.walkable
+        for d_row, d_col, cost in _MOVES:
+            if not walkable(row + d_row, col + d_col):
+                continue
+            if d_row and d_col and not (walkable(row + d_row, col) and walkable(row, col + d_col)):
+                continue
+            yield row + d_row, col + d_col, cost
+
+    def _pruned_neighbors(self, row, col, parent):  # jump point search: natural and forced neighbours only
+        if parent is None:
+            for n_row, n_col, _ in self._neighbors(row, col):
+                yield n_row, n_col
+            return
+
+        walkable = self.walkable
+        d_row = (row > parent[0]) - (row < parent[0])
+        d_col = (col > parent[1]) - (col < parent[1])
+
+        if d_row and d_col:
+            if walkable(row + d_row, col):
+                yield row + d_row, col
+            if walkable(row, col + d_col):
+                yield row, col + d_col
+            if walkable(row + d_row, col) and walkable(row, col + d_col) and walkable(row + d_row, col + d_col):
+                yield row + d_row, col + d_col
+        elif d_col:
+            up = walkable(row - 1, col)
+            down = walkable(row + 1, col)
+            if walkable(row, col + d_col):
+                yield row, col + d_col
+                if up and walkable(row - 1, col + d_col):
+                    yield row - 1, col + d_col
+                if down and walkable(row + 1, col + d_col):
+                    yield row + 1, col + d_col
+            if up:
+                yield row - 1, col
+            if down:
+                yield row + 1, col
+        else:
+            left = walkable(row, col - 1)
+            right = walkable(row, col + 1)
+            if walkable(row + d_row, col):
+                yield row + d_row, col
+                if left and walkable(row + d_row, col - 1):
+                    yield row + d_row, col - 1
+                if right and walkable(row + d_row, col + 1):
+                    yield row + d_row, col + 1
+            if left:
+                yield row, col - 1
+            if right:
+                yield row, col + 1
+
+    def _jump_straight(self, row, col, d_row, d_col, goal):
+        walkable = self.walkable
+        while True:
+            if not walkable(row, col):
+                return None
+            if (row, col) == goal:
+                return row, col
+            if d_col:
+                if (walkable(row - 1, col) and not walkable(row - 1, col - d_col)) or \
+                        (walkable(row + 1, col) and not walkable(row + 1, col - d_col)):
+                    return row, col
+            else:
+                if (walkable(row, col - 1) and not walkable(row - d_row, col - 1)) or \
+                        (walkable(row, col + 1) and not walkable(row - d_row, col + 1)):
+                    return row, col
+            row += d_row
+            col += d_col
+
+    def _jump(self, row, col, parent, goal):  # next jump point from (row, col) in the direction from parent
+        d_row = row - parent[0]
+        d_col = col - parent[1]
+        if not (d_row and d_col):
+            return self._jump_straight(row, col, d_row, d_col, goal)
+
+        walkable = self.walkable
+        while True:
+            if not walkable(row, col):
+                return None
+            if (row, col) == goal:
+                return row, col
+            if self._jump_straight(row + d_row, col, d_row, 0, goal) is not None or \
+                    self._jump_straight(row, col + d_col, 0, d_col, goal) is not None:
+                return row, col
+            if not (walkable(row + d_row, col) and walkable(row, col + d_col)):
+                return None
+            row += d_row
+            col += d_col
+
+    def path(self, start, goal, jps=False):  # waypoints from start to goal (window coordinates), None if unreachable
+        start_cell = self._cell(start)
+        goal_cell = self._cell(goal)
+        if not (self.walkable(*start_cell) and self.walkable(*goal_cell)):
+            return None
+
+        g_cost = {start_cell: 0}
+        parents = {start_cell: None}
+        heap = [(_octile(*start_cell, goal_cell), 0, start_cell)]
+        closed = set()
+
+        while heap:
+            _, g, cell = heapq.heappop(heap)
+            if cell in closed:
+                continue
+            if cell == goal_cell:
+                return self._reconstruct(parents, goal_cell, start, goal)
+            closed.add(cell)
+
+            if jps:
+                successors = []
+                for n_row, n_col in self._pruned_neighbors(cell[0], cell[1], parents[cell]):
+                    jump = self._jump(n_row, n_col, cell, goal_cell)
+                    if jump is not None:
+                        d_row = abs(jump[0] - cell[0])
+                        d_col = abs(jump[1] - cell[1])
+                        successors.append((jump, max(d_row, d_col) + (SQRT2 - 1) * min(d_row, d_col)))
+            else:
+                successors = [((n_row, n_col), cost) for n_row, n_col, cost in self._neighbors(*cell)]
+
+            for successor, cost in successors:
+                if successor in closed:
+                    continue
+                g_new = g + cost
+                if g_new < g_cost.get(successor, math.inf):
+                    g_cost[successor] = g_new
+                    parents[successor] = cell
+                    heapq.heappush(heap, (g_new + _octile(*successor, goal_cell), g_new, successor))
+        return None
+
+    def _reconstruct(self, parents, cell, start, goal):
+        cells = []
+        while cell is not None:
+            cells.append(cell)
+            cell = parents[cell]
+        cells.reverse()
+
+        # exact start and goal points instead of their cell centers
+        waypoints = [self._center(cell) for cell in cells]
+        waypoints[0] = (start[0], start[1])
+        waypoints[-1] = (goal[0], goal[1])
+        return waypoints
+
+    def line_of_sight(self, a, b):  # segment a-b crosses free cells only (sampled at half the resolution)
+        n = max(2, int(math.hypot(b[0] - a[0], b[1] - a[1]) * 2 / self.grid.resolution) + 1)
+        row, col = self.grid.cell(np.linspace(a[0], b[0], n), np.linspace(a[1], b[1], n))
+        inside = (row >= 0) & (row < self.grid.rows) & (col >= 0) & (col < self.grid.cols)
+        return bool(inside.all() and self.free[row, col].all())
+
+    def smooth(self, waypoints):  # drop waypoints that are in line of sight (any-angle path, as in Theta*)
+        if waypoints is None or len(waypoints) < 3:
+            return waypoints
+        smoothed = [waypoints[0]]
+        i = 0
+        while i < len(waypoints) - 1:
+            j = len(waypoints) - 1
+            while j > i + 1 and not self.line_of_sight(waypoints[i], waypoints[j]):
+                j -= 1
+            smoothed.append(waypoints[j])
+            i = j
+        return smoothed
+
+    # === DISTANCE FIELDS ===
+    def field(self, goal, lookahead=8):  # cached DistanceField of a goal point
+        # keyed by the exact point, robots near the goal drive to the point itself (not to its cell)
+        key = (float(goal[0]), float(goal[1]), lookahead)
+        field = self.fields.get(key)
+        if field is None:
+            field = self.fields[key] = DistanceField(self, goal, lookahead)
+            if len(self.fields) > self.cache_size:
+                self.fields.popitem(last=False)
+        else:
+            self.fields.move_to_end(key)
+        return field
+
+
+class DistanceField:  # cost-to-go of every cell (wavefront from the goal), robots read their next waypoint in O(1)
+    def __init__(self, planner, goal, lookahead=8):
+        grid = planner.grid
+        free = planner.free
+        self.grid = grid
+        self.goal = goal
+
+        rows, cols = free.shape
+        goal_row, goal_col = planner._cell(goal)
+
+        # moves of every cell on the padded grid (the border is never entered): move (d_row, d_col) of cell
+        # [r, c] leads to padded[r + 1 + d_row, c + 1 + d_col]. Moves never enter blocked cells from free cells,
+        # but lead out of blocked cells (robots that cut a corner into the clearance find their way back)
+        free_pad = np.pad(free, 1, constant_values=False)
+        inside_pad = np.pad(np.ones_like(free), 1, constant_values=False)
+        allowed = []
+        for d_row, d_col, step in _MOVES:
+            ok = free_pad[1 + d_row:1 + d_row + rows, 1 + d_col:1 + d_col + cols]
+            if d_row and d_col:
+                ok = ok & free_pad[1 + d_row:1 + d_row + rows, 1:1 + cols] & \
+                    free_pad[1:1 + rows, 1 + d_col:1 + d_col + cols]
+            ok = ok | (~free & inside_pad[1 + d_row:1 + d_row + rows, 1 + d_col:1 + d_col + cols])
+            allowed.append(np.pad(ok, 1, constant_values=False).ravel())
+
+        # wavefront from the goal: only the cells whose cost changed in the last pass are expanded, so a pass
+        # costs O(wavefront) instead of O(cells) (vectorized label-correcting search, exact octile costs)
+        padded_cols = cols + 2
+        offsets = [d_row * padded_cols + d_col for d_row, d_col, _ in _MOVES]
+        cost = np.full((rows + 2) * padded_cols, np.inf)
+        frontier = np.zeros(0, dtype=np.intp)
+        if planner.walkable(goal_row, goal_col):
+            frontier = np.array([(goal_row + 1) * padded_cols + goal_col + 1])
+            cost[frontier] = 0
+        while frontier.size:
+            updated = []
+            for (_, _, step), ok, offset in zip(_MOVES, allowed, offsets):
+                cell = frontier - offset  # cells whose move leads into the frontier
+                candidate = cost[frontier] + step
+                better = ok[cell] & (candidate < cost[cell])
+                cell = cell[better]
+                cost[cell] = candidate[better]
+                updated.append(cell)
+            frontier = np.unique(np.concatenate(updated))
+        cost_pad = cost.reshape(rows + 2, padded_cols)
+        self.cost = cost_pad[1:-1, 1:-1].copy()
+
+        # next cell of every cell (steepest descent), the goal and unreachable cells point to themselves
+        index = np.arange(rows * cols).reshape(rows, cols)
+        best = self.cost.copy()
+        next_cell = index.copy()
+        index_pad = np.pad(index, 1, constant_values=0)
+        for (d_row, d_col, step), ok in zip(_MOVES, allowed):
+            ok = ok.reshape(rows + 2, padded_cols)[1:-1, 1:-1]
+            neighbour = np.where(ok, cost_pad[1 + d_row:1 + d_row + rows, 1 + d_col:1 + d_col + cols], np.inf)
+            better = neighbour < best
+            best = np.where(better, neighbour, best)
+            next_cell = np.where(better, index_pad[1 + d_row:1 + d_row + rows, 1 + d_col:1 + d_col + cols], next_cell)
+        self.next_cell = next_cell.ravel()
+
+        # waypoint <lookahead> cells ahead, so the P-controller does not slow down at every cell
+        self.target = np.arange(rows * cols)
+        for _ in range(lookahead):
+            self.target = self.next_cell[self.target]
+
+    def distance(self, x, y):  # cost-to-go in pixels (inf: unreachable)
+        row, col = self.grid.cell(x, y)
+        row = np.clip(row, 0, self.grid.rows - 1)
+        col = np.clip(col, 0, self.grid.cols - 1)
+        return self.cost[row, col] * self.grid.resolution
+
+    def next_waypoint(self, x, y):  # waypoint(s) of robots at (x, y), the goal itself once it is within lookahead
+        row, col = self.grid.cell(x, y)
+        row = np.clip(row, 0, self.grid.rows - 1)
+        col = np.clip(col, 0, self.grid.cols - 1)
+        cell = row * self.grid.cols + col
+        target = self.target[cell]
+        res = self.grid.resolution
+        goal_cell = self.grid.cell(*self.goal)
+        at_goal = target == goal_cell[0] * self.grid.cols + goal_cell[1]
+        return (np.where(at_goal, self.goal[0], (target % self.grid.cols + 0.5) * res),
+                np.where(at_goal, self.goal[1], (target // self.grid.cols + 0.5) * res))
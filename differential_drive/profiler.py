@@ -0,0 +1,146 @@
+"""
+
+   Step-Phase Profiler for the Simulation Loops
+
+   Phases are timed by wrapping the callables of the loop (wrap / instrument). Without a profiler the
+   loops call the original functions, so disabled instrumentation costs nothing.
+
+   output:
+     overlay lines  -> Profiler.overlay(), drawn with Environment.write_overlay
+     json summary   -> Profiler.save_json(path), percentiles and histogram of every phase
+     chrome trace   -> Profiler.save_trace(path), open in chrome://tracing or Perfetto
+
+"""
+
+import json
+import time
+from collections import deque
+
+import numpy as np
+
+# histogram bucket edges in seconds (1 us ... 100 ms, log scale)
+BUCKETS = np.logspace(-6, -1, 21)
+
+
+class RollingHistogram:  # durations of the last <window> calls of a phase
+    def __init__(self, window=1024):
+        self.samples = [0.0] * window
+        self.window = window
+        self.index = 0
+        self.count = 0  # calls since the start
+        self.total = 0.0  # time since the start
+
+    def add(self, duration):
+        self.samples[self.index] = duration
+        self.index = (self.index + 1) % self.window
+        self.count += 1
+        self.total += duration
+
+    def values(self):
+        return np.array(self.samples[:min(self.count, self.window)])
+
+    def summary(self):
+        values = self.values()
+        if not len(values):
+            return {'count': 0}
+        p50, p90, p99 = np.percentile(values, (50, 90, 99))
+        return {'count': self.count, 'total': self.total, 'mean': float(values.mean()), 'p50': float(p50),
+                'p90': float(p90), 'p99': float(p99), 'max': float(values.max()),
+                'histogram': np.histogram(values, BUCKETS)[0].tolist()}
+
+
+class Profiler:
+    def __init__(self, window=1024, trace=False, trace_size=100000, overlay_refresh=30):
+        self.window = window
+        self.phases = {}  # name -> RollingHistogram
+        self.origin = time.perf_counter()
+
+        # chrome trace events (name, start, duration), oldest events are dropped
+        self.trace = deque(maxlen=trace_size) if trace else None
+
+        # overlay text is rebuilt every <overlay_refresh> frames
+        self.overlay_refresh = overlay_refresh
+        self.overlay_frame = 0
+        self.overlay_lines = []
+
+    def histogram(self, name):
+        histogram = self.phases.get(name)
+        if histogram is None:
+            histogram = self.phases[name] = RollingHistogram(self.window)
+        return histogram
+
+    def wrap(self, name, fn):  # timed version of fn
+        add = self.histogram(name).add
+        trace = self.trace
+        clock = time.perf_counter
+
+        if trace is None:
+            def timed(*args, **kwargs):
+                start = clock()
+                result = fn(*args, **kwargs)
+                add(clock() - start)
+                return result
+        else:
+            def timed(*args, **kwargs):
+                start = clock()
+                result = fn(*args, **kwargs)
+                duration = clock() - start
+                add(duration)
+                trace.append((name, start, duration))
+                return result
+        return timed
+
+    def instrument(self, obj, phase, *methods):  # time methods of one object (missing methods are skipped)
+        slotted = {}
+        for method in methods:
+            if hasattr(obj, method):
+                timed = self.wrap(f"{phase}.{method}" if len(methods) > 1 else phase, getattr(obj, method))
+                try:
+                    setattr(obj, method, timed)
+                except AttributeError:  # __slots__ object: methods are replaced on a subclass of its own
+                    slotted[method] = staticmethod(timed)
+        if slotted:
+            cls = type(obj)
+            obj.__class__ = type(cls.__name__, (cls,), {'__slots__': (), **slotted})
+
+    def summary(self):
+        return {name: histogram.summary() for name, histogram in self.phases.items()}
+
+    def overlay(self):  # text lines of Environment.write_overlay
+        if self.overlay_frame % self.overlay_refresh == 0:
+            self.overlay_lines = []
+            for name, histogram in self.phases.items():
+                values = histogram.values()
+                if len(values):
+                    p50, p99 = np.percentile(values, (50, 99))
+                    self.overlay_lines.append(f"{name:<34} p50 {p50 * 1e3:7.3f} ms   p99 {p99 * 1e3:7.3f} ms")
+        self.overlay_frame += 1
+        return self.overlay_lines
+
+    def save_json(self, path):
+        with open(path, 'w') as file:
+            json.dump({'buckets': BUCKETS.tolist(), 'phases': self.summary()}, file, indent=2)
+
+    def save_trace(self, path):  # chrome trace event format (complete events, microseconds)
+        events = [{'name': name, 'ph': 'X', 'ts': (start - self.origin) * 1e6, 'dur': duration * 1e6,
+                   'pid': 0, 'tid': 0} for name, start, duration in (self.trace or ())]
+        with open(path, 'w') as file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file)
+
+
+def timed(profiler, name, fn):  # fn itself without a profiler
+    return fn if profiler is None else profiler.wrap(name, fn)
+
+
+def instrument(profiler, obj, phase, *methods):
+    if profiler is not None:
+        profiler.instrument(obj, phase, *methods)
+
+
+def save(profiler, json_path=None, trace_path=None):
+    if profiler is None:
+        return
+    if json_path is not None:
+        profiler.save_json(json_path)
+    if trace_path is not None:
+        profiler.save_trace(trace_path)
@@ -0,0 +1,166 @@
+"""
+
+   Trajectory Recorder and Memory-Mapped Replay
+
+   log format: 16 byte header (magic, record size) followed by fixed-size little-endian float64 records
+
+   usage:
+     python -m differential_drive.recorder run.log
+     python -m differential_drive.recorder run.log --at 12.5
+     python -m differential_drive.recorder run.log --start 10 --end 20
+
+"""
+
+import argparse
+import math
+import os
+import sys
+
+import numpy as np
+
+MAGIC = b'DDRLOG01'
+HEADER_SIZE = 16
+
+RECORD = np.dtype([(name, '<f8') for name in (
+    't', 'x', 'y', 'theta', 'vl', 'vr', 'v', 'w', 'target_x', 'target_y', 'e_distance', 'e_theta')])
+
+
+def robot_record(t, robot, target=None):  # record fields of a robot of differential_drive.robot
+    if hasattr(robot, 'x_g'):  # go-to-goal
+        target_x, target_y = robot.x_g, robot.y_g
+        e_distance = math.sqrt((target_x - robot.x) ** 2 + (target_y - robot.y) ** 2)
+    elif hasattr(robot, 'd_star'):  # follow-trajectory
+        target_x, target_y = robot.x_target, robot.y_target
+        e_distance = robot.follow_dist - robot.d_star
+    elif hasattr(robot, 'tracker'):  # trajectory tracker (nearest point of the trajectory)
+        trajectory = robot.tracker.trajectory
+        i = robot.tracker.index or 0
+        target_x, target_y = trajectory.x[i], trajectory.y[i]
+        e_distance = robot.tracker.cross_track
+    else:  # manual
+        target_x, target_y = (target.x, target.y) if target is not None else (math.nan, math.nan)
+        e_distance = math.nan
+
+    if math.isnan(target_x):
+        e_theta = math.nan
+    else:
+        theta = math.atan2(target_y - robot.y, target_x - robot.x) - robot.theta
+        e_theta = math.atan2(math.sin(theta), math.cos(theta))
+
+    return (t, robot.x, robot.y, robot.theta, robot.vl, robot.vr, robot.v_velocity, robot.w_velocity,
+            target_x, target_y, e_distance, e_theta)
+
+
+class Recorder:  # streams records to a log file, at most <buffer_size> records are held in memory
+    def __init__(self, path, buffer_size=4096):
+        self.path = path
+        self.buffer = np.zeros(buffer_size, dtype=RECORD)
+        self.count = 0  # records in the buffer
+        self.written = 0  # records in the file
+
+        self.file = open(path, 'wb')
+        self.file.write(MAGIC + np.uint64(RECORD.itemsize).tobytes())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.written + self.count
+
+    def record(self, values):  # values: tuple in the field order of RECORD
+        self.buffer[self.count] = values
+        self.count += 1
+        if self.count == len(self.buffer):
+            self.flush()
+
+    def record_robot(self, t, robot, target=None):
+        self.record(robot_record(t, robot, target))
+
+    def flush(self):
+        if self.count:
+            self.file.write(self.buffer[:self.count].tobytes())
+            self.written += self.count
+            self.count = 0
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+
+class Replay:  # memory-mapped log, records are read from disk on access
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            header = file.read(HEADER_SIZE)
+        if header[:8] != MAGIC or np.frombuffer(header[8:], dtype='<u8')[0] != RECORD.itemsize:
+            raise ValueError(f"not a trajectory log: {path}")
+
+        self.path = path
+        count = (os.path.getsize(path) - HEADER_SIZE) // RECORD.itemsize  # a partly written last record is ignored
+        if count > 0:
+            self.records = np.memmap(path, dtype=RECORD, mode='r', offset=HEADER_SIZE, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=RECORD)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, index):  # record or slice of records
+        return self.records[index]
+
+    def column(self, name):  # memory-mapped view of one field
+        return self.records[name]
+
+    def index(self, t):  # index of the last record at or before time t (binary search, t is monotonic)
+        return max(int(np.searchsorted(self.records['t'], t, side='right')) - 1, 0)
+
+    def at(self, t):
+        return self.records[self.index(t)]
+
+    def between(self, t_start, t_end):  # records with t_start <= t <= t_end (empty if there are none)
+        t = self.records['t']
+        return self.records[np.searchsorted(t, t_start, side='left'):np.searchsorted(t, t_end, side='right')]
+
+
+def _format(record):
+    return ', '.join(f"{name} = {record[name]:.4f}" for name in RECORD.names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay of a recorded trajectory log')
+    parser.add_argument('log', help='trajectory log file')
+    parser.add_argument('--at', type=float, default=None, help='show the record at time t')
+    parser.add_argument('--start', type=float, default=None, help='start time of the summary')
+    parser.add_argument('--end', type=float, default=None, help='end time of the summary')
+    args = parser.parse_args()
+
+    replay = Replay(args.log)
+    if len(replay) == 0:
+        print(f"{args.log}: empty log")
+        return
+
+    if args.at is not None:
+        print(_format(replay.at(args.at)))
+        return
+
+    t = replay.column('t')
+    start = t[0] if args.start is None else args.start
+    end = t[-1] if args.end is None else args.end
+    records = replay.between(start, end)
+    if len(records) == 0:
+        sys.exit(f"{args.log}: no records in t = {start:.4f} .. {end:.4f} (log: t = {t[0]:.4f} .. {t[-1]:.4f})")
+
+    print(f"{args.log}: {len(replay)} records, t = {t[0]:.4f} .. {t[-1]:.4f}")
+    print(f"summary of t = {start:.4f} .. {end:.4f} ({len(records)} records)")
+    for name in ('vl', 'vr', 'v', 'w', 'e_distance', 'e_theta'):
+        column = records[name]
+        print(f"  {name}: min = {np.min(column):.4f}, max = {np.max(column):.4f}, "
+              f"rms = {np.sqrt(np.mean(np.square(column))):.4f}")
+
+
+if __name__ == '__main__':
+    main()
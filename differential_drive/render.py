@@ -0,0 +1,330 @@
+"""
+
+   Pygame Renderer for Differential Drive Robot Simulations
+
+"""
+
+import math
+from collections import OrderedDict
+
+import numpy as np
+import pygame
+
+from .trail import TrailBuffer
+
+
+class Environment:
+    def __init__(self, window_width, window_height, caption='Differential Drive Robot', hud_refresh=1, dirty=False,
+                 offscreen=False):
+        # colors
+        self.black = (0, 0, 0)
+        self.white = (255, 255, 255)
+        self.green = (0, 255, 0)
+        self.red = (255, 0, 0)
+
+        # window (map) dimensions
+        self.width = window_width
+        self.height = window_height
+
+        # window settings (offscreen: frames are drawn on a plain surface, e.g. for frame export)
+        self.offscreen = offscreen
+        if offscreen:
+            self.map = pygame.Surface((self.width, self.height))
+        else:
+            pygame.display.set_caption(caption)
+            self.map = pygame.display.set_mode((self.width, self.height))
+
+        # text variables
+        self.font = pygame.font.Font('freesansbold.ttf', 30)
+        self.hud = Hud(self.font, self.white, self.black, hud_refresh)
+        self.overlay = None  # profiler overlay (created on first use)
+
+        # static background (map of the obstacles), drawn under everything else
+        self.background = None
+
+        # dirty rectangle mode: the scene (background and trails) persists between frames, only the regions of
+        # moved sprites, new trail segments and changed text fields are restored and sent to the display
+        self.dirty = dirty
+        self.scene = None
+        self.trails = []  # trails composited into the scene
+        self.rects = []  # dirty rects of the current frame
+        self.erase = []  # rects of the sprites of the last frame
+        self.drawn = []  # (surface, rect, trails under the sprite) of the sprites drawn in the current frame
+        self.traced = set()  # trails extended in the current frame, drawn before (under) later sprites
+        self.full_refresh = True  # next frame updates the whole window
+
+    def set_background(self, surface):  # static background (e.g. grid_surface()), blitted under the scene
+        self.background = surface
+        self.scene = None
+
+    def _build_scene(self):
+        self.scene = pygame.Surface((self.width, self.height))
+        self.scene.fill(self.black)
+        if self.background is not None:
+            self.scene.blit(self.background, (0, 0))
+        for trail in self.trails:
+            self.scene.blit(trail.layer, (0, 0))
+
+    def _draw_trails(self, rect, under=()):  # trails extended after a sprite cover it, like in full mode
+        for trail in self.trails:
+            if trail not in under:
+                self.map.blit(trail.layer, rect, rect)
+
+    def _restore(self, rect):  # scene under rect, sprites of this frame stay on top
+        self.map.blit(self.scene, rect, rect)
+        # sprites are redrawn inside rect only, blending them again over their own pixels would darken them
+        self.map.set_clip(rect)
+        for surface, sprite_rect, under in self.drawn:
+            if sprite_rect.colliderect(rect):
+                self.map.blit(surface, sprite_rect)
+                self._draw_trails(sprite_rect, under)
+        self.map.set_clip(None)
+        self.rects.append(rect)
+
+    def clear(self):  # clear the window (full mode) or the regions of the last frame's sprites
+        if not self.dirty:
+            self.map.fill(self.black)
+            if self.background is not None:
+                self.map.blit(self.background, (0, 0))
+            return
+
+        if self.scene is None:
+            self._build_scene()
+            self.full_refresh = True
+        if self.full_refresh:
+            self.map.blit(self.scene, (0, 0))
+        else:
+            for rect in self.erase:
+                self._restore(rect)
+        self.erase = []
+
+    def draw(self, sprite):
+        sprite.draw(self.map)
+        if self.dirty:
+            under = frozenset(self.traced)
+            self._draw_trails(sprite.rect, under)
+            self.drawn.append((sprite.rotated, sprite.rect, under))
+            self.erase.append(sprite.rect)
+            self.rects.append(sprite.rect)
+
+    def update_display(self):  # send the frame to the display
+        if not self.offscreen:
+            if not self.dirty or self.full_refresh:
+                pygame.display.update()
+            else:
+                pygame.display.update(self.rects)
+        self.rects = []
+        self.drawn = []
+        self.traced = set()
+        self.full_refresh = False
+
+    def trail(self, pose_x, pose_y, trail):
+        trail.add(pose_x, pose_y)
+        if not self.dirty:
+            trail.draw(self.map)
+            return
+
+        self.traced.add(trail)
+        if trail not in self.trails:
+            self.trails.append(trail)
+            self.scene = None
+        if self.scene is None or trail.redrawn:
+            # the layer was redrawn: composite the scene again and update the whole window
+            self._build_scene()
+            self.map.blit(self.scene, (0, 0))
+            for surface, rect, under in self.drawn:
+                self.map.blit(surface, rect)
+                self._draw_trails(rect, under)
+            for hud in (self.hud, self.overlay):
+                if hud is not None:
+                    hud.draw(self.map)
+            self.full_refresh = True
+            trail.redrawn = False
+        elif trail.rect is not None:
+            self.scene.blit(trail.layer, trail.rect, trail.rect)
+            self.map.blit(trail.layer, trail.rect, trail.rect)
+            self.rects.append(trail.rect)
+
+    def _draw_hud(self, hud):
+        if self.dirty:
+            for rect in hud.dirty:
+                self._restore(rect)
+        hud.draw(self.map)
+
+    def write_info(self, info):  # info: list of (text, (center x, center y)) pairs
+        self.hud.update(info)
+        self._draw_hud(self.hud)
+
+    def write_overlay(self, lines, x=10, y=10, spacing=18):  # left aligned text lines (profiler overlay)
+        if self.overlay is None:
+            self.overlay = Hud(pygame.font.SysFont('monospace', 14), self.white, self.black, anchor='topleft')
+        self.overlay.update([(line, (x, y + i * spacing)) for i, line in enumerate(lines)])
+        self._draw_hud(self.overlay)
+
+
+def grid_surface(grid, color=(128, 128, 128)):  # surface of an OccupancyGrid (created once, blitted every frame)
+    pixels = np.zeros((grid.cols, grid.rows, 3), dtype=np.uint8)
+    pixels[np.asarray(grid.grid).T != 0] = color
+    surface = pygame.surfarray.make_surface(pixels)
+    if grid.resolution != 1:
+        surface = pygame.transform.scale(surface, (grid.width, grid.height))
+    surface.set_colorkey((0, 0, 0))
+    return surface
+
+
+class Hud:  # text fields rendered only when their displayed value changes
+    def __init__(self, font, color, background, refresh=1, cache_size=512, anchor='center'):
+        self.font = font
+        self.color = color
+        self.background = background
+        self.anchor = anchor  # rect attribute placed at the position of a field
+        self.refresh = refresh  # update the fields every <refresh> frames
+        self.frame = refresh - 1  # the first update is never skipped
+
+        # rendered text surfaces keyed by string (LRU)
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+
+        # fields keyed by position: [text, surface, rect]
+        self.fields = {}
+        self.dirty = []  # rects of the fields changed by the last update
+
+    def render(self, txt):
+        surface = self.cache.get(txt)
+        if surface is None:
+            surface = self.cache[txt] = self.font.render(txt, True, self.color, self.background)
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        else:
+            self.cache.move_to_end(txt)
+        return surface
+
+    def update(self, info):
+        self.dirty = []
+        self.frame += 1
+        if self.frame < self.refresh:
+            return
+        self.frame = 0
+
+        for txt, center in info:
+            field = self.fields.get(center)
+            if field is not None and field[0] == txt:
+                continue
+
+            surface = self.render(txt)
+            rect = surface.get_rect(**{self.anchor: center})
+            if field is not None:
+                self.dirty.append(field[2])
+            self.dirty.append(rect)
+            self.fields[center] = [txt, surface, rect]
+
+    def draw(self, map):
+        for _, surface, rect in self.fields.values():
+            map.blit(surface, rect)
+
+
+# images and rotation atlases shared by all sprites (loaded once per path)
+_images = {}
+_atlases = {}
+
+
+def load_image(path):
+    if path not in _images:
+        _images[path] = pygame.image.load(path)
+    return _images[path]
+
+
+def load_atlas(path, resolution=1, lazy=False, cache_size=None):  # shared SpriteAtlas of an image file
+    key = (path, resolution, lazy, cache_size)
+    if key not in _atlases:
+        _atlases[key] = SpriteAtlas(load_image(path), resolution, lazy, cache_size)
+    return _atlases[key]
+
+
+class SpriteAtlas:  # pre-rotated frames of an image, heading quantized to <resolution> degrees
+    def __init__(self, img, resolution=1, lazy=False, cache_size=None):
+        self.img = img
+        self.resolution = resolution
+        self.size = max(1, round(360 / resolution))  # number of frames
+        self.cache_size = cache_size  # LRU capacity of lazy atlases (None: unbounded)
+
+        self.frames = OrderedDict()
+        if not lazy:
+            for index in range(self.size):
+                self.frames[index] = self.rotate(index)
+
+    def rotate(self, index):
+        return pygame.transform.rotozoom(self.img, index * 360 / self.size, 1)
+
+    def frame(self, degrees):  # frame nearest to the heading
+        index = round(degrees * self.size / 360) % self.size
+        frame = self.frames.get(index)
+        if frame is None:
+            frame = self.frames[index] = self.rotate(index)
+            if self.cache_size is not None and len(self.frames) > self.cache_size:
+                self.frames.popitem(last=False)
+        elif self.cache_size is not None:
+            self.frames.move_to_end(index)
+        return frame
+
+
+class Sprite:  # image of a simulated object, observes the pose of the object it draws
+    def __init__(self, img, flip=False, resolution=1, lazy=False, cache_size=None):
+        self.atlas = load_atlas(img, resolution, lazy, cache_size)
+        self.rotated = self.atlas.frame(0)
+        self.rect = self.rotated.get_rect()
+
+        # the manual simulator uses y-up heading, the controller simulations y-down heading
+        self.flip = flip
+
+    def update(self, x, y, theta=0):
+        degrees = math.degrees(theta)
+        if self.flip:
+            degrees = -degrees
+        self.rotated = self.atlas.frame(degrees)
+        self.rect = self.rotated.get_rect(center=(x, y))
+
+    def draw(self, map):
+        map.blit(self.rotated, self.rect)
+
+
+class Trail:  # trail drawn incrementally onto a persistent layer, frame time does not grow with trail length
+    def __init__(self, width, height, color, length=1250):
+        self.color = color
+        self.buffer = TrailBuffer(length)
+
+        # persistent layer, black is transparent when the layer is blitted onto the map
+        self.layer = pygame.Surface((width, height))
+        self.layer.set_colorkey((0, 0, 0))
+
+        # change of the last add: bounds of the new segment, redrawn is set when the whole layer changed
+        # (reset by the environment once the layer is composited)
+        self.rect = None
+        self.redrawn = False
+
+    def add(self, x, y):
+        last = self.buffer.last()
+        if last is not None:
+            last = (last[0], last[1])
+
+        self.rect = None
+        if self.buffer.append(x, y):
+            # buffer wrapped: bulk redraw, segments of dropped points leave the layer
+            self.redraw()
+        elif last is not None:
+            # new segment only (segments of overwritten points stay until the next wrap)
+            self.rect = pygame.draw.line(self.layer, self.color, last, (x, y))
+
+    def redraw(self):  # whole layer from the buffered points (after a wrap or a restored snapshot)
+        self.layer.fill((0, 0, 0))
+        if len(self.buffer) > 1:
+            pygame.draw.lines(self.layer, self.color, False, self.buffer.points().tolist())
+        self.redrawn = True
+
+    def draw(self, map):
+        map.blit(self.layer, (0, 0))
+
+    def clear(self):
+        self.buffer.clear()
+        self.layer.fill((0, 0, 0))
+        self.redrawn = True
@@ -0,0 +1,404 @@
+"""
+
+   Headless Robot Models for Differential Drive Robot Simulations
+
+   The models hold the robot state only (drawing is done by render.Sprite), and use __slots__ so many
+   robots stay small in memory.
+
+"""
+
+import math
+import numpy as np
+
+from .integrators import get_integrator
+
+
+def _lib(t):  # math for scalars (faster), numpy for arrays of times
+    return np if isinstance(t, np.ndarray) else math
+
+
+class ManualRobot:  # differential drive robot driven by wheel velocity commands
+    __slots__ = ('meter_to_pixel', 'dt', 'integrator', 'x', 'y', 'theta', 'width', 'vr', 'vl', 'w_velocity',
+                 'v_velocity', 'ICCx', 'ICCy', 'r_distance')
+
+    def __init__(self, robot_x, robot_y, robot_theta, dt=0.005, integrator='exact', robotWidth=0.03):
+        # meter -> pixel transform
+        self.meter_to_pixel = 3779.52
+
+        # delta t and pose integrator
+        self.dt = dt
+        self.integrator = get_integrator(integrator)
+
+        # robot data
+        self.x = robot_x
+        self.y = robot_y
+        self.theta = robot_theta
+        self.width = robotWidth * self.meter_to_pixel
+        self.vr = 0
+        self.vl = 0
+        self.w_velocity = 0
+        self.v_velocity = 0
+
+        # differential drive behaviour (Instantaneous Center of Curvature - ICC) data
+        self.ICCx = 0
+        self.ICCy = 0
+        self.r_distance = 0
+
+    # wheel velocity commands (one keypad step is 1 mm/s)
+    def increment_left(self):
+        self.vl += 0.001 * self.meter_to_pixel
+
+    def decrement_left(self):
+        self.vl -= 0.001 * self.meter_to_pixel
+
+    def increment_right(self):
+        self.vr += 0.001 * self.meter_to_pixel
+
+    def decrement_right(self):
+        self.vr -= 0.001 * self.meter_to_pixel
+
+    def increment_both(self):
+        self.vr += 0.001 * self.meter_to_pixel
+        self.vl += 0.001 * self.meter_to_pixel
+
+    def stop(self):
+        self.vr = 0
+        self.vl = 0
+
+    def equalize(self):  # set the wheel velocities to the value of the lowest wheel velocity
+        if self.vr < self.vl:
+            self.vl = self.vr
+        else:
+            self.vr = self.vl
+
+    def calc_v_velocity(self):
+        self.v_velocity = (self.vr + self.vl) / 2
+
+    def calc_w_velocity(self):
+        self.w_velocity = (self.vr - self.vl) / self.width
+
+    def calc_r_distance(self):  # calculate distance to ICC
+        self.r_distance = ((self.width / 2) * ((self.vr + self.vl) / (self.vr - self.vl)))
+
+    def calc_icc(self):  # calculate ICC point (y axis of the window points down)
+        self.ICCx = self.x - (self.r_distance * math.sin(self.theta))
+        self.ICCy = self.y - (self.r_distance * math.cos(self.theta))
+
+    def move(self):  # robot move function
+        self.calc_w_velocity()
+        self.calc_v_velocity()
+
+        # differential drive behaviour (Instantaneous Center of Curvature)
+        if self.vl != self.vr:
+            self.calc_r_distance()
+            self.calc_icc()
+
+        # robot pose update, the model is integrated with the y axis up (heading counterclockwise on the window)
+        self.x, y, self.theta = self.integrator(self.x, -self.y, self.theta, self.v_velocity, self.w_velocity, self.dt)
+        self.y = -y
+
+        # reset theta
+        if self.theta > 2 * math.pi or self.theta < -2 * math.pi:
+            self.theta = 0
+
+    def step(self):  # one simulation step (pose update and heading wrap for the displayed angle)
+        self.move()
+        if self.theta < 0:
+            self.theta = 2 * math.pi + self.theta
+
+
+class GoToGoalRobot:  # P-controlled robot driving towards a fixed goal point
+    __slots__ = ('meter_to_pixel', 'dt', 'integrator', 'x', 'y', 'theta', 'width', 'R', 'vr', 'vl', 'wr', 'wl',
+                 'w_velocity', 'v_velocity', 'x_g', 'y_g', 'waypoints', 'waypoint_index', 'waypoint_tol', 'Kp_v',
+                 'Kp_w')
+
+    def __init__(self, robot_x, robot_y, robot_theta, x_goal, y_goal, dt=0.005, Kp_v=0.5, Kp_w=1, integrator='euler',
+                 robotWidth=0.03):
+        # meter -> pixel transform
+        self.meter_to_pixel = 3779.52
+
+        # delta t and pose integrator
+        self.dt = dt
+        self.integrator = get_integrator(integrator)
+
+        # robot data
+        self.x = robot_x
+        self.y = robot_y
+        self.theta = robot_theta
+        self.width = robotWidth * self.meter_to_pixel
+        self.R = 0.1 * self.meter_to_pixel  # radius of the wheels
+        self.vr = 0  # vr = wr * self.R
+        self.vl = 0
+        self.wr = 0
+        self.wl = 0
+        self.w_velocity = 0
+        self.v_velocity = 0
+
+        # goal point data
+        self.x_g = x_goal
+        self.y_g = y_goal
+
+        # path data (waypoints are followed as intermediate goals)
+        self.waypoints = []
+        self.waypoint_index = 0
+        self.waypoint_tol = 20
+
+        # P-Control gains
+        self.Kp_v = Kp_v
+        self.Kp_w = Kp_w
+
+    def distance(self):  # calculate distance between the robot and goal
+        distance = math.sqrt((self.x_g - self.x) ** 2 + (self.y_g - self.y) ** 2)
+        return distance
+
+    def set_path(self, waypoints, tolerance=20):  # follow waypoints, the last one is the goal
+        self.waypoints = list(waypoints)
+        self.waypoint_index = 0
+        self.waypoint_tol = tolerance
+        self.x_g, self.y_g = self.waypoints[0]
+        self.update_waypoint()
+
+    def update_waypoint(self):  # switch to the next waypoint once the current one is reached
+        while self.waypoint_index < len(self.waypoints) - 1 and self.distance() < self.waypoint_tol:
+            self.waypoint_index += 1
+            self.x_g, self.y_g = self.waypoints[self.waypoint_index]
+
+    def linear_velocity(self):
+        distance = self.distance()
+        self.v_velocity = self.Kp_v * distance
+        return self.v_velocity
+
+    def goal_angle(self):
+        theta_star = math.atan2(self.y_g - self.y, self.x_g - self.x)
+        return theta_star
+
+    def error_theta(self):  # calculate error angle between heading and target direction
+        theta_star = self.goal_angle()
+        theta = theta_star - self.theta
+        e_theta = math.atan2(math.sin(theta), math.cos(theta))
+        return e_theta
+
+    def angular_velocity(self):
+        e_theta = self.error_theta()
+        self.w_velocity = self.Kp_w * e_theta
+        return self.w_velocity
+
+    def wheel_linear_velocity(self):
+        v_velocity = self.linear_velocity()
+        w_velocity = self.angular_velocity()
+        self.vr = (2 * v_velocity + w_velocity * self.width) / 2  # vr = wr * self.R
+        self.vl = (2 * v_velocity - w_velocity * self.width) / 2  # vl = wl * self.R
+        return self.vr, self.vl
+
+    def wheel_angular_velocity(self):  # one controller update per call (the PID state advances once)
+        vr, vl = self.wheel_linear_velocity()
+        self.wr = vr / self.R
+        self.wl = vl / self.R
+        return self.wr, self.wl
+
+    def move(self):
+        dt = self.dt
+
+        # intermediate goal of the path
+        if self.waypoints:
+            self.update_waypoint()
+
+        # for linear velocity input
+        [vr, vl] = self.wheel_linear_velocity()
+
+        if self.distance() == 0.1 * self.meter_to_pixel:
+            v_velocity = 0
+            w_velocity = 0
+        else:
+            v_velocity = (vr + vl) / 2
+            w_velocity = self.angular_velocity()
+
+        # robot pose update
+        self.x, self.y, self.theta = self.integrator(self.x, self.y, self.theta, v_velocity, w_velocity, dt)
+
+        # reset theta
+        if self.theta > 2 * math.pi or self.theta < -2 * math.pi:
+            self.theta = 0
+
+    def step(self):  # one simulation step (pose update and heading wrap for the displayed angle)
+        self.move()
+        if self.theta < 0:
+            self.theta = 2 * math.pi + self.theta
+
+
+class FollowTrajectoryRobot:  # PID-controlled robot following a moving target at a fixed distance
+    __slots__ = ('meter_to_pixel', 'dt', 'integrator', 'x', 'y', 'theta', 'x_target', 'y_target', 'width', 'R',
+                 'd_star', 'follow_dist', 'vr', 'vl', 'wr', 'wl', 'w_velocity', 'v_velocity', 'Kp_v', 'Ki_v', 'Kd_v',
+                 'Kp_w', 'e_distance_sum', 'e_distance_prev')
+
+    def __init__(self, robot_x, robot_y, robot_theta, distance_star, dt=0.01, Kp_v=0.5, Ki_v=0.01, Kd_v=0.1, Kp_w=1,
+                 integrator='euler', robotWidth=0.03):
+        # meter -> pixel transform
+        self.meter_to_pixel = 3779.52
+
+        # delta t and pose integrator
+        self.dt = dt
+        self.integrator = get_integrator(integrator)
+
+        # robot data
+        self.x = robot_x
+        self.y = robot_y
+        self.theta = robot_theta
+        self.x_target = 0
+        self.y_target = 0
+        self.width = robotWidth * self.meter_to_pixel
+        self.R = 0.1 * self.meter_to_pixel  # radius of the wheels
+        self.d_star = distance_star  # desired follow distance
+        self.follow_dist = 0  # current follow distance
+        self.vr = 0  # vr = wr * self.R
+        self.vl = 0
+        self.wr = 0
+        self.wl = 0
+        self.w_velocity = 0
+        self.v_velocity = 0
+
+        # PID-Controller gains
+        self.Kp_v = Kp_v
+        self.Ki_v = Ki_v
+        self.Kd_v = Kd_v
+        self.Kp_w = Kp_w
+
+        # PID attributes
+        self.e_distance_sum = 0
+        self.e_distance_prev = 0
+
+    def error_distance(self):
+        self.follow_dist = math.sqrt((self.x_target - self.x) ** 2 + (self.y_target - self.y) ** 2)
+        e_distance = self.follow_dist - self.d_star
+        return e_distance
+
+    def linear_velocity(self):
+        dt = self.dt
+        e_distance = self.error_distance()
+        P = self.Kp_v * e_distance
+        I = self.Ki_v * self.e_distance_sum * dt
+        D = self.Kd_v * (e_distance - self.e_distance_prev) / dt
+        self.v_velocity = P + I + D
+        self.e_distance_prev = e_distance
+        self.e_distance_sum += e_distance
+        return self.v_velocity
+
+    def target_angle(self):
+        theta_star = math.atan2(self.y_target - self.y, self.x_target - self.x)
+        return theta_star
+
+    def error_theta(self):
+        theta_star = self.target_angle()
+        theta = theta_star - self.theta
+        e_theta = math.atan2(math.sin(theta), math.cos(theta))
+        return e_theta
+
+    def angular_velocity(self):
+        e_theta = self.error_theta()
+        self.w_velocity = self.Kp_w * e_theta
+        return self.w_velocity
+
+    def wheel_linear_velocity(self):
+        v_velocity = self.linear_velocity()
+        w_velocity = self.angular_velocity()
+        self.vr = (2 * v_velocity + w_velocity * self.width) / 2  # vr = wr * self.R
+        self.vl = (2 * v_velocity - w_velocity * self.width) / 2  # vl = wl * self.R
+        return self.vr, self.vl
+
+    def wheel_angular_velocity(self):  # one controller update per call (the PID state advances once)
+        vr, vl = self.wheel_linear_velocity()
+        self.wr = vr / self.R
+        self.wl = vl / self.R
+        return self.wr, self.wl
+
+    def move(self, target_pos):  # movement function of the robot
+        dt = self.dt
+
+        # target position input
+        self.x_target = target_pos[0]
+        self.y_target = target_pos[1]
+
+        # for linear velocity input
+        [vr, vl] = self.wheel_linear_velocity()
+
+        v_velocity = (vr + vl) / 2
+        w_velocity = self.angular_velocity()
+
+        # robot pose update
+        self.x, self.y, self.theta = self.integrator(self.x, self.y, self.theta, v_velocity, w_velocity, dt)
+
+        # reset theta
+        if self.theta > 2 * math.pi or self.theta < -2 * math.pi:
+            self.theta = 0
+
+    def step(self, target_pos):  # one simulation step (pose update and heading wrap for the displayed angle)
+        self.move(target_pos)
+        if self.theta < 0:
+            self.theta = 2 * math.pi + self.theta
+
+
+class TrackingRobot:  # robot following a precomputed trajectory with a lookahead tracker (trajectory.py)
+    __slots__ = ('meter_to_pixel', 'dt', 'integrator', 'x', 'y', 'theta', 'width', 'vr', 'vl', 'w_velocity',
+                 'v_velocity', 'tracker')
+
+    def __init__(self, robot_x, robot_y, robot_theta, tracker, dt=0.01, integrator='euler', robotWidth=0.03):
+        # meter -> pixel transform
+        self.meter_to_pixel = 3779.52
+
+        # delta t and pose integrator
+        self.dt = dt
+        self.integrator = get_integrator(integrator)
+
+        # robot data
+        self.x = robot_x
+        self.y = robot_y
+        self.theta = robot_theta
+        self.width = robotWidth * self.meter_to_pixel
+        self.vr = 0
+        self.vl = 0
+        self.w_velocity = 0
+        self.v_velocity = 0
+
+        # trajectory tracker (PurePursuit or Stanley)
+        self.tracker = tracker
+
+    def cross_track(self):  # signed distance to the trajectory
+        return self.tracker.cross_track
+
+    def wheel_linear_velocity(self):
+        self.v_velocity, self.w_velocity = self.tracker.command(self.x, self.y, self.theta)
+        self.vr = (2 * self.v_velocity + self.w_velocity * self.width) / 2
+        self.vl = (2 * self.v_velocity - self.w_velocity * self.width) / 2
+        return self.vr, self.vl
+
+    def move(self):
+        self.wheel_linear_velocity()
+
+        # robot pose update
+        self.x, self.y, self.theta = self.integrator(self.x, self.y, self.theta, self.v_velocity, self.w_velocity,
+                                                     self.dt)
+
+        # reset theta
+        if self.theta > 2 * math.pi or self.theta < -2 * math.pi:
+            self.theta = 0
+
+    def step(self):  # one simulation step (pose update and heading wrap for the displayed angle)
+        self.move()
+        if self.theta < 0:
+            self.theta = 2 * math.pi + self.theta
+
+
+class Target:  # moving target of the follow-trajectory simulation
+    __slots__ = ('x', 'y')
+
+    def __init__(self):
+        # target data
+        self.x = 0
+        self.y = 0
+
+    @staticmethod
+    def position(t):  # target position at time t (t can be an array of times)
+        return 300 + t * 50, 200 + 60 * _lib(t).cos(t)
+
+    def move(self, t):  # movement function of the target
+        self.x, self.y = self.position(t)
@@ -0,0 +1,384 @@
+"""
+
+   Declarative Scenario Files and Parallel Headless Scenario Runner
+
+   usage:
+     python -m differential_drive.scenario scenarios/ --workers 8 --output results.json
+     python -m differential_drive.scenario scenarios/go_to_goal.toml --rerun
+
+   A scenario (.json, .toml or .yaml) describes one headless run, missing sections use the values of the
+   simulation scripts:
+
+     mode = "go_to_goal"          # go_to_goal, follow_trajectory, tracker or manual
+     dt = 0.005
+     integrator = "euler"
+
+     [robot]                      # start pose and robot width in meters
+     x = 200
+     y = 600
+     theta = 6.283185307179586
+     width = 0.03
+
+     [controller]                 # gains of the controller (tracker parameters in tracker mode)
+     Kp_v = 0.5
+     Kp_w = 1
+
+     [goal]                       # go_to_goal: goal point, follow_trajectory: follow_distance,
+     x = 800                      # tracker: tracker / path / duration, manual: vl / vr
+     y = 200
+
+     [map]                        # optional occupancy grid (the go-to-goal robot follows a planned path)
+     width = 1400
+     height = 750
+     grid = "maps/office.png"     # relative to the scenario file
+     resolution = 5
+
+     [termination]                # the run stops at the first condition that holds
+     max_steps = 10000
+     goal_tolerance = 1           # distance to the goal / end of the trajectory
+     max_error = inf              # error of the controller (follow distance, cross track)
+     stop_outside = false         # robot leaves the map
+     stop_collision = true        # robot center enters an occupied cell
+
+   Results are cached in <cache>/<hash>.json, the hash covers the resolved scenario, the contents of the
+   files it references and the simulator sources, so unchanged scenarios are skipped on re-run
+   (--no-code-hash keeps the cached results when the simulator changes). Scenarios with the same hash in
+   several files are run once.
+
+"""
+
+import argparse
+import copy
+import functools
+import hashlib
+import json
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .robot import FollowTrajectoryRobot, GoToGoalRobot, ManualRobot, Target, TrackingRobot
+
+# scenario file extensions
+EXTENSIONS = ('.json', '.toml', '.yaml', '.yml')
+
+# results of older cache versions are not reused
+CACHE_VERSION = 1
+
+# default sections of every mode (initial values of the simulation scripts)
+DEFAULTS = {
+    'go_to_goal': {
+        'dt': 0.005,
+        'robot': {'x': 200, 'y': 600, 'theta': 2 * math.pi},
+        'controller': {'Kp_v': 0.5, 'Kp_w': 1},
+        'goal': {'x': 800, 'y': 200},
+    },
+    'follow_trajectory': {
+        'dt': 0.01,
+        'robot': {'x': 300, 'y': 700, 'theta': math.pi},
+        'controller': {'Kp_v': 0.5, 'Ki_v': 0.01, 'Kd_v': 0.1, 'Kp_w': 1},
+        'goal': {'follow_distance': 150},
+    },
+    'tracker': {
+        'dt': 0.01,
+        'robot': {'x': 300, 'y': 700, 'theta': math.pi},
+        'controller': {},
+        'goal': {'tracker': 'pure_pursuit', 'path': None, 'duration': 22, 'samples': 20000},
+    },
+    'manual': {
+        'dt': 0.005,
+        'robot': {'x': 200, 'y': 600, 'theta': math.pi / 4},
+        'controller': {},
+        'goal': {'vl': 0, 'vr': 0},
+    },
+}
+
+COMMON = {
+    'integrator': None,  # robot default
+    'robot': {'width': 0.03},
+    'map': {'width': 1400, 'height': 750, 'grid': None, 'resolution': 5, 'jps': False},
+    'termination': {'max_steps': 10000, 'goal_tolerance': 1, 'max_error': math.inf, 'stop_outside': False,
+                    'stop_collision': True},
+}
+
+
+def _merge(base, override):  # nested dict update
+    merged = copy.deepcopy(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def read(path):  # raw scenario dictionary of a .json, .toml or .yaml file
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.json':
+        with open(path) as file:
+            return json.load(file)
+    if extension == '.toml':
+        try:
+            import tomllib
+        except ImportError:  # python < 3.11
+            import tomli as tomllib
+        with open(path, 'rb') as file:
+            return tomllib.load(file)
+    if extension in ('.yaml', '.yml'):
+        import yaml  # optional dependency of yaml scenarios
+        with open(path) as file:
+            return yaml.safe_load(file)
+    raise ValueError(f"unknown scenario format: {path}")
+
+
+def load(path):  # scenario with defaults, file references resolved relative to the scenario file
+    raw = read(path)
+    mode = raw.get('mode', 'go_to_goal')
+    if mode not in DEFAULTS:
+        raise ValueError(f"unknown scenario mode in {path}: {mode}")
+
+    scenario = _merge(_merge(COMMON, DEFAULTS[mode]), raw)
+    scenario['mode'] = mode
+    scenario.setdefault('name', os.path.splitext(os.path.basename(path))[0])
+
+    directory = os.path.dirname(os.path.abspath(path))
+    for section, key in (('map', 'grid'), ('goal', 'path')):
+        if scenario[section].get(key) is not None:
+            scenario[section][key] = os.path.normpath(os.path.join(directory, scenario[section][key]))
+    return scenario
+
+
+def _hash_file(digest, path):
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+
+
+@functools.lru_cache(maxsize=None)
+def code_hash():  # hash of the simulator sources (read once per process)
+    digest = hashlib.sha256()
+    package = os.path.dirname(os.path.abspath(__file__))
+    for name in sorted(os.listdir(package)):
+        if name.endswith('.py'):
+            _hash_file(digest, os.path.join(package, name))
+    return digest.hexdigest()
+
+
+def content_hash(scenario, code=True):  # key of the result cache
+    digest = hashlib.sha256()
+    digest.update(f"v{CACHE_VERSION}".encode())
+    resolved = {key: value for key, value in scenario.items() if key != 'name'}
+    digest.update(json.dumps(resolved, sort_keys=True, default=str).encode())
+
+    # referenced files by content, not by path
+    for section, key in (('map', 'grid'), ('goal', 'path')):
+        if scenario[section].get(key) is not None:
+            _hash_file(digest, scenario[section][key])
+
+    if code:
+        digest.update(code_hash().encode())
+    return digest.hexdigest()
+
+
+def _grid(scenario):
+    path = scenario['map']['grid']
+    if path is None:
+        return None
+
+    from .occupancy import OccupancyGrid
+    if path.endswith('.npy'):
+        return OccupancyGrid.from_npy(path, scenario['map']['resolution'])
+    return OccupancyGrid.from_png(path, scenario['map']['resolution'])
+
+
+def create(scenario, grid=None):  # robot of a scenario
+    mode = scenario['mode']
+    robot = scenario['robot']
+    goal = scenario['goal']
+    gains = scenario['controller']
+    dt = scenario['dt']
+    integrator = {} if scenario['integrator'] is None else {'integrator': scenario['integrator']}
+
+    if mode == 'go_to_goal':
+        controlled = GoToGoalRobot(robot['x'], robot['y'], robot['theta'], goal['x'], goal['y'], dt,
+                                   robotWidth=robot['width'], **gains, **integrator)
+        if grid is not None:
+            from .planner import Planner
+            planner = Planner(grid, clearance=controlled.width / 2)
+            path = planner.smooth(planner.path((robot['x'], robot['y']), (goal['x'], goal['y']),
+                                               scenario['map']['jps']))
+            if path is None:
+                raise ValueError(f"no path from the start to the goal: {scenario['name']}")
+            controlled.set_path(path)
+        return controlled
+
+    if mode == 'follow_trajectory':
+        return FollowTrajectoryRobot(robot['x'], robot['y'], robot['theta'], goal['follow_distance'], dt,
+                                     robotWidth=robot['width'], **gains, **integrator)
+
+    if mode == 'tracker':
+        from .trajectory import TRACKERS, Trajectory
+        if goal['path'] is None:
+            trajectory = Trajectory.from_function(Target.position, 0, goal['duration'], goal['samples'])
+        else:
+            trajectory = Trajectory.from_file(goal['path'])
+        return TrackingRobot(robot['x'], robot['y'], robot['theta'], TRACKERS[goal['tracker']](trajectory, **gains),
+                             dt, robotWidth=robot['width'], **integrator)
+
+    controlled = ManualRobot(robot['x'], robot['y'], robot['theta'], dt, robotWidth=robot['width'], **integrator)
+    controlled.vl = goal['vl']
+    controlled.vr = goal['vr']
+    return controlled
+
+
+def _error(mode, robot):  # goal error of the controller
+    if mode == 'go_to_goal':
+        x_goal, y_goal = robot.waypoints[-1] if robot.waypoints else (robot.x_g, robot.y_g)
+        return math.hypot(x_goal - robot.x, y_goal - robot.y)
+    if mode == 'follow_trajectory':
+        return robot.follow_dist - robot.d_star
+    if mode == 'tracker':
+        return robot.cross_track()
+    return math.nan
+
+
+def run(scenario):  # headless run until a termination condition holds, returns the result dictionary
+    mode = scenario['mode']
+    termination = scenario['termination']
+    dt = scenario['dt']
+    grid = _grid(scenario)
+    robot = create(scenario, grid)
+    target = Target() if mode == 'follow_trajectory' else None
+
+    width = scenario['map']['width']
+    height = scenario['map']['height']
+    path_length = 0
+    max_error = 0
+    status = 'max_steps'
+    steps = 0
+
+    while steps < termination['max_steps']:
+        x_prev, y_prev = robot.x, robot.y
+        if target is not None:
+            target.move(steps * dt)
+            robot.step((target.x, target.y))
+        else:
+            robot.step()
+        steps += 1
+        path_length += math.hypot(robot.x - x_prev, robot.y - y_prev)
+
+        error = _error(mode, robot)
+        if not math.isnan(error):
+            max_error = max(max_error, abs(error))
+
+        if mode == 'go_to_goal' and error < termination['goal_tolerance']:
+            status = 'goal'
+            break
+        if mode == 'tracker':
+            tracker = robot.tracker
+            if tracker.trajectory.length - tracker.trajectory.s[tracker.index] < termination['goal_tolerance']:
+                status = 'goal'
+                break
+        if abs(error) > termination['max_error']:
+            status = 'diverged'
+            break
+        if termination['stop_outside'] and not (0 <= robot.x < width and 0 <= robot.y < height):
+            status = 'outside'
+            break
+        if grid is not None and termination['stop_collision'] and grid.occupied(robot.x, robot.y):
+            status = 'collision'
+            break
+
+    return {'name': scenario['name'], 'mode': mode, 'status': status, 'steps': steps, 't': steps * dt,
+            'x': robot.x, 'y': robot.y, 'theta': robot.theta, 'final_error': _error(mode, robot),
+            'max_error': max_error, 'path_length': path_length}
+
+
+def _run_file(args):  # process pool worker
+    path, key = args
+    result = run(load(path))
+    result['file'] = path
+    result['hash'] = key
+    return result
+
+
+def find(paths):  # scenario files of files and directories (recursive)
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in sorted(names) if name.endswith(EXTENSIONS))
+        else:
+            files.append(path)
+    return sorted(files)
+
+
+def run_all(paths, cache='.scenario_cache', workers=None, rerun=False, code=True):  # results of all scenarios
+    files = find(paths)
+    os.makedirs(cache, exist_ok=True)
+
+    results = {}
+    names = {}
+    pending = {}  # hash -> files of the scenario, each scenario is run once
+    for path in files:
+        scenario = load(path)
+        names[path] = scenario['name']
+        key = content_hash(scenario, code)
+        cached = os.path.join(cache, f"{key}.json")
+        if not rerun and os.path.exists(cached):
+            with open(cached) as file:
+                result = json.load(file)
+            result.update(name=names[path], file=path, cached=True)
+            results[path] = result
+        else:
+            pending.setdefault(key, []).append(path)
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            futures = {executor.submit(_run_file, (same[0], key)): key for key, same in pending.items()}
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    result = future.result()
+                except Exception as exc:  # a failing scenario does not lose the others, errors are not cached
+                    result = {'error': str(exc)}
+                else:
+                    with open(os.path.join(cache, f"{key}.json"), 'w') as file:
+                        json.dump(result, file, indent=2)
+                for path in pending[key]:
+                    results[path] = dict(result, name=names[path], file=path, cached=False)
+
+    return [results[path] for path in files]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Headless runner of scenario files')
+    parser.add_argument('paths', nargs='+', help='scenario files or directories')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes (default: all cores)')
+    parser.add_argument('--cache', default='.scenario_cache', help='result cache directory')
+    parser.add_argument('--rerun', action='store_true', help='ignore cached results')
+    parser.add_argument('--no-code-hash', action='store_true',
+                        help='keep cached results when the simulator sources change')
+    parser.add_argument('--output', default=None, help='save all results as json')
+    args = parser.parse_args()
+
+    results = run_all(args.paths, args.cache, args.workers, args.rerun, not args.no_code_hash)
+
+    print(f"{'scenario':40} {'status':10} {'steps':>8} {'final error':>12} {'max error':>12} {'cached':>7}")
+    for result in results:
+        if 'error' in result:
+            print(f"{result['name']:40} {'error':10} {result['error']}")
+            continue
+        print(f"{result['name']:40} {result['status']:10} {result['steps']:8d} {result['final_error']:12.3f} "
+              f"{result['max_error']:12.3f} {'yes' if result['cached'] else 'no':>7}")
+
+    if args.output is not None:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    if not results:
+        sys.exit('no scenario files found')
+
+
+if __name__ == '__main__':
+    main()
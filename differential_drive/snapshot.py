@@ -0,0 +1,280 @@
+"""
+
+   Checkpoint / Restore and Fork of the Simulation State
+
+   usage:
+     python Follow_Trajectory_Simulation/follow_trajectory_simulation.py --headless --steps 20000 --checkpoint warm.snap
+     python Follow_Trajectory_Simulation/follow_trajectory_simulation.py --headless --resume warm.snap
+     python -m differential_drive.snapshot warm.snap --vary Kp_v=0.2,0.5,1 --vary Kd_v=0,0.1 --steps 5000
+
+   A snapshot holds the state of named objects (robots, targets, clocks, batches, noise models, estimators,
+   trail buffers): every public numeric attribute, numeric list (waypoints) and NumPy array, recursively
+   through the objects of this package, the integrators (by name) and the state of NumPy random generators.
+   Configuration objects (trajectories, random stream keys) and private attributes (scratch buffers) are not
+   part of it, a snapshot is restored into objects built with the same configuration.
+
+   Blob format: 8 byte magic, uint64 header size, json header (fields: path, kind, dtype, shape), then the
+   raw field data.
+
+"""
+
+import argparse
+import json
+import math
+
+import numpy as np
+
+from .batch import RobotBatch
+from .integrators import INTEGRATORS, get_integrator
+from .noise import Streams
+from .robot import Target
+from .sweep import grid
+from .trajectory import Trajectory
+
+MAGIC = b'DDSNAP01'
+
+# configuration objects (not saved) and wall clock references (a restored clock restarts from the current time)
+CONFIGURATION = (Trajectory, Streams)
+TRANSIENT = {'wall_prev'}
+
+# integrator functions are saved by name
+_INTEGRATOR_NAMES = {function: name for name, function in INTEGRATORS.items()}
+
+
+def _attributes(obj):  # public attribute names of an object (__slots__ and __dict__)
+    names = []
+    for cls in type(obj).__mro__:
+        slots = cls.__dict__.get('__slots__', ())
+        names.extend([slots] if isinstance(slots, str) else slots)
+    names.extend(getattr(obj, '__dict__', ()))
+    return [name for name in dict.fromkeys(names) if not name.startswith('_') and name not in TRANSIENT]
+
+
+def _stateful(value):  # object of this package whose attributes are saved
+    return type(value).__module__.startswith(__package__ + '.') and not isinstance(value, CONFIGURATION)
+
+
+def _value(value):  # value saved as it is
+    return value is None or isinstance(value, (bool, int, float, np.generic, np.ndarray, np.random.Generator))
+
+
+def _numeric(values):  # list of numbers or number tuples (saved as a float64 array)
+    try:
+        np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def _walk(obj, prefix, fields, seen):
+    if id(obj) in seen:
+        return
+    seen.add(id(obj))
+    for name in _attributes(obj):
+        value = getattr(obj, name, None)
+        path = prefix + name
+        if _value(value):
+            fields[path] = value
+        elif name == 'integrator':
+            if value not in _INTEGRATOR_NAMES:
+                raise ValueError(f"can not save the custom integrator of {path}")
+            fields[path] = value
+        elif isinstance(value, list) and _numeric(value):  # e.g. waypoints
+            fields[path] = value
+        elif _stateful(value):
+            _walk(value, path + '.', fields, seen)
+
+
+def capture(**objects):  # snapshot blob of named objects, e.g. capture(robot=robot, target=target, clock=clock)
+    fields = {}
+    seen = set()
+    for name, obj in objects.items():
+        if isinstance(obj, (np.ndarray, np.random.Generator)):  # e.g. capture(rng=rng)
+            fields[name] = obj
+        else:
+            _walk(obj, name + '.', fields, seen)
+
+    entries = []
+    data = []
+    for path, value in fields.items():
+        if value is None:
+            entries.append([path, 'none'])
+        elif isinstance(value, np.random.Generator):
+            entries.append([path, 'rng', value.bit_generator.state])
+        elif callable(value):
+            entries.append([path, 'integrator', _INTEGRATOR_NAMES[value]])
+        else:
+            if isinstance(value, list):
+                kind = 'list'
+            elif isinstance(value, np.ndarray):
+                kind = 'array'
+            else:
+                kind = type(value.item() if isinstance(value, np.generic) else value).__name__
+            array = np.asarray(value, dtype=np.float64 if kind == 'list' else None)
+            entries.append([path, kind, array.dtype.str, list(array.shape)])
+            data.append(array.tobytes())
+
+    header = json.dumps({'fields': entries}, separators=(',', ':')).encode()
+    return MAGIC + np.uint64(len(header)).tobytes() + header + b''.join(data)
+
+
+def load(blob):  # fields of a snapshot blob, {path: value}
+    if blob[:8] != MAGIC:
+        raise ValueError("not a snapshot")
+    size = int(np.frombuffer(blob[8:16], dtype='<u8')[0])
+    header = json.loads(blob[16:16 + size])
+    offset = 16 + size
+
+    fields = {}
+    for entry in header['fields']:
+        path, kind = entry[0], entry[1]
+        if kind == 'none':
+            fields[path] = None
+        elif kind == 'rng':
+            fields[path] = entry[2]
+        elif kind == 'integrator':
+            fields[path] = get_integrator(entry[2])
+        else:
+            dtype = np.dtype(entry[2])
+            count = math.prod(entry[3])
+            array = np.frombuffer(blob, dtype=dtype, count=count, offset=offset).reshape(entry[3])
+            offset += count * dtype.itemsize
+            if kind == 'array':
+                fields[path] = array.copy()
+            elif kind == 'list':
+                fields[path] = [tuple(row) if isinstance(row, list) else row for row in array.tolist()]
+            else:
+                fields[path] = {'bool': bool, 'int': int, 'float': float}[kind](array)
+    return fields
+
+
+def _assign_into(current, value):  # in place restore of a generator or array, False if not possible
+    if isinstance(value, dict) and isinstance(current, np.random.Generator):
+        current.bit_generator.state = value
+        return True
+    if isinstance(value, np.ndarray) and isinstance(current, np.ndarray) and current.shape == value.shape \
+            and current.dtype == value.dtype and current.flags.writeable:
+        current[...] = value  # views of the array stay valid
+        return True
+    return False
+
+
+def _assign(obj, name, value):
+    if _assign_into(getattr(obj, name, None), value):
+        return
+    if isinstance(value, dict):  # random generator state
+        generator = np.random.Generator(getattr(np.random, value['bit_generator'])())
+        generator.bit_generator.state = value
+        value = generator
+    setattr(obj, name, value)
+
+
+def restore(blob, **objects):  # write a snapshot into live objects (same names as capture), returns the objects
+    for path, value in load(blob).items():
+        name, *attributes = path.split('.')
+        obj = objects.get(name)
+        if not attributes:
+            if not _assign_into(obj, value):
+                raise ValueError(f"can not restore {name} in place")
+            continue
+        for attribute in attributes[:-1]:
+            if obj is None:
+                break
+            obj = getattr(obj, attribute, None)
+        if obj is not None:
+            _assign(obj, attributes[-1], value)
+
+    # trails redraw their layer from the restored points
+    for obj in objects.values():
+        if hasattr(obj, 'redraw'):
+            obj.redraw()
+    return objects
+
+
+def fork(blob, variations, name='robot', **kwargs):  # RobotBatch of the robot <name>, one robot per variation
+    fields = load(blob)
+    prefix = name + '.'
+    robot = {path[len(prefix):]: value for path, value in fields.items()
+             if path.startswith(prefix) and '.' not in path[len(prefix):]}
+    if 'x' not in robot:
+        raise ValueError(f"no robot '{name}' in the snapshot")
+    if robot.get('waypoints'):
+        raise ValueError(f"robot '{name}' follows a path, the batch has no waypoint following")
+
+    # the batch integrates with the integrator of the robot (default integrator of older snapshots)
+    kwargs.setdefault('integrator', robot.get('integrator'))
+
+    n = len(variations)
+    batch = RobotBatch(np.full(n, robot['x']), robot['y'], robot['theta'], robot['dt'],
+                       robotWidth=robot['width'] / robot['meter_to_pixel'], **kwargs)
+
+    # state and gains of the robot, then the values of the variations
+    for attribute, value in robot.items():
+        array = getattr(batch, attribute, None)
+        if isinstance(array, np.ndarray) and array.shape == (n,) and value is not None:
+            array[:] = value
+    for attribute in dict.fromkeys(key for variation in variations for key in variation):
+        array = getattr(batch, attribute, None)
+        if not isinstance(array, np.ndarray) or array.shape != (n,):
+            raise ValueError(f"unknown robot parameter: {attribute}")
+        array[:] = [variation.get(attribute, array[i]) for i, variation in enumerate(variations)]
+    return batch
+
+
+def save(path, blob):
+    with open(path, 'wb') as file:
+        file.write(blob)
+
+
+def read(path):
+    with open(path, 'rb') as file:
+        return file.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fork a snapshot of a simulation run into gain variations')
+    parser.add_argument('snapshot', help='snapshot file (e.g. --checkpoint of the follow-trajectory simulation)')
+    parser.add_argument('--vary', action='append', default=[], metavar='NAME=V1,V2,...',
+                        help='values of a robot parameter (repeatable, all combinations are run)')
+    parser.add_argument('--steps', type=int, default=5000, help='number of steps after the snapshot')
+    args = parser.parse_args()
+
+    values = {}
+    for spec in args.vary:
+        name, _, value = spec.partition('=')
+        try:
+            values[name] = [float(v) for v in value.split(',')]
+        except ValueError:
+            parser.error(f"invalid parameter specification: {spec}")
+    variations = grid(**values)
+
+    blob = read(args.snapshot)
+    fields = load(blob)
+    try:
+        batch = fork(blob, variations)
+    except ValueError as error:
+        parser.error(str(error))
+
+    follow = 'robot.d_star' in fields
+    if not follow and 'robot.x_g' not in fields:
+        parser.error("the snapshot has no follow-trajectory or go-to-goal robot")
+
+    # the target time continues from the clock of the snapshot
+    start = fields.get('clock.steps', 0)
+    for k in range(start, start + args.steps):
+        if follow:
+            batch.step_follow_trajectory(*Target.position(k * batch.dt))
+        else:
+            batch.step_go_to_goal(fields['robot.x_g'], fields['robot.y_g'])
+
+    for i, variation in enumerate(variations):
+        result = f"x = {batch.x[i]:.3f}, y = {batch.y[i]:.3f}, theta = {batch.theta[i]:.4f}"
+        if follow:
+            result += f", follow distance = {batch.follow_dist[i]:.3f}"
+        # without --vary the snapshot runs unchanged (one empty variation)
+        label = ', '.join(f"{name} = {value}" for name, value in variation.items()) or 'snapshot'
+        print(f"{label}: {result}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,278 @@
+"""
+
+   Parameter Sweep Runner for Go-To-Goal and Follow-Trajectory Controllers
+
+   usage:
+     python -m differential_drive.sweep --mode follow_trajectory --grid Kp_v=0.1,0.5,1 --grid Kd_v=0,0.1 --output sweep.csv
+     python -m differential_drive.sweep --mode go_to_goal --sample Kp_v=0.1:2 --sample Kp_w=0.5:5 --samples 10000
+     python -m differential_drive.sweep --grid Kp_v=0.5,1 --noise wheel_sigma=20 --noise slip=0.05 --rollouts 1000
+
+   With noise parameters every run gets a seed (column "seed") and its own random stream (noise.py), so
+   any row of a Monte-Carlo sweep is replayed exactly by a run with the same parameters and seed.
+   With --estimator the controllers use the pose estimate (estimator.py) instead of the measured pose.
+
+"""
+
+import argparse
+import csv
+import itertools
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from .batch import RobotBatch
+from .estimator import ESTIMATORS, EKF, Odometry
+from .integrators import INTEGRATORS
+from .noise import NoiseModel
+from .robot import Target
+
+# default run parameters (initial values of the simulation scripts)
+DEFAULTS = {
+    'go_to_goal': {'start_x': 200, 'start_y': 600, 'start_theta': 2 * math.pi, 'goal_x': 800, 'goal_y': 200,
+                   'Kp_v': 0.5, 'Kp_w': 1},
+    'follow_trajectory': {'start_x': 300, 'start_y': 700, 'start_theta': math.pi, 'follow_distance': 150,
+                          'Kp_v': 0.5, 'Ki_v': 0.01, 'Kd_v': 0.1, 'Kp_w': 1},
+}
+
+# noise parameters (noise.NoiseModel), used when a run sets any of them
+NOISE = {'seed': 0, 'wheel_sigma': 0, 'slip': 0, 'slip_sigma': 0, 'v_max': math.inf, 'a_max': math.inf,
+         'position_sigma': 0, 'theta_sigma': 0}
+
+# default delta t of the simulation scripts
+DT = {'go_to_goal': 0.005, 'follow_trajectory': 0.01}
+
+METRICS = ['settling_time', 'overshoot', 'rms_error', 'path_length', 'final_error']
+
+# metric of the runs with an estimator (rms position error of the estimate)
+ESTIMATE_METRICS = ['estimate_error']
+
+
+def grid(**values):  # cartesian product of parameter values, e.g. grid(Kp_v=[0.1, 0.5], Kp_w=[1, 2])
+    names = list(values)
+    return [dict(zip(names, combination)) for combination in itertools.product(*(values[name] for name in names))]
+
+
+def sample(n, seed=None, **ranges):  # n uniform random samples, e.g. sample(100, Kp_v=(0.1, 2))
+    rng = np.random.default_rng(seed)
+    columns = {name: rng.uniform(low, high, n) for name, (low, high) in ranges.items()}
+    return [{name: float(columns[name][i]) for name in ranges} for i in range(n)]
+
+
+def parameters(runs, mode):  # parameter defaults of the runs (with the noise parameters if any run is noisy)
+    if any(name in run for run in runs for name in NOISE):
+        return dict(DEFAULTS[mode], **NOISE)
+    return DEFAULTS[mode]
+
+
+def _estimator(name, params, every):  # estimator of the runs, the EKF assumes the noise of the runs
+    if name == 'odometry':
+        return Odometry(params['start_x'], params['start_y'], params['start_theta'], every)
+    if name == 'ekf':
+        # the measurement noise has a floor, the filter needs a nonzero measurement covariance
+        return EKF(params['start_x'], params['start_y'], params['start_theta'], params.get('wheel_sigma', 0),
+                   np.maximum(params.get('position_sigma', 0), 0.1), np.maximum(params.get('theta_sigma', 0), 0.001),
+                   every=every)
+    raise ValueError(f"unknown estimator: {name}")
+
+
+def evaluate(runs, mode='follow_trajectory', steps=10000, dt=None, settle_tol=5, integrator='euler', estimator=None,
+             estimator_every=1):  # runs as one batch
+    if mode not in DEFAULTS:
+        raise ValueError(f"unknown sweep mode: {mode}")
+    if steps < 1:
+        raise ValueError("a run needs at least one step")
+    if dt is None:
+        dt = DT[mode]
+
+    names = parameters(runs, mode)
+    params = {name: np.array([run.get(name, default) for run in runs], dtype=np.float64)
+              for name, default in names.items()}
+
+    noise = None
+    if 'seed' in names:
+        noise = NoiseModel(params['seed'], params['wheel_sigma'], params['slip'], params['slip_sigma'],
+                           params['v_max'], params['a_max'], params['position_sigma'], params['theta_sigma'])
+
+    # with an estimator the controllers use the estimated pose
+    if estimator is not None:
+        estimator = _estimator(estimator, params, estimator_every)
+    feedback = 'estimate' if estimator is not None else 'measurement'
+
+    if mode == 'go_to_goal':
+        batch = RobotBatch(params['start_x'], params['start_y'], params['start_theta'], dt,
+                           Kp_v=params['Kp_v'], Kp_w=params['Kp_w'], integrator=integrator, noise=noise,
+                           estimator=estimator, feedback=feedback)
+        # direction from start to goal, overshoot is the travel beyond the goal along this direction
+        dx = params['goal_x'] - params['start_x']
+        dy = params['goal_y'] - params['start_y']
+        norm = np.hypot(dx, dy)
+        norm[norm == 0] = 1
+        ux = dx / norm
+        uy = dy / norm
+    else:
+        batch = RobotBatch(params['start_x'], params['start_y'], params['start_theta'], dt,
+                           distance_star=params['follow_distance'], Kp_v=params['Kp_v'], Ki_v=params['Ki_v'],
+                           Kd_v=params['Kd_v'], Kp_w=params['Kp_w'], integrator=integrator,
+                           noise=noise, estimator=estimator, feedback=feedback)
+        target = Target()
+
+    n = len(runs)
+    last_outside = np.full(n, -1)
+    overshoot = np.zeros(n)
+    squared_error_sum = np.zeros(n)
+    path_length = np.zeros(n)
+    estimate_error_sum = np.zeros(n)
+
+    for k in range(steps):
+        x_prev = batch.x.copy()
+        y_prev = batch.y.copy()
+
+        if mode == 'go_to_goal':
+            batch.step_go_to_goal(params['goal_x'], params['goal_y'])
+            error = np.hypot(params['goal_x'] - batch.x, params['goal_y'] - batch.y)
+            overshoot = np.maximum(overshoot, (batch.x - params['goal_x']) * ux + (batch.y - params['goal_y']) * uy)
+        else:
+            target.move(k * dt)
+            batch.step_follow_trajectory(target.x, target.y)
+            if noise is None and estimator is None:
+                error = batch.follow_dist - batch.d_star
+            else:  # follow_dist is the distance seen by the controllers
+                error = np.hypot(target.x - batch.x, target.y - batch.y) - batch.d_star
+            overshoot = np.maximum(overshoot, -error)
+
+        path_length += np.hypot(batch.x - x_prev, batch.y - y_prev)
+        squared_error_sum += error ** 2
+        last_outside[np.abs(error) > settle_tol] = k
+        if estimator is not None:
+            estimate_error_sum += (estimator.x - batch.x) ** 2 + (estimator.y - batch.y) ** 2
+
+    # settling time: time after which the error stays inside the tolerance (nan if it never settles)
+    settling_time = np.where(last_outside < steps - 1, (last_outside + 1) * dt, np.nan)
+
+    results = []
+    for i, run in enumerate(runs):
+        row = {name: float(params[name][i]) for name in names}
+        if 'seed' in row:
+            row['seed'] = int(row['seed'])
+        row.update({
+            'settling_time': float(settling_time[i]),
+            'overshoot': float(overshoot[i]),
+            'rms_error': float(math.sqrt(squared_error_sum[i] / steps)),
+            'path_length': float(path_length[i]),
+            'final_error': float(error[i]),
+        })
+        if estimator is not None:
+            row['estimate_error'] = float(math.sqrt(estimate_error_sum[i] / steps))
+        results.append(row)
+    return results
+
+
+def _evaluate_chunk(args):  # process pool worker
+    start, runs, mode, steps, dt, settle_tol, integrator, estimator, estimator_every = args
+    results = evaluate(runs, mode, steps, dt, settle_tol, integrator, estimator, estimator_every)
+    for i, row in enumerate(results):
+        row['run'] = start + i
+    return results
+
+
+def run_sweep(runs, output, mode='follow_trajectory', steps=10000, dt=None, settle_tol=5, integrator='euler',
+              workers=None, chunk_size=256, estimator=None, estimator_every=1):
+    # fan the runs out over a process pool, rows are written as chunks finish
+    if mode not in DEFAULTS:
+        raise ValueError(f"unknown sweep mode: {mode}")
+
+    columns = ['run'] + list(parameters(runs, mode)) + METRICS + (ESTIMATE_METRICS if estimator is not None else [])
+    # small sweeps are split so that every worker gets a chunk
+    workers = workers or os.cpu_count()
+    chunk_size = max(1, min(chunk_size, math.ceil(len(runs) / workers)))
+    chunks = [(start, runs[start:start + chunk_size], mode, steps, dt, settle_tol, integrator, estimator,
+               estimator_every)
+              for start in range(0, len(runs), chunk_size)]
+
+    with open(output, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=columns)
+        writer.writeheader()
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_evaluate_chunk, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                writer.writerows(future.result())
+                file.flush()
+
+    return len(runs)
+
+
+def _parse_values(specs, parser, separator):
+    values = {}
+    for spec in specs:
+        name, _, value = spec.partition('=')
+        try:
+            values[name] = [float(v) for v in value.split(separator)]
+        except ValueError:
+            parser.error(f"invalid parameter specification: {spec}")
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parameter sweep for the differential drive controllers')
+    parser.add_argument('--mode', choices=sorted(DEFAULTS), default='follow_trajectory')
+    parser.add_argument('--grid', action='append', default=[], metavar='NAME=V1,V2,...',
+                        help='grid values of a parameter (repeatable)')
+    parser.add_argument('--sample', action='append', default=[], metavar='NAME=LOW:HIGH',
+                        help='uniform sampling range of a parameter (repeatable)')
+    parser.add_argument('--samples', type=int, default=100, help='number of random samples')
+    parser.add_argument('--seed', type=int, default=None, help='random seed of the samples')
+    parser.add_argument('--noise', action='append', default=[], metavar='NAME=VALUE',
+                        help=f"noise parameter of all runs (repeatable), one of: {', '.join(list(NOISE)[1:])}")
+    parser.add_argument('--rollouts', type=int, default=1,
+                        help='noisy runs per parameter set (seeds --seed, --seed + 1, ...)')
+    parser.add_argument('--steps', type=int, default=10000, help='number of steps per run')
+    parser.add_argument('--dt', type=float, default=None, help='delta t (default: value of the simulation script)')
+    parser.add_argument('--settle-tol', type=float, default=5, help='settling tolerance in pixels')
+    parser.add_argument('--integrator', choices=sorted(INTEGRATORS), default='euler', help='pose integrator')
+    parser.add_argument('--estimator', choices=sorted(ESTIMATORS), default=None,
+                        help='pose estimator used by the controllers (default: measured pose)')
+    parser.add_argument('--estimator-every', type=int, default=1, help='steps between measurement updates')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes (default: all cores)')
+    parser.add_argument('--chunk-size', type=int, default=256, help='maximum number of runs per batch')
+    parser.add_argument('--output', default='sweep.csv', help='output csv file')
+    args = parser.parse_args()
+
+    if args.grid and args.sample:
+        parser.error('--grid and --sample can not be combined')
+    if args.steps < 1:
+        parser.error('--steps must be at least 1')
+
+    for spec in args.grid + args.sample + args.noise:
+        name = spec.partition('=')[0]
+        if name not in DEFAULTS[args.mode] and name not in NOISE:
+            parser.error(f"unknown parameter for {args.mode}: {name}")
+        if name == 'seed':
+            parser.error('the seeds of the runs are set by --seed and --rollouts')
+
+    if args.sample:
+        ranges = {}
+        for name, value in _parse_values(args.sample, parser, ':').items():
+            if len(value) != 2:
+                parser.error(f"invalid sampling range: {name}")
+            ranges[name] = value
+        runs = sample(args.samples, args.seed, **ranges)
+    else:
+        runs = grid(**_parse_values(args.grid, parser, ','))
+
+    # Monte-Carlo rollouts: the runs are repeated with consecutive seeds
+    noise = {name: value[0] for name, value in _parse_values(args.noise, parser, ',').items()}
+    if noise or args.rollouts > 1:
+        seed = args.seed or 0
+        runs = [dict(noise, **run, seed=seed + i) for i, run in
+                enumerate(run for run in runs for _ in range(args.rollouts))]
+
+    n = run_sweep(runs, args.output, args.mode, args.steps, args.dt, args.settle_tol, args.integrator,
+                  args.workers, args.chunk_size, args.estimator, args.estimator_every)
+    print(f"{n} runs written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
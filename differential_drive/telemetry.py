@@ -0,0 +1,254 @@
+"""
+
+   Streaming Telemetry Server (asyncio, TCP or Unix socket)
+
+   usage:
+     python Go_to_Goal_Simulation/go_to_goal_simulation.py --headless --telemetry 8765
+     python -m differential_drive.telemetry 8765                      # print the records
+     python -m differential_drive.telemetry 8765 --output run.log     # log file of recorder.Replay
+
+   Stream format: the log format of recorder.py (16 byte header, then fixed-size float64 records), so a
+   subscriber can write the stream to a file and replay it.
+
+   The simulation thread only counts steps and, every <every> steps, packs one record and appends it to a
+   deque. The server runs its own event loop in a background thread, every subscriber has a bounded queue
+   and the oldest records are dropped when it does not keep up, so slow subscribers never stall the physics.
+
+"""
+
+import argparse
+import asyncio
+import os
+import struct
+import sys
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from .recorder import HEADER_SIZE, MAGIC, RECORD, robot_record
+
+_PACK = struct.Struct('<' + 'd' * len(RECORD.names)).pack
+HEADER = MAGIC + np.uint64(RECORD.itemsize).tobytes()
+
+
+def address(spec):  # "8765", "host:8765" or a Unix socket path
+    if '/' in spec:
+        return {'path': spec}
+    host, _, port = spec.rpartition(':')
+    return {'host': host or '127.0.0.1', 'port': int(port)}
+
+
+class Subscriber:
+    def __init__(self, writer, queue_size):
+        self.writer = writer
+        self.queue = deque(maxlen=queue_size)  # drop-oldest
+        self.ready = asyncio.Event()
+        self.dropped = 0
+        self.task = asyncio.current_task()
+
+    def put(self, records):
+        overflow = len(self.queue) + len(records) - self.queue.maxlen
+        if overflow > 0:
+            self.dropped += overflow
+        self.queue.extend(records)
+        self.ready.set()
+
+    async def run(self):
+        self.writer.write(HEADER)
+        while True:
+            await self.ready.wait()
+            self.ready.clear()
+            chunk = b''.join(self.queue)
+            self.queue.clear()
+            self.writer.write(chunk)
+            await self.writer.drain()  # backpressure of this subscriber only
+
+
+class TelemetryServer:
+    def __init__(self, host='127.0.0.1', port=8765, path=None, every=10, queue_size=1024, flush_interval=0.01):
+        self.host = host
+        self.port = port
+        self.path = path  # Unix socket path (instead of TCP)
+        self.every = every  # decimation: one record per <every> steps
+        self.queue_size = queue_size  # records per subscriber queue
+        self.flush_interval = flush_interval  # seconds between hand-overs to the subscribers
+
+        # records of the simulation thread (deque append / popleft are thread-safe)
+        self.pending = deque(maxlen=queue_size)
+        self.count = 0
+        self.published = 0
+        self.dropped = 0  # records dropped before the hand-over (pending deque full)
+
+        self.subscribers = set()
+        self.loop = None
+        self.thread = None
+        self.started = threading.Event()
+        self.stopping = None
+        self.error = None  # exception of the server startup (e.g. port in use), raised by start()
+
+    # === SIMULATION THREAD ===
+    def publish(self, t, robot, target=None):  # call every step, records every <every> steps
+        self.count += 1
+        if self.count < self.every:
+            return
+        self.count = 0
+        self._append(_PACK(*robot_record(t, robot, target)))
+
+    def publish_record(self, record):  # tuple of the RECORD fields (not decimated)
+        self._append(_PACK(*record))
+
+    def _append(self, packed):
+        if len(self.pending) == self.pending.maxlen:
+            self.dropped += 1  # the deque drops the oldest record
+        self.pending.append(packed)
+        self.published += 1
+
+    # === SERVER THREAD ===
+    async def _client(self, reader, writer):
+        subscriber = Subscriber(writer, self.queue_size)
+        self.subscribers.add(subscriber)
+        try:
+            await subscriber.run()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.subscribers.discard(subscriber)
+            writer.close()
+
+    async def _serve(self):
+        self.stopping = asyncio.Event()
+        try:
+            if self.path is not None:
+                server = await asyncio.start_unix_server(self._client, self.path)
+            else:
+                server = await asyncio.start_server(self._client, self.host, self.port)
+                self.port = server.sockets[0].getsockname()[1]  # port 0: chosen by the system
+        except OSError as error:
+            self.error = error
+            return
+        finally:
+            self.started.set()
+
+        async with server:
+            while not self.stopping.is_set():
+                self._flush()
+                try:
+                    await asyncio.wait_for(self.stopping.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+            # let the subscribers write the last records, then close the connections
+            self._flush()
+            for _ in range(100):
+                if not any(subscriber.queue for subscriber in self.subscribers):
+                    break
+                await asyncio.sleep(self.flush_interval)
+            tasks = [subscriber.task for subscriber in self.subscribers]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _flush(self):
+        records = []
+        while self.pending:
+            records.append(self.pending.popleft())
+        if records:
+            for subscriber in self.subscribers:
+                subscriber.put(records)
+
+    def start(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_until_complete, args=(self._serve(),), daemon=True)
+        self.thread.start()
+        self.started.wait()
+        if self.error is not None:  # the server thread has ended
+            self.thread.join()
+            self.loop.close()
+            self.thread = None
+            raise self.error
+        return self
+
+    def wait(self, subscribers=1, timeout=None):  # block until <subscribers> are connected, False on timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while len(self.subscribers) < subscribers:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def subscriber_dropped(self):  # records dropped by the queues of the connected subscribers
+        return sum(subscriber.dropped for subscriber in self.subscribers)
+
+    def stop(self):
+        if self.thread is not None:
+            self.loop.call_soon_threadsafe(self.stopping.set)
+            self.thread.join()
+            self.loop.close()
+            self.thread = None
+            if self.path is not None and os.path.exists(self.path):
+                os.remove(self.path)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+async def subscribe(host='127.0.0.1', port=8765, path=None):  # async generator of received record arrays
+    if path is not None:
+        reader, writer = await asyncio.open_unix_connection(path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+
+    try:
+        header = await reader.readexactly(HEADER_SIZE)
+        if header[:8] != MAGIC:
+            raise ValueError("not a telemetry stream")
+
+        buffer = b''
+        while True:
+            data = await reader.read(1 << 16)
+            if not data:
+                break
+            buffer += data
+            count = len(buffer) // RECORD.itemsize
+            if count:
+                yield np.frombuffer(buffer[:count * RECORD.itemsize], dtype=RECORD)
+                buffer = buffer[count * RECORD.itemsize:]
+    finally:
+        writer.close()
+
+
+async def _listen(target, output):
+    file = open(output, 'wb') if output is not None else None
+    if file is not None:
+        file.write(HEADER)
+    try:
+        async for records in subscribe(**target):
+            if file is not None:
+                file.write(records.tobytes())
+            else:
+                for record in records:
+                    print(', '.join(f"{name} = {record[name]:.4f}" for name in RECORD.names))
+    finally:
+        if file is not None:
+            file.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Telemetry subscriber of a running simulation')
+    parser.add_argument('address', help='port, host:port or Unix socket path of the telemetry server')
+    parser.add_argument('--output', default=None, help='write the records to a log file (recorder format)')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(_listen(address(args.address), args.output))
+    except (KeyboardInterrupt, ConnectionError) as error:
+        sys.exit(str(error) or None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+
+   Fixed-Capacity Ring Buffer for Trail Points
+
+"""
+
+import numpy as np
+
+
+class TrailBuffer:  # keeps the last <capacity> points, append is O(1)
+    def __init__(self, capacity=1250):
+        if capacity < 2:
+            raise ValueError("trail capacity must be at least 2 points")
+
+        self.capacity = capacity
+        self.data = np.zeros((capacity, 2))
+        self.index = 0  # next write position
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, x, y):  # returns True when the write position wraps to the start of the buffer
+        self.data[self.index, 0] = x
+        self.data[self.index, 1] = y
+        self.index = (self.index + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+        return self.index == 0
+
+    def last(self):  # most recent point (None if empty)
+        if self.count == 0:
+            return None
+        return self.data[self.index - 1]
+
+    def points(self):  # stored points from oldest to newest
+        if self.count < self.capacity:
+            return self.data[:self.count]
+        return np.concatenate((self.data[self.index:], self.data[:self.index]))
+
+    def clear(self):
+        self.index = 0
+        self.count = 0
@@ -0,0 +1,139 @@
+"""
+
+   Reference Trajectories and Lookahead Trajectory Trackers (Pure Pursuit, Stanley)
+
+   Trajectories are pre-sampled into arrays indexed by arc length. The trackers keep the index of the
+   nearest point and only scan a window ahead of it each step (monotonic progress along the path).
+
+"""
+
+import math
+import numpy as np
+
+
+class Trajectory:
+    def __init__(self, x, y):
+        self.x = np.ascontiguousarray(x, dtype=np.float64)
+        self.y = np.ascontiguousarray(y, dtype=np.float64)
+        if len(self.x) < 2 or len(self.x) != len(self.y):
+            raise ValueError("a trajectory needs at least two (x, y) points")
+
+        # arc length and heading of every point
+        segment = np.hypot(np.diff(self.x), np.diff(self.y))
+        self.s = np.concatenate(([0], np.cumsum(segment)))
+        heading = np.arctan2(np.diff(self.y), np.diff(self.x))
+        self.heading = np.concatenate((heading, heading[-1:]))
+        self.length = self.s[-1]
+
+    def __len__(self):
+        return len(self.x)
+
+    @classmethod
+    def from_function(cls, fn, t_start, t_end, samples=100000):  # fn(t) -> (x, y), e.g. Target.position
+        t = np.linspace(t_start, t_end, samples)
+        x, y = fn(t)
+        return cls(np.broadcast_to(x, t.shape), np.broadcast_to(y, t.shape))
+
+    @classmethod
+    def from_file(cls, path):  # waypoints: .npy array or text file with "x, y" rows
+        if path.endswith('.npy'):
+            points = np.load(path)
+        else:
+            points = np.loadtxt(path, delimiter=',', ndmin=2)
+        return cls(points[:, 0], points[:, 1])
+
+    def resample(self, spacing):  # points at uniform arc length spacing
+        s = np.arange(0, self.length + spacing / 2, spacing)
+        return Trajectory(np.interp(s, self.s, self.x), np.interp(s, self.s, self.y))
+
+    def index_at(self, s):  # index of the first point at or beyond arc length s
+        return min(int(np.searchsorted(self.s, s)), len(self.s) - 1)
+
+    def nearest(self, x, y, start=0, window=None):  # index of the nearest point in [start, start + window)
+        end = len(self.x) if window is None else min(start + window, len(self.x))
+        d_sq = (self.x[start:end] - x) ** 2 + (self.y[start:end] - y) ** 2
+        return start + int(np.argmin(d_sq))
+
+
+class Tracker:  # nearest point search shared by the trackers
+    def __init__(self, trajectory, speed=100, window=256, Kp_v=0.5):
+        self.trajectory = trajectory
+        self.speed = speed  # cruise speed (pixel/s)
+        self.window = window  # points scanned ahead of the last nearest point
+        self.Kp_v = Kp_v  # P-control gain of the speed towards the end of the trajectory
+        self.index = None
+        self.cross_track = 0  # signed distance to the trajectory (positive to the left of the path heading)
+
+    def update_index(self, x, y):
+        trajectory = self.trajectory
+        if self.index is None:
+            # first step: global search (once)
+            self.index = trajectory.nearest(x, y)
+            return self.index
+
+        # windowed monotonic scan, slides on while the nearest point is at the end of the window
+        while True:
+            start = self.index
+            self.index = trajectory.nearest(x, y, start, self.window)
+            if self.index == start or self.index < min(start + self.window, len(trajectory)) - 1:
+                break
+        return self.index
+
+    def _cross_track(self, x, y):
+        trajectory = self.trajectory
+        i = self.index
+        heading = trajectory.heading[i]
+        dx = x - trajectory.x[i]
+        dy = y - trajectory.y[i]
+        self.cross_track = math.cos(heading) * dy - math.sin(heading) * dx
+        return self.cross_track
+
+    def _linear_velocity(self):
+        remaining = self.trajectory.length - self.trajectory.s[self.index]
+        return min(self.speed, self.Kp_v * remaining)
+
+    def reset(self):
+        self.index = None
+
+
+class PurePursuit(Tracker):
+    def __init__(self, trajectory, lookahead=80, speed=100, window=256, Kp_v=0.5):
+        super().__init__(trajectory, speed, window, Kp_v)
+        self.lookahead = lookahead  # lookahead distance along the path (pixel)
+
+    def command(self, x, y, theta):  # (v, w) of the robot
+        trajectory = self.trajectory
+        i = self.update_index(x, y)
+        self._cross_track(x, y)
+
+        target = trajectory.index_at(trajectory.s[i] + self.lookahead)
+        x_look = trajectory.x[target]
+        y_look = trajectory.y[target]
+        alpha = math.atan2(y_look - y, x_look - x) - theta
+        alpha = math.atan2(math.sin(alpha), math.cos(alpha))
+        distance = math.hypot(x_look - x, y_look - y)
+
+        v = self._linear_velocity()
+        curvature = 2 * math.sin(alpha) / distance if distance > 0 else 0
+        return v, v * curvature
+
+
+class Stanley(Tracker):
+    def __init__(self, trajectory, k=1.0, Kp_w=2.0, speed=100, window=256, Kp_v=0.5, softening=1.0):
+        super().__init__(trajectory, speed, window, Kp_v)
+        self.k = k  # cross track gain
+        self.Kp_w = Kp_w  # heading P-control gain
+        self.softening = softening  # keeps the cross track term finite at low speed
+
+    def command(self, x, y, theta):  # (v, w) of the robot
+        i = self.update_index(x, y)
+        e = self._cross_track(x, y)
+
+        v = self._linear_velocity()
+        heading_error = self.trajectory.heading[i] - theta
+        heading_error = math.atan2(math.sin(heading_error), math.cos(heading_error))
+        steer = heading_error - math.atan2(self.k * e, self.softening + v)
+        return v, self.Kp_w * steer
+
+
+TRACKERS = {'pure_pursuit': PurePursuit, 'stanley': Stanley}
@@ -0,0 +1,148 @@
+"""
+
+   Multi-Robot World with Spatial Hash Collision and Proximity Queries
+
+"""
+
+import math
+import numpy as np
+
+# cell coordinates are packed into one int64 key
+_OFFSET = 1 << 31
+
+
+def _keys(cx, cy):
+    return ((cx + _OFFSET) << 32) | (cy + _OFFSET)
+
+
+def _expand(query, starts, counts):  # (query, position) pairs for the points of the matched cells
+    query = np.repeat(query, counts)
+    first = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return query, first + np.arange(len(query))
+
+
+class SpatialHash:  # uniform grid over point positions, rebuilt with one sort per step
+    def __init__(self, cell_size):
+        if cell_size <= 0:
+            raise ValueError("cell size must be positive")
+
+        self.cell_size = cell_size
+        self.x = np.zeros(0)
+        self.y = np.zeros(0)
+        self.order = np.zeros(0, dtype=np.int64)  # point indices sorted by cell
+        self.cells = np.zeros(0, dtype=np.int64)  # keys of the occupied cells
+        self.starts = np.zeros(0, dtype=np.int64)  # first position of each cell in order
+        self.counts = np.zeros(0, dtype=np.int64)  # points in each cell
+
+    def __len__(self):
+        return len(self.x)
+
+    def _cell(self, x, y):
+        return (np.floor(np.asarray(x) / self.cell_size).astype(np.int64),
+                np.floor(np.asarray(y) / self.cell_size).astype(np.int64))
+
+    def build(self, x, y):
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        cx, cy = self._cell(self.x, self.y)
+        keys = _keys(cx, cy)
+        self.order = np.argsort(keys, kind='stable')
+        self.cells, self.starts, self.counts = np.unique(keys[self.order], return_index=True, return_counts=True)
+
+    def _candidates(self, qx, qy, offsets):  # (query, point) candidate pairs from the cells around the queries
+        cx, cy = self._cell(qx, qy)
+        query_parts = []
+        point_parts = []
+        for dx, dy in offsets:
+            keys = _keys(cx + dx, cy + dy)
+            cell = np.searchsorted(self.cells, keys)
+            cell[cell == len(self.cells)] = 0
+            found = np.nonzero(self.cells[cell] == keys)[0] if len(self.cells) else np.zeros(0, dtype=np.int64)
+            query, position = _expand(found, self.starts[cell[found]], self.counts[cell[found]])
+            query_parts.append(query)
+            point_parts.append(position)
+        return np.concatenate(query_parts), np.concatenate(point_parts)
+
+    def query(self, qx, qy, radius):  # all (query, point) index pairs closer than radius
+        qx = np.atleast_1d(np.asarray(qx, dtype=np.float64))
+        qy = np.atleast_1d(np.asarray(qy, dtype=np.float64))
+        reach = math.ceil(radius / self.cell_size)
+        offsets = [(dx, dy) for dx in range(-reach, reach + 1) for dy in range(-reach, reach + 1)]
+
+        query, position = self._candidates(qx, qy, offsets)
+        point = self.order[position]
+        close = (self.x[point] - qx[query]) ** 2 + (self.y[point] - qy[query]) ** 2 <= radius ** 2
+        return query[close], point[close]
+
+    def neighbors(self, x, y, radius):  # indices of the points closer than radius to (x, y)
+        return np.sort(self.query(x, y, radius)[1])
+
+    def pairs(self, radius):  # all point pairs (i < j) closer than radius
+        sorted_x = self.x[self.order]
+        sorted_y = self.y[self.order]
+        reach = math.ceil(radius / self.cell_size)
+
+        # half neighborhood, every pair of cells is visited once
+        offsets = [(dx, dy) for dx in range(0, reach + 1) for dy in range(-reach, reach + 1) if dx > 0 or dy >= 0]
+        query, position = self._candidates(sorted_x, sorted_y, offsets)
+
+        # inside the same cell only position > query, so no pair is reported twice
+        cq = self._cell(sorted_x[query], sorted_y[query])
+        cp = self._cell(sorted_x[position], sorted_y[position])
+        same = (cq[0] == cp[0]) & (cq[1] == cp[1])
+        keep = ~same | (position > query)
+        query = query[keep]
+        position = position[keep]
+
+        close = (sorted_x[position] - sorted_x[query]) ** 2 + (sorted_y[position] - sorted_y[query]) ** 2 <= radius ** 2
+        i = self.order[query[close]]
+        j = self.order[position[close]]
+        return np.minimum(i, j), np.maximum(i, j)
+
+
+class World:  # robots of a RobotBatch and static circular obstacles
+    def __init__(self, robots, obstacles=None, robot_radius=None, cell_size=None):
+        self.robots = robots  # RobotBatch
+        self.robot_radius = robots.width / 2 if robot_radius is None else robot_radius
+
+        # obstacles: (x, y, radius) rows
+        self.obstacles = np.zeros((0, 3)) if obstacles is None else np.asarray(obstacles, dtype=np.float64).reshape(-1, 3)
+
+        # cells of at least one collision distance, so collisions are found in the neighbouring cells
+        if cell_size is None:
+            cell_size = 2 * self.robot_radius
+        self.robot_hash = SpatialHash(cell_size)
+        self.obstacle_hash = SpatialHash(max(cell_size, self.robot_radius + self.obstacles[:, 2].max(initial=0)))
+        self.obstacle_hash.build(self.obstacles[:, 0], self.obstacles[:, 1])
+
+        # collisions found by the last update
+        self.robot_collisions = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+        self.obstacle_collisions = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+
+    def add_obstacle(self, x, y, radius):
+        self.obstacles = np.vstack((self.obstacles, (x, y, radius)))
+        self.obstacle_hash = SpatialHash(max(self.obstacle_hash.cell_size, self.robot_radius + radius))
+        self.obstacle_hash.build(self.obstacles[:, 0], self.obstacles[:, 1])
+
+    def update(self):  # rebuild the robot hash and find collisions, call after each step of the robots
+        self.robot_hash.build(self.robots.x, self.robots.y)
+        self.robot_collisions = self.robot_hash.pairs(2 * self.robot_radius)
+
+        if len(self.obstacles):
+            reach = self.robot_radius + self.obstacles[:, 2].max()
+            robot, obstacle = self.obstacle_hash.query(self.robots.x, self.robots.y, reach)
+            dist_sq = (self.robots.x[robot] - self.obstacles[obstacle, 0]) ** 2 + \
+                      (self.robots.y[robot] - self.obstacles[obstacle, 1]) ** 2
+            hit = dist_sq <= (self.robot_radius + self.obstacles[obstacle, 2]) ** 2
+            self.obstacle_collisions = (robot[hit], obstacle[hit])
+
+    def colliding(self):  # mask of the robots in any collision
+        mask = np.zeros(len(self.robots), dtype=bool)
+        mask[self.robot_collisions[0]] = True
+        mask[self.robot_collisions[1]] = True
+        mask[self.obstacle_collisions[0]] = True
+        return mask
+
+    def neighbors(self, i, radius):  # robots closer than radius to robot i (without i)
+        neighbors = self.robot_hash.neighbors(self.robots.x[i], self.robots.y[i], radius)
+        return neighbors[neighbors != i]
@@ -0,0 +1,78 @@
+import math
+
+import numpy as np
+
+from differential_drive.batch import RobotBatch
+from differential_drive.robot import FollowTrajectoryRobot, GoToGoalRobot, ManualRobot, Target
+
+POSES = [(200.0, 600.0, 2 * math.pi), (1200.0, 100.0, 0.5), (700.0, 400.0, 3.5)]
+
+
+def _pose(robots):
+    return [np.array([getattr(robot, name) for robot in robots]) for name in ('x', 'y', 'theta', 'vr', 'vl')]
+
+
+def _batch_pose(batch):
+    return [batch.x, batch.y, batch.theta, batch.vr, batch.vl]
+
+
+def test_go_to_goal_matches_scalar_robots():
+    robots = [GoToGoalRobot(x, y, theta, 800, 200) for x, y, theta in POSES]
+    batch = RobotBatch(*zip(*POSES))
+    for _ in range(1000):
+        for robot in robots:
+            robot.step()
+        batch.step_go_to_goal(800, 200)
+    for expected, actual in zip(_pose(robots), _batch_pose(batch)):
+        np.testing.assert_array_equal(actual, expected)
+
+
+def test_follow_trajectory_matches_scalar_robots():
+    robots = [FollowTrajectoryRobot(x, y, theta, 150) for x, y, theta in POSES]
+    batch = RobotBatch(*zip(*POSES), dt=0.01, distance_star=150)
+    target = Target()
+    for k in range(1000):
+        target.move(k * 0.01)
+        for robot in robots:
+            robot.step((target.x, target.y))
+        batch.step_follow_trajectory(target.x, target.y)
+    for expected, actual in zip(_pose(robots), _batch_pose(batch)):
+        np.testing.assert_array_equal(actual, expected)
+    np.testing.assert_array_equal(batch.e_distance_sum, [robot.e_distance_sum for robot in robots])
+
+
+def test_icc_matches_manual_robots():
+    robots = [ManualRobot(x, y, theta) for x, y, theta in POSES]
+    batch = RobotBatch(*zip(*POSES))
+    for robot, vr in zip(robots, (25, 20, -10)):
+        robot.vl = 20
+        robot.vr = vr
+    batch.vl[:] = 20
+    batch.vr[:] = (25, 20, -10)
+    for _ in range(1000):
+        for robot in robots:
+            robot.step()
+        batch.step_icc()
+    for expected, actual in zip(_pose(robots), _batch_pose(batch)):
+        np.testing.assert_array_equal(actual, expected)
+
+
+def test_default_integrators_given_by_name_match_the_defaults():
+    default = RobotBatch(*zip(*POSES))
+    named = RobotBatch(*zip(*POSES), integrator='euler')
+    for _ in range(200):
+        default.step_go_to_goal(800, 200)
+        named.step_go_to_goal(800, 200)
+    for expected, actual in zip(_batch_pose(default), _batch_pose(named)):
+        np.testing.assert_array_equal(actual, expected)
+
+    default = RobotBatch(*zip(*POSES))
+    named = RobotBatch(*zip(*POSES), integrator='exact')
+    for batch in (default, named):
+        batch.vr[:] = 25
+        batch.vl[:] = 20
+    for _ in range(200):
+        default.step_icc()
+        named.step_icc()
+    for expected, actual in zip(_batch_pose(default), _batch_pose(named)):
+        np.testing.assert_array_equal(actual, expected)
@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+from differential_drive import benchmark
+
+BASELINE = {'go_to_goal': {'p50': 1e-6, 'p90': 1.2e-6, 'p99': 2e-6},
+            'batch_1000': {'p50': 2e-5, 'p90': 2.5e-5, 'p99': 3e-5}}
+
+
+def _main(monkeypatch, tmp_path, results, threshold='0.2'):
+    path = tmp_path / 'baseline.json'
+    path.write_text(json.dumps(BASELINE))
+    monkeypatch.setattr(benchmark, 'run', lambda *args: results)
+    monkeypatch.setattr('sys.argv', ['benchmark', '--compare', str(path), '--threshold', threshold])
+    benchmark.main()
+
+
+def _scaled(factors):
+    return {name: {key: value * factors.get(name, 1) for key, value in result.items()}
+            for name, result in BASELINE.items()}
+
+
+def test_within_tolerance_passes(monkeypatch, tmp_path):
+    _main(monkeypatch, tmp_path, _scaled({'go_to_goal': 1.15, 'batch_1000': 0.5}))
+
+
+def test_regression_fails(monkeypatch, tmp_path, capsys):
+    with pytest.raises(SystemExit) as exc:
+        _main(monkeypatch, tmp_path, _scaled({'batch_1000': 1.3}))
+    assert exc.value.code == 1
+    assert 'regression (> 20% slower): batch_1000' in capsys.readouterr().out
+
+
+def test_compare_ignores_benchmarks_missing_from_the_baseline():
+    results = dict(_scaled({'go_to_goal': 1.5}), render_full={'p50': 1, 'p90': 1, 'p99': 1})
+    assert benchmark.compare(results, BASELINE, 0.1) == ['go_to_goal']
+    assert benchmark.compare(results, BASELINE, 0.6) == []
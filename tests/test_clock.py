@@ -0,0 +1,74 @@
+import math
+
+import pytest
+
+from differential_drive import clock
+from differential_drive.clock import SimulationClock, interpolate
+
+
+class FakeTime:  # perf_counter replacement, advanced by the test (and by every read in max mode)
+    def __init__(self, step=0):
+        self.now = 0
+        self.step = step
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+
+@pytest.fixture
+def fake_time(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(clock.time, 'perf_counter', fake)
+    return fake
+
+
+def test_fixed_mode_steps_in_real_time(fake_time):
+    sim = SimulationClock(0.25)
+    times = []
+    assert sim.run_frame(times.append) == 0
+    fake_time.now += 0.875
+    assert sim.run_frame(times.append) == 3
+    assert times == [0, 0.25, 0.5]
+    assert sim.alpha == 0.5
+    fake_time.now += 0.125
+    assert sim.run_frame(times.append) == 1
+    assert sim.alpha == 0
+    assert sim.t == 1
+
+
+def test_accelerated_mode_scales_the_wall_time(fake_time):
+    sim = SimulationClock(0.125, 'accelerated', speed=8)
+    sim.run_frame(lambda t: None)
+    fake_time.now += 0.5
+    assert sim.run_frame(lambda t: None) == 32
+
+
+def test_stalls_are_capped(fake_time):
+    sim = SimulationClock(0.01, max_steps_per_frame=5)
+    sim.run_frame(lambda t: None)
+    fake_time.now += 10
+    assert sim.run_frame(lambda t: None) == 5
+    assert sim.alpha == 1
+    fake_time.now += 0.001
+    assert sim.run_frame(lambda t: None) == 1
+
+
+def test_max_mode_fills_the_frame_budget(monkeypatch):
+    monkeypatch.setattr(clock.time, 'perf_counter', FakeTime(step=0.001))
+    sim = SimulationClock(0.01, 'max', fps=100)
+    count = sim.run_frame(lambda t: None)
+    assert 0 < count <= 10
+    assert sim.alpha == 0
+    assert sim.steps == count
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        SimulationClock(0.01, 'slow')
+
+
+def test_interpolate_takes_the_short_way_around():
+    x, y, theta = interpolate((0, 0, math.pi - 0.1), (10, 20, -math.pi + 0.1), 0.5)
+    assert (x, y) == (5, 10)
+    assert math.cos(theta) == pytest.approx(-1)
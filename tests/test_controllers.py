@@ -0,0 +1,51 @@
+import math
+
+import numpy as np
+import pytest
+
+from differential_drive import controllers
+
+
+def test_pid_error_sum_is_clamped():
+    error_sum, error_prev = 0.0, 0.0
+    for _ in range(100):
+        output, error_sum, error_prev = controllers.pid(3.0, error_sum, error_prev, 1, 0.5, 0, 0.1, sum_limit=10)
+    assert error_sum == 10
+    assert output == pytest.approx(3 + 0.5 * 10 * 0.1)
+
+    # the clamped sum unwinds as soon as the error changes sign
+    output, error_sum, _ = controllers.pid(-3.0, error_sum, error_prev, 1, 0.5, 0, 0.1, sum_limit=10)
+    assert error_sum == 7
+
+
+def test_pid_without_limit_accumulates():
+    error_sum = 0.0
+    for _ in range(100):
+        _, error_sum, _ = controllers.pid(3.0, error_sum, 0.0, 1, 0.5, 0, 0.1)
+    assert error_sum == 300
+
+
+def test_pid_in_place_matches_returned_arrays():
+    rng = np.random.default_rng(2)
+    errors = rng.normal(0, 5, (50, 8))
+    error_sum, error_prev = np.zeros(8), np.zeros(8)
+    sum_in_place, prev_in_place = np.zeros(8), np.zeros(8)
+    out, scratch = np.empty(8), np.empty(8)
+    for error in errors:
+        output, error_sum, error_prev = controllers.pid(error, error_sum, error_prev, 0.5, 0.2, 0.1, 0.01, 12)
+        controllers.pid(error, sum_in_place, prev_in_place, 0.5, 0.2, 0.1, 0.01, 12, out, scratch)
+        np.testing.assert_allclose(out, output)
+    assert np.all(np.abs(error_sum) <= 12)
+    np.testing.assert_allclose(sum_in_place, error_sum)
+    np.testing.assert_array_equal(prev_in_place, error_prev)
+
+
+def test_go_to_goal_arrays_match_scalars():
+    x = np.array([0.0, 100.0, 50.0])
+    y = np.array([0.0, -20.0, 300.0])
+    theta = np.array([0.0, 2.0, -1.0])
+    vr, vl, w, d = controllers.go_to_goal(x, y, theta, 400, 200, 0.5, 1, 113.4)
+    for i in range(3):
+        expected = controllers.go_to_goal(float(x[i]), float(y[i]), float(theta[i]), 400, 200, 0.5, 1, 113.4)
+        assert (vr[i], vl[i], w[i], d[i]) == pytest.approx(expected)
+    assert d[0] == pytest.approx(math.hypot(400, 200))
@@ -0,0 +1,67 @@
+import math
+
+import numpy as np
+import pytest
+
+from differential_drive.batch import RobotBatch
+from differential_drive.estimator import EKF, Odometry
+from differential_drive.noise import NoiseModel
+from differential_drive.robot import Target
+
+N = 40
+
+
+def _run(estimator, noise, steps=500):  # rms position error of the estimate
+    x = np.linspace(0, 1000, N)
+    batch = RobotBatch(x, 700, math.pi, dt=0.01, distance_star=150, noise=noise, estimator=estimator,
+                       feedback='truth')
+    errors = []
+    for k in range(steps):
+        batch.step_follow_trajectory(*Target.position(k * 0.01))
+        errors.append(np.hypot(estimator.x - batch.x, estimator.y - batch.y))
+    return np.sqrt(np.mean(np.square(errors)))
+
+
+def _noise():
+    return NoiseModel(np.arange(N), wheel_sigma=10, slip=0.03, slip_sigma=0.02, position_sigma=5, theta_sigma=0.03)
+
+
+def test_noiseless_odometry_follows_the_robots():
+    x = np.linspace(0, 1000, N)
+    assert _run(Odometry(x, 700, math.pi), None) < 1e-9
+
+
+def test_ekf_beats_odometry():
+    x = np.linspace(0, 1000, N)
+    odometry = _run(Odometry(x, 700, math.pi), _noise())
+    ekf = _run(EKF(x, 700, math.pi, 10, 5, 0.03), _noise())
+    assert odometry > 10
+    assert ekf < 5
+    assert ekf < odometry / 3
+
+
+def test_ekf_with_landmarks():
+    x = np.linspace(0, 1000, N)
+    landmarks = [(x, y) for x in range(0, 1500, 250) for y in range(0, 800, 250)]
+    odometry = _run(Odometry(x, 700, math.pi), _noise())
+    ekf = _run(EKF(x, 700, math.pi, 10, 5, 0.03, landmarks=landmarks), _noise())
+    assert ekf < odometry / 2
+
+
+def test_pose_update_shrinks_the_covariance():
+    ekf = EKF([0.0, 10.0], [0.0, 5.0], [0.0, 1.0], initial_sigma=(10, 10, 0.5))
+    before = np.trace(ekf.P, axis1=1, axis2=2)
+    ekf.update_pose(np.array([1.0, 11.0]), np.array([-1.0, 4.0]), np.array([0.1, 0.9]))
+    assert np.all(np.trace(ekf.P, axis1=1, axis2=2) < before)
+    np.testing.assert_allclose(ekf.P, ekf.P.transpose(0, 2, 1), atol=1e-12)
+    assert ekf.x[0] == pytest.approx(1, abs=0.05)
+
+
+def test_a_robot_on_its_landmark_is_left_out_of_the_update():
+    ekf = EKF([100.0, 0.0], [200.0, 0.0], [0.0, 0.0], landmarks=[(100, 200), (50, 50)])
+    P = ekf.P.copy()
+    with np.errstate(all='raise'):
+        ekf.update_landmark(np.array([0.0, 70.0]), np.array([0.3, 0.8]), np.array([0, 1]))
+    assert (ekf.x[0], ekf.y[0], ekf.theta[0]) == (100, 200, 0)
+    np.testing.assert_array_equal(ekf.P[0], P[0])
+    assert np.all(np.isfinite(ekf.P)) and np.trace(ekf.P[1]) < np.trace(P[1])
@@ -0,0 +1,184 @@
+import struct
+import threading
+import zlib
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+
+from differential_drive import export
+from differential_drive.export import Exporter, FrameWriter, encode_png
+from differential_drive.recorder import RECORD, Recorder
+
+
+def _frame(width, height, value):
+    return (np.arange(width * height * 3, dtype=np.uint32) * value % 256).astype(np.uint8).tobytes()
+
+
+def _decode_png(data):  # RGB24 pixels of an unfiltered PNG of encode_png
+    assert data[:8] == b'\x89PNG\r\n\x1a\n'
+    chunks = {}
+    position = 8
+    while position < len(data):
+        length, = struct.unpack('>I', data[position:position + 4])
+        kind = data[position + 4:position + 8]
+        body = data[position + 8:position + 8 + length]
+        assert struct.unpack('>I', data[position + 8 + length:position + 12 + length])[0] == zlib.crc32(kind + body)
+        chunks[kind] = body
+        position += 12 + length
+    width, height = struct.unpack('>II', chunks[b'IHDR'][:8])
+    scanlines = np.frombuffer(zlib.decompress(chunks[b'IDAT']), dtype=np.uint8).reshape(height, width * 3 + 1)
+    assert not scanlines[:, 0].any()
+    return width, height, scanlines[:, 1:].tobytes()
+
+
+def test_png_round_trip():
+    pixels = _frame(7, 5, 3)
+    assert _decode_png(encode_png(pixels, 7, 5)) == (7, 5, pixels)
+
+
+def test_png_sequence(tmp_path):
+    frames = [_frame(4, 3, value) for value in (1, 2, 5)]
+    with FrameWriter(tmp_path / 'frames', 4, 3, queue_size=1) as writer:
+        for pixels in frames:
+            writer.write(pixels)
+    assert writer.count == 3
+    for index, pixels in enumerate(frames):
+        data = (tmp_path / 'frames' / f"frame_{index:06d}.png").read_bytes()
+        assert _decode_png(data) == (4, 3, pixels)
+
+
+def test_raw_stream(tmp_path):
+    frames = [_frame(4, 3, value) for value in range(1, 20)]
+    with FrameWriter(tmp_path / 'run.rgb', 4, 3, format='raw', queue_size=2) as writer:
+        for pixels in frames:
+            writer.write(pixels)
+    assert (tmp_path / 'run.rgb').read_bytes() == b''.join(frames)
+
+
+def test_a_writer_error_is_raised_by_write_and_close(tmp_path, monkeypatch):
+    def encode_png(*args):
+        raise RuntimeError('encoder failed')
+
+    monkeypatch.setattr(export, 'encode_png', encode_png)
+    writer = FrameWriter(tmp_path / 'frames', 4, 3, queue_size=1)
+    with pytest.raises(RuntimeError):
+        for _ in range(100):  # the thread keeps draining the queue, write() does not block
+            writer.write(_frame(4, 3, 1))
+    with pytest.raises(RuntimeError):
+        writer.close()
+    assert not list((tmp_path / 'frames').iterdir())
+
+
+def test_an_error_releases_a_write_blocked_on_the_full_queue(tmp_path, monkeypatch):
+    release = threading.Event()
+
+    def encode_png(*args):
+        release.wait()
+        raise ValueError('bad frame')
+
+    monkeypatch.setattr(export, 'encode_png', encode_png)
+    writer = FrameWriter(tmp_path / 'frames', 4, 3, queue_size=1)
+    errors = []
+
+    def produce():
+        try:
+            for _ in range(5):  # the 3rd frame waits for the queue, the writer is stuck on the 1st
+                writer.write(_frame(4, 3, 1))
+        except ValueError as error:
+            errors.append(error)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    producer.join(0.2)
+    assert producer.is_alive()
+    release.set()
+    producer.join(5)
+    assert not producer.is_alive()
+    assert len(errors) == 1
+    with pytest.raises(ValueError):
+        writer.close()
+
+
+def test_frames_of_the_wrong_size_are_rejected(tmp_path):
+    with FrameWriter(tmp_path / 'run.rgb', 4, 3, format='raw') as writer:
+        with pytest.raises(ValueError):
+            writer.write(_frame(3, 3, 1))
+    assert writer.count == 0
+
+
+class Renderer:  # FrameRenderer without pygame, frames are the records' x
+    def __init__(self, width, height, size, *args):
+        self.size = size or (width, height)
+
+    def render(self, record):
+        return bytes([int(record['x'])]) * (self.size[0] * self.size[1] * 3)
+
+
+def _taken(path):  # x of the records of the frames of a raw stream of 1x1 frames
+    return list(path.read_bytes()[::3])
+
+
+def test_frames_are_taken_on_the_simulation_time_grid(tmp_path, monkeypatch):
+    monkeypatch.setattr(export, 'FrameRenderer', Renderer)
+    with Exporter(str(tmp_path / 'run.rgb'), fps=60, width=1, height=1) as exporter:
+        for k in range(200):  # dt = 0.005, 3.33 records per frame
+            exporter.add({'t': k * 0.005, 'x': k})
+    assert exporter.writer.count == 60
+    # first record at or after every frame time n / 60, summed frame times would drift off the grid
+    assert _taken(tmp_path / 'run.rgb') == [-(-n * 10 // 3) for n in range(60)]
+
+
+def _log(path, records=200):
+    with Recorder(path) as recorder:
+        for k in range(records):
+            recorder.record((k * 0.005, k) + (0,) * (len(RECORD.names) - 2))
+    return str(path)
+
+
+def test_export_log(tmp_path, monkeypatch):
+    monkeypatch.setattr(export, 'FrameRenderer', Renderer)
+    output = tmp_path / 'run.rgb'
+    assert export.export_log(_log(tmp_path / 'run.log'), str(output), fps=60, size=(1, 1)) == 60
+    # last record at or before every frame time
+    assert _taken(output) == [n * 10 // 3 for n in range(60)]
+
+
+class Executor:  # runs the jobs in this process
+    def __init__(self, max_workers):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def map(self, function, jobs):
+        futures = []
+        for job in jobs:
+            futures.append(Future())
+            futures[-1].set_result(function(job))
+        return (future.result() for future in futures)
+
+
+def test_export_logs(tmp_path, monkeypatch):
+    monkeypatch.setattr(export, 'FrameRenderer', Renderer)
+    monkeypatch.setattr(export, 'ProcessPoolExecutor', Executor)
+    jobs = [(_log(tmp_path / 'a.log'), str(tmp_path / 'a.rgb'), 60, (1, 1), None, True),
+            (_log(tmp_path / 'b.log', 100), str(tmp_path / 'b.rgb'), 20, (1, 1), None, True)]
+    assert export.export_logs(jobs, workers=2) == [60, 10]
+    assert _taken(tmp_path / 'b.rgb') == [10 * n for n in range(10)]
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        FrameWriter(tmp_path / 'frames', 4, 3, format='gif')
+
+
+@pytest.mark.parametrize('size', ['1280', '0x720', '1280x720x3', 'axb'])
+def test_invalid_size(monkeypatch, size):
+    monkeypatch.setattr('sys.argv', ['export', 'run.log', '--output', 'frames', '--size', size])
+    with pytest.raises(SystemExit) as exc:
+        export.main()
+    assert exc.value.code == 2
@@ -0,0 +1,57 @@
+import math
+
+import numpy as np
+import pytest
+
+from differential_drive.integrators import INTEGRATORS, get_integrator
+
+V, W, T = 50.0, 0.8, 2.0
+
+
+def _arc(x, y, theta, t):  # closed-form pose for constant v and w
+    return (x + V / W * (math.sin(theta + W * t) - math.sin(theta)),
+            y - V / W * (math.cos(theta + W * t) - math.cos(theta)),
+            theta + W * t)
+
+
+def _error(name, steps):
+    integrator = get_integrator(name)
+    x, y, theta = 10.0, 20.0, 0.3
+    dt = T / steps
+    for _ in range(steps):
+        x, y, theta = integrator(x, y, theta, V, W, dt)
+    x_ref, y_ref, _ = _arc(10.0, 20.0, 0.3, T)
+    return math.hypot(x - x_ref, y - y_ref)
+
+
+@pytest.mark.parametrize('name, order', [('euler', 1), ('rk4', 4)])
+def test_convergence_order(name, order):
+    ratio = _error(name, 40) / _error(name, 80)
+    assert ratio == pytest.approx(2 ** order, rel=0.1)
+
+
+@pytest.mark.parametrize('name', ['exact', 'rk45'])
+def test_accurate_with_one_step(name):
+    assert _error(name, 1) < 1e-5
+
+
+def test_exact_straight_line():
+    x, y, theta = get_integrator('exact')(0.0, 0.0, math.pi / 2, 10.0, 0.0, 0.5)
+    assert (x, y, theta) == pytest.approx((0, 5, math.pi / 2))
+
+
+@pytest.mark.parametrize('name', sorted(INTEGRATORS))
+def test_arrays_match_scalars(name):
+    integrator = get_integrator(name)
+    theta = np.array([0.0, 1.0, 2.5])
+    v = np.array([10.0, 30.0, -5.0])
+    w = np.array([0.0, 0.5, -2.0])
+    xs, ys, thetas = integrator(np.zeros(3), np.zeros(3), theta, v, w, 0.1)
+    for i in range(3):
+        expected = integrator(0.0, 0.0, float(theta[i]), float(v[i]), float(w[i]), 0.1)
+        assert (xs[i], ys[i], thetas[i]) == pytest.approx(expected)
+
+
+def test_unknown_integrator():
+    with pytest.raises(ValueError):
+        get_integrator('leapfrog')
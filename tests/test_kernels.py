@@ -0,0 +1,67 @@
+import math
+
+import numpy as np
+import pytest
+
+from differential_drive import kernels
+from differential_drive.batch import RobotBatch
+from differential_drive.robot import FollowTrajectoryRobot, GoToGoalRobot, ManualRobot, Target
+
+FIELDS = ('x', 'y', 'theta', 'vr', 'vl', 'v_velocity', 'w_velocity')
+
+
+def _assert_same(expected, actual, fields):
+    for name in fields:
+        assert getattr(actual, name) == getattr(expected, name), name
+
+
+@pytest.fixture(params=[True, False], ids=['kernel', 'step-loop'])
+def kernel(request, monkeypatch):  # advance() through the kernels (compiled or not) and through its step() fallback
+    monkeypatch.setattr(kernels, 'HAVE_NUMBA', request.param)
+
+
+def test_go_to_goal_kernel_matches_step(kernel):
+    stepped = GoToGoalRobot(200, 600, 2 * math.pi, 800, 200)
+    advanced = GoToGoalRobot(200, 600, 2 * math.pi, 800, 200)
+    for _ in range(2000):
+        stepped.step()
+    kernels.advance(advanced, 2000)
+    _assert_same(stepped, advanced, FIELDS)
+
+
+def test_follow_trajectory_kernel_matches_step(kernel):
+    stepped = FollowTrajectoryRobot(300, 700, math.pi, 150)
+    advanced = FollowTrajectoryRobot(300, 700, math.pi, 150)
+    target = Target()
+    for k in range(2000):
+        target.move(k * 0.01)
+        stepped.step((target.x, target.y))
+    kernels.advance(advanced, 2000)
+    _assert_same(stepped, advanced, FIELDS + ('follow_dist', 'e_distance_sum', 'e_distance_prev', 'x_target',
+                                              'y_target'))
+
+
+def test_icc_kernel_matches_step(kernel):
+    stepped = ManualRobot(200, 600, 0.7)
+    advanced = ManualRobot(200, 600, 0.7)
+    for robot in (stepped, advanced):
+        robot.vl = 20
+        robot.vr = 25
+    for _ in range(2000):
+        stepped.step()
+    kernels.advance(advanced, 2000)
+    _assert_same(stepped, advanced, FIELDS)
+
+
+def test_batch_kernel_clamps_the_error_sum_and_writes_back_velocities():
+    rng = np.random.default_rng(0)
+    x, y, theta = rng.uniform(0, 1400, 20), rng.uniform(0, 750, 20), rng.uniform(0, 6, 20)
+    stepped = RobotBatch(x, y, theta, dt=0.01, distance_star=150, sum_limit=5)
+    advanced = RobotBatch(x, y, theta, dt=0.01, distance_star=150, sum_limit=5)
+    for k in range(2000):
+        stepped.step_follow_trajectory(*Target.position(k * 0.01))
+    kernels.advance_batch(advanced, 'follow_trajectory', 2000)
+
+    assert np.all(np.abs(advanced.e_distance_sum) <= 5)
+    for name in FIELDS + ('follow_dist', 'e_distance_sum', 'e_distance_prev'):
+        np.testing.assert_allclose(getattr(advanced, name), getattr(stepped, name), rtol=1e-9, atol=1e-9)
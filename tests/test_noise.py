@@ -0,0 +1,19 @@
+import numpy as np
+
+from differential_drive.noise import Streams
+
+
+def test_streams_match_numpy_philox():
+    seeds = [0, 1, 12345, (1 << 64) + 7, (1 << 128) - 1]
+    streams = Streams(seeds)
+    blocks = np.stack([streams.raw(block) for block in range(5)])  # (block, word, robot)
+    for i, seed in enumerate(seeds):
+        expected = np.random.Philox(key=seed).random_raw(20)
+        np.testing.assert_array_equal(blocks[:, :, i].ravel(), expected)
+
+
+def test_samples_do_not_depend_on_the_batch():
+    alone = Streams([42])
+    batch = Streams([7, 42, 9])
+    for block in range(3):
+        np.testing.assert_array_equal(batch.normal(block)[:, 1], alone.normal(block)[:, 0])
@@ -0,0 +1,65 @@
+import math
+
+import numpy as np
+import pytest
+
+from differential_drive.occupancy import OccupancyGrid, RangeSensor
+
+STEP = 0.01
+
+
+def _march(grid, x, y, angle, max_range):  # distance to the first occupied cell by small steps along the ray
+    t = np.arange(0, max_range, STEP)
+    hit = np.nonzero(grid.occupied(x + t * math.cos(angle), y + t * math.sin(angle)))[0]
+    return t[hit[0]] if len(hit) else max_range
+
+
+@pytest.fixture
+def grid():
+    grid = OccupancyGrid.empty(400, 300, resolution=10)
+    rng = np.random.default_rng(5)
+    grid.grid[rng.random(grid.grid.shape) < 0.05] = True
+    grid.fill_rect(150, 100, 60, 40)
+    grid.grid[14, 14] = False  # the ray origin is free
+    return grid
+
+
+def test_raycast_matches_fine_march(grid):
+    angles = np.linspace(0, 2 * math.pi, 73)
+    distances = grid.raycast(143.3, 146.1, angles, 250)
+    for angle, distance in zip(angles, distances):
+        assert distance == pytest.approx(_march(grid, 143.3, 146.1, angle, 250), abs=2 * STEP)
+
+
+def test_axis_aligned_rays_and_range():
+    grid = OccupancyGrid.empty(100, 100, resolution=10)
+    grid.fill_rect(60, 0, 9, 100)
+    distances = grid.raycast(25, 25, [0, math.pi, math.pi / 2], 40)
+    np.testing.assert_allclose(distances, [35, 25, 40])
+
+
+def test_scan_of_several_robots(grid):
+    sensor = RangeSensor(beams=8, max_range=100)
+    x = np.array([145.0, 45.0])
+    y = np.array([145.0, 45.0])
+    theta = np.array([0.3, -1.0])
+    grid.grid[4, 4] = False
+    scan = sensor.scan(grid, x, y, theta)
+    assert scan.shape == (2, 8)
+    for i in range(2):
+        np.testing.assert_array_equal(scan[i], grid.raycast(x[i], y[i], theta[i] + sensor.angles, 100))
+
+
+@pytest.mark.parametrize('x, y, width, height', [(-50, 20, 30, 30), (20, -50, 30, 30), (-80, -80, 40, 40),
+                                                 (100, 20, 30, 30), (20, 100, 30, 30)])
+def test_off_map_rectangles_are_ignored(x, y, width, height):
+    grid = OccupancyGrid.empty(100, 100, resolution=10)
+    grid.fill_rect(x, y, width, height)
+    assert not grid.grid.any()
+
+
+def test_rectangles_are_clipped_to_the_map():
+    grid = OccupancyGrid.empty(100, 100, resolution=10)
+    grid.fill_rect(-15, 85, 30, 40)
+    assert grid.grid.sum() == 2 * 2
+    assert grid.grid[8:, :2].all()
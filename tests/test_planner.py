@@ -0,0 +1,44 @@
+import math
+
+import pytest
+
+from differential_drive.occupancy import OccupancyGrid
+from differential_drive.planner import Planner
+
+
+def _length(waypoints):
+    return sum(math.dist(a, b) for a, b in zip(waypoints, waypoints[1:]))
+
+
+@pytest.fixture
+def planner():
+    grid = OccupancyGrid.empty(400, 300, resolution=10)
+    grid.fill_rect(100, 0, 20, 220)
+    grid.fill_rect(200, 80, 20, 220)
+    grid.fill_rect(280, 40, 80, 20)
+    return Planner(grid)
+
+
+@pytest.mark.parametrize('start, goal', [((15, 15), (385, 285)), ((385, 15), (15, 285)), ((55, 255), (305, 25))])
+def test_jps_cost_equals_a_star_cost(planner, start, goal):
+    a_star = planner.path(start, goal)
+    jps = planner.path(start, goal, jps=True)
+    assert a_star is not None and jps is not None
+    assert _length(jps) == pytest.approx(_length(a_star))
+
+
+def test_unreachable_goal(planner):
+    planner.grid.fill_rect(0, 220, 400, 10)
+    planner.invalidate()
+    assert planner.path((15, 15), (385, 285)) is None
+    assert planner.path((15, 15), (385, 285), jps=True) is None
+
+
+def test_fields_of_goal_points_in_one_cell_steer_to_their_own_point(planner):
+    first = planner.field((372, 272))
+    second = planner.field((377, 278))
+    assert first is not second
+    assert planner.field((372, 272)) is first
+    for field, goal in ((first, (372, 272)), (second, (377, 278))):
+        x, y = field.next_waypoint(365, 265)
+        assert (float(x), float(y)) == goal
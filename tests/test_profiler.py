@@ -0,0 +1,74 @@
+import json
+
+import numpy as np
+import pytest
+
+from differential_drive.profiler import Profiler, RollingHistogram, instrument, save, timed
+from differential_drive.robot import GoToGoalRobot
+
+
+def test_rolling_histogram_keeps_the_last_window():
+    histogram = RollingHistogram(window=4)
+    for duration in (1, 2, 3, 4, 5, 6):
+        histogram.add(duration * 1e-3)
+    np.testing.assert_allclose(sorted(histogram.values()), [3e-3, 4e-3, 5e-3, 6e-3])
+    summary = histogram.summary()
+    assert summary['count'] == 6
+    assert summary['total'] == pytest.approx(21e-3)
+    assert summary['max'] == 6e-3
+    assert sum(summary['histogram']) == 4
+    assert RollingHistogram().summary() == {'count': 0}
+
+
+def test_wrap_times_every_call_and_keeps_results():
+    profiler = Profiler()
+    double = profiler.wrap('double', lambda value: 2 * value)
+    assert [double(i) for i in range(5)] == [0, 2, 4, 6, 8]
+    assert profiler.summary()['double']['count'] == 5
+
+
+def test_instrument_slotted_robot():
+    profiler = Profiler()
+    robot = GoToGoalRobot(200, 600, 0, 800, 200)
+    reference = GoToGoalRobot(200, 600, 0, 800, 200)
+    instrument(profiler, robot, 'controller', 'linear_velocity', 'angular_velocity', 'missing')
+    for _ in range(10):
+        robot.step()
+        reference.step()
+    assert (robot.x, robot.y, robot.theta) == (reference.x, reference.y, reference.theta)
+    assert profiler.summary()['controller.linear_velocity']['count'] >= 10
+    assert 'controller.missing' not in profiler.summary()
+    assert type(reference).__name__ == type(robot).__name__
+
+
+def test_disabled_profiler_returns_the_original_function():
+    def fn():
+        return 1
+    assert timed(None, 'fn', fn) is fn
+    save(None, 'unused.json', 'unused.trace')
+
+
+def test_save_json_and_trace(tmp_path):
+    profiler = Profiler(trace=True, trace_size=3)
+    fn = profiler.wrap('step', lambda: None)
+    for _ in range(5):
+        fn()
+    save(profiler, tmp_path / 'profile.json', tmp_path / 'trace.json')
+
+    summary = json.loads((tmp_path / 'profile.json').read_text())
+    assert summary['phases']['step']['count'] == 5
+    events = json.loads((tmp_path / 'trace.json').read_text())['traceEvents']
+    assert len(events) == 3
+    assert all(event['name'] == 'step' and event['ph'] == 'X' and event['dur'] >= 0 for event in events)
+
+
+def test_overlay_is_refreshed_every_n_frames():
+    profiler = Profiler(overlay_refresh=3)
+    fn = profiler.wrap('step', lambda: None)
+    fn()
+    first = profiler.overlay()
+    assert len(first) == 1 and first[0].startswith('step')
+    profiler.wrap('other', lambda: None)()
+    assert profiler.overlay() is first
+    profiler.overlay()
+    assert len(profiler.overlay()) == 2
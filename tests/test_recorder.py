@@ -0,0 +1,53 @@
+import math
+
+import numpy as np
+import pytest
+
+from differential_drive.recorder import RECORD, Recorder, Replay
+from differential_drive.robot import GoToGoalRobot
+
+
+def test_round_trip_across_buffer_flushes(tmp_path):
+    path = tmp_path / 'run.log'
+    robot = GoToGoalRobot(200, 600, 2 * math.pi, 800, 200)
+    expected = []
+    with Recorder(path, buffer_size=7) as recorder:
+        for k in range(100):
+            robot.step()
+            recorder.record_robot(k * 0.005, robot)
+            expected.append((robot.x, robot.y, robot.theta, robot.vl, robot.vr))
+    assert len(recorder) == 100
+
+    replay = Replay(path)
+    assert len(replay) == 100
+    actual = np.column_stack([replay.column(name) for name in ('x', 'y', 'theta', 'vl', 'vr')])
+    np.testing.assert_array_equal(actual, expected)
+    np.testing.assert_array_equal(replay.column('target_x'), 800)
+
+
+def test_time_lookup_and_window(tmp_path):
+    path = tmp_path / 'run.log'
+    with Recorder(path) as recorder:
+        for k in range(10):
+            recorder.record((k,) + (0,) * (len(RECORD.names) - 1))
+    replay = Replay(path)
+    assert replay.at(4.5)['t'] == 4
+    assert replay.at(-1)['t'] == 0
+    np.testing.assert_array_equal(replay.between(2, 5)['t'], [2, 3, 4, 5])
+    assert len(replay.between(20, 30)) == 0
+
+
+def test_a_partly_written_record_is_ignored(tmp_path):
+    path = tmp_path / 'run.log'
+    with Recorder(path) as recorder:
+        recorder.record(tuple(range(len(RECORD.names))))
+    with open(path, 'ab') as file:
+        file.write(b'\0' * 10)
+    assert len(Replay(path)) == 1
+
+
+def test_not_a_log(tmp_path):
+    path = tmp_path / 'other.bin'
+    path.write_bytes(b'\0' * 64)
+    with pytest.raises(ValueError):
+        Replay(path)
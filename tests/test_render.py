@@ -0,0 +1,123 @@
+import math
+import os
+
+import pytest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+pygame = pytest.importorskip('pygame')
+
+from differential_drive.render import Environment, Hud, SpriteAtlas, Sprite, Trail  # noqa: E402
+from differential_drive.robot import FollowTrajectoryRobot, Target  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROBOT_IMG = os.path.join(ROOT, 'Go_to_Goal_Simulation', 'images', 'differential_drive_robot.png')
+TARGET_IMG = os.path.join(ROOT, 'Follow_Trajectory_Simulation', 'images', 'target.png')
+
+
+@pytest.fixture(autouse=True)
+def display():
+    pygame.init()
+    yield
+    pygame.quit()
+
+
+def _same(a, b):
+    return a.get_size() == b.get_size() and pygame.image.tobytes(a, 'RGBA') == pygame.image.tobytes(b, 'RGBA')
+
+
+@pytest.mark.parametrize('degrees', [0, 1, 45, 90, 137, 270, 359, -30, 725])
+def test_atlas_frame_matches_rotating_the_source(degrees):
+    img = pygame.image.load(ROBOT_IMG)
+    atlas = SpriteAtlas(img)
+    assert _same(atlas.frame(degrees), pygame.transform.rotozoom(img, degrees % 360, 1))
+
+
+def test_quantized_and_lazy_atlases():
+    img = pygame.image.load(ROBOT_IMG)
+    atlas = SpriteAtlas(img, resolution=5, lazy=True, cache_size=2)
+    assert atlas.size == 72 and not atlas.frames
+    assert _same(atlas.frame(12), pygame.transform.rotozoom(img, 10, 1))
+    atlas.frame(20)
+    atlas.frame(30)
+    assert list(atlas.frames) == [4, 6]
+
+
+def test_target_sprite_has_one_frame():
+    sprite = Sprite(TARGET_IMG, resolution=360)
+    assert sprite.atlas.size == 1 and len(sprite.atlas.frames) == 1
+    sprite.update(300, 200)
+    assert sprite.rect.center == (300, 200)
+    assert _same(sprite.rotated, pygame.transform.rotozoom(pygame.image.load(TARGET_IMG), 0, 1))
+
+
+def test_flipped_sprite_uses_the_mirrored_heading():
+    sprite = Sprite(ROBOT_IMG, flip=True)
+    sprite.update(100, 100, math.radians(30))
+    assert sprite.rotated is sprite.atlas.frame(-30)
+
+
+class CountingFont:  # font that counts the rendered strings
+    def __init__(self):
+        self.font = pygame.font.Font(None, 20)
+        self.rendered = []
+
+    def render(self, txt, *args):
+        self.rendered.append(txt)
+        return self.font.render(txt, *args)
+
+
+def test_unchanged_hud_renders_no_text():
+    font = CountingFont()
+    hud = Hud(font, (255, 255, 255), (0, 0, 0))
+    info = [('Vl = 1', (100, 50)), ('Vr = 2', (100, 100)), ('theta = 3', (100, 150))]
+    hud.update(info)
+    assert len(font.rendered) == 3 and len(hud.dirty) == 3
+    hud.update(info)
+    assert len(font.rendered) == 3 and hud.dirty == []
+
+
+def test_changed_value_invalidates_only_its_line():
+    font = CountingFont()
+    hud = Hud(font, (255, 255, 255), (0, 0, 0))
+    hud.update([('Vl = 1', (100, 50)), ('Vr = 2', (100, 100))])
+    old_rect = hud.fields[(100, 100)][2]
+    hud.update([('Vl = 1', (100, 50)), ('Vr = 2.5', (100, 100))])
+    assert font.rendered[2:] == ['Vr = 2.5']
+    assert hud.dirty == [old_rect, hud.fields[(100, 100)][2]]
+    assert hud.fields[(100, 50)][0] == 'Vl = 1'
+
+    # a value shown before comes from the surface cache
+    hud.update([('Vl = 1', (100, 50)), ('Vr = 2', (100, 100))])
+    assert len(font.rendered) == 3
+
+
+def _frames(dirty, steps=200):  # frames of the follow-trajectory loop drawn offscreen
+    environment = Environment(1400, 750, dirty=dirty, offscreen=True)
+    trail_target = Trail(1400, 750, environment.red, 60)
+    trail_robot = Trail(1400, 750, environment.green, 60)
+    robot_sprite = Sprite(ROBOT_IMG, flip=True)
+    target_sprite = Sprite(TARGET_IMG, resolution=360)
+    robot = FollowTrajectoryRobot(300, 700, math.pi, 150, 0.01)
+    target = Target()
+
+    for k in range(steps):
+        for i in range(5):
+            target.move((5 * k + i) * 0.01)
+            robot.step((target.x, target.y))
+        environment.clear()
+        target_sprite.update(target.x, target.y)
+        environment.draw(target_sprite)
+        environment.trail(target.x, target.y, trail_target)
+        robot_sprite.update(robot.x, robot.y, robot.theta)
+        environment.draw(robot_sprite)
+        environment.trail(robot.x, robot.y, trail_robot)
+        environment.write_info([(f"Vl = {round(robot.vl, 2)}", (1200, 600)), (f"Vr = {round(robot.vr, 2)}", (1200, 650)),
+                                (f"k = {k // 10}", (200, 700))])
+        yield pygame.image.tobytes(environment.map, 'RGB')
+        environment.update_display()
+
+
+def test_dirty_rectangles_match_full_redraws():
+    # 200 frames with trails of 60 points: the trail buffers wrap three times
+    for k, (full, dirty) in enumerate(zip(_frames(False), _frames(True))):
+        assert full == dirty, f"frame {k}"
@@ -0,0 +1,96 @@
+import json
+from concurrent.futures import Future
+
+import pytest
+
+from differential_drive import scenario
+
+GO_TO_GOAL = {'mode': 'go_to_goal', 'termination': {'max_steps': 200}}
+
+
+class Executor:  # runs the jobs in this process
+    def __init__(self, max_workers):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, function, job):
+        future = Future()
+        try:
+            future.set_result(function(job))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+
+
+@pytest.fixture
+def runs(monkeypatch):
+    runs = []
+    run = scenario.run
+
+    def counted(resolved):
+        runs.append(resolved['name'])
+        return run(resolved)
+
+    monkeypatch.setattr(scenario, 'ProcessPoolExecutor', Executor)
+    monkeypatch.setattr(scenario, 'run', counted)
+    return runs
+
+
+def _write(directory, name, data):
+    path = directory / name
+    path.write_text(json.dumps(data))
+    return str(path)
+
+
+def test_cache_miss_then_hit(tmp_path, runs):
+    path = _write(tmp_path, 'a.json', GO_TO_GOAL)
+    cache = str(tmp_path / 'cache')
+    first, = scenario.run_all([path], cache)
+    second, = scenario.run_all([path], cache)
+    assert runs == ['a']
+    assert not first['cached'] and second['cached']
+    assert {key: value for key, value in second.items() if key != 'cached'} == \
+           {key: value for key, value in first.items() if key != 'cached'}
+
+    scenario.run_all([path], cache, rerun=True)
+    _write(tmp_path, 'a.json', dict(GO_TO_GOAL, dt=0.01))
+    changed, = scenario.run_all([path], cache)
+    assert runs == ['a', 'a', 'a']
+    assert not changed['cached']
+
+
+def test_identical_scenarios_run_once_and_keep_their_names(tmp_path, runs):
+    paths = [_write(tmp_path, name, GO_TO_GOAL) for name in ('a.json', 'b.json')]
+    cache = str(tmp_path / 'cache')
+    for results in (scenario.run_all(paths, cache), scenario.run_all(paths, cache)):
+        assert [result['name'] for result in results] == ['a', 'b']
+        assert [result['file'] for result in results] == paths
+        assert results[0]['steps'] == results[1]['steps']
+    assert len(runs) == 1
+
+
+def test_a_failing_scenario_keeps_the_other_results(tmp_path, runs):
+    good = _write(tmp_path, 'a.json', GO_TO_GOAL)
+    bad = _write(tmp_path, 'b.json', dict(GO_TO_GOAL, controller={'unknown_gain': 1}))
+    cache = tmp_path / 'cache'
+    first, second = scenario.run_all([good, bad], str(cache))
+    assert first['name'] == 'a' and 'error' not in first and first['steps'] > 0
+    assert second['name'] == 'b' and second['file'] == bad and 'unknown_gain' in second['error']
+    assert len(list(cache.iterdir())) == 1
+
+
+def test_the_simulator_sources_are_hashed_by_default(tmp_path):
+    resolved = scenario.load(_write(tmp_path, 'a.json', GO_TO_GOAL))
+    assert scenario.content_hash(resolved) != scenario.content_hash(resolved, code=False)
+    assert scenario.content_hash(dict(resolved, name='b')) == scenario.content_hash(resolved)
+
+
+def test_go_to_goal_reaches_the_goal(tmp_path):
+    result = scenario.run(scenario.load(_write(tmp_path, 'a.json', {'termination': {'max_steps': 20000}})))
+    assert result['status'] == 'goal'
+    assert result['final_error'] < 1
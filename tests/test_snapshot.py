@@ -0,0 +1,63 @@
+import math
+
+import numpy as np
+
+from differential_drive import snapshot
+from differential_drive.batch import RobotBatch
+from differential_drive.clock import SimulationClock
+from differential_drive.estimator import EKF
+from differential_drive.noise import NoiseModel
+from differential_drive.robot import FollowTrajectoryRobot, Target
+from differential_drive.trail import TrailBuffer
+
+N = 50
+
+
+def _make():
+    x = np.linspace(0, 1000, N)
+    noise = NoiseModel(np.arange(N), 10, 0.03, 0.02, position_sigma=5, theta_sigma=0.03)
+    batch = RobotBatch(x, 700, math.pi, dt=0.01, distance_star=150, noise=noise,
+                       estimator=EKF(x, 700, math.pi, 10, 5, 0.03), feedback='estimate')
+    return batch, SimulationClock(0.01, 'max'), TrailBuffer(100)
+
+
+def _run(batch, clock, trail, steps):
+    for _ in range(steps):
+        batch.step_follow_trajectory(*Target.position(clock.tick()))
+        trail.append(batch.x[0], batch.y[0])
+
+
+def test_resume_matches_straight_run():
+    batch, clock, trail = _make()
+    _run(batch, clock, trail, 200)
+    blob = snapshot.capture(batch=batch, clock=clock, trail=trail)
+    _run(batch, clock, trail, 200)
+
+    resumed, resumed_clock, resumed_trail = _make()
+    snapshot.restore(blob, batch=resumed, clock=resumed_clock, trail=resumed_trail)
+    _run(resumed, resumed_clock, resumed_trail, 200)
+
+    for name in ('x', 'y', 'theta', 'vr', 'vl', 'e_distance_sum'):
+        np.testing.assert_array_equal(getattr(resumed, name), getattr(batch, name))
+    np.testing.assert_array_equal(resumed.estimator.P, batch.estimator.P)
+    np.testing.assert_array_equal(resumed_trail.points(), trail.points())
+
+
+def test_rng_state_is_restored():
+    rng = np.random.default_rng(1)
+    rng.normal(size=10)
+    blob = snapshot.capture(rng=rng)
+    expected = rng.normal(size=3)
+
+    restored = np.random.default_rng(99)
+    snapshot.restore(blob, rng=restored)
+    np.testing.assert_array_equal(restored.normal(size=3), expected)
+
+
+def test_fork_without_variations_is_labelled(tmp_path, monkeypatch, capsys):
+    robot = FollowTrajectoryRobot(300, 700, math.pi, 150, 0.01)
+    path = str(tmp_path / 'warm.snap')
+    snapshot.save(path, snapshot.capture(robot=robot))
+    monkeypatch.setattr('sys.argv', ['snapshot', path, '--steps', '10'])
+    snapshot.main()
+    assert capsys.readouterr().out.startswith('snapshot: x = ')
@@ -0,0 +1,79 @@
+import csv
+import math
+from concurrent.futures import Future
+
+import pytest
+
+from differential_drive import sweep
+
+
+def test_grid_and_sample():
+    runs = sweep.grid(Kp_v=[0.1, 0.5], Kp_w=[1, 2, 3])
+    assert len(runs) == 6
+    assert runs[0] == {'Kp_v': 0.1, 'Kp_w': 1}
+    samples = sweep.sample(50, 0, Kp_v=(0.1, 2))
+    assert len(samples) == 50
+    assert all(0.1 <= run['Kp_v'] < 2 for run in samples)
+    assert sweep.sample(5, 7, Kp_v=(0, 1)) == sweep.sample(5, 7, Kp_v=(0, 1))
+
+
+def test_go_to_goal_metrics():
+    row, = sweep.evaluate([{}], 'go_to_goal', steps=4000)
+    straight = math.dist((200, 600), (800, 200))
+    assert row['final_error'] < 1
+    assert 0 < row['settling_time'] < 4000 * 0.005
+    assert row['path_length'] >= straight - 1
+    assert 0 < row['rms_error'] < straight
+    assert row['overshoot'] >= 0
+
+
+def test_metrics_match_single_runs():
+    runs = sweep.grid(Kp_v=[0.2, 0.5, 1], Kd_v=[0, 0.1])
+    batched = sweep.evaluate(runs, steps=2000)
+    for run, row in zip(runs, batched):
+        single, = sweep.evaluate([run], steps=2000)
+        for name in sweep.METRICS:
+            assert row[name] == pytest.approx(single[name], nan_ok=True)
+
+
+def test_a_run_that_never_settles():
+    row, = sweep.evaluate([{}], 'go_to_goal', steps=10)
+    assert math.isnan(row['settling_time'])
+
+
+def test_small_sweeps_use_every_worker(tmp_path, monkeypatch):
+    chunks = []
+
+    class Executor:  # runs the chunks in this process and records them
+        def __init__(self, max_workers):
+            self.max_workers = max_workers
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def submit(self, function, chunk):
+            chunks.append(chunk)
+            future = Future()
+            future.set_result(function(chunk))
+            return future
+
+    monkeypatch.setattr(sweep, 'ProcessPoolExecutor', Executor)
+    runs = sweep.grid(Kp_v=[0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7])
+    output = tmp_path / 'sweep.csv'
+    assert sweep.run_sweep(runs, output, steps=10, workers=4) == 7
+
+    assert [len(chunk[1]) for chunk in chunks] == [2, 2, 2, 1]
+    with open(output, newline='') as file:
+        rows = sorted(csv.DictReader(file), key=lambda row: int(row['run']))
+    assert [float(row['Kp_v']) for row in rows] == [run['Kp_v'] for run in runs]
+
+
+def test_seed_is_rejected_as_a_swept_parameter(monkeypatch, tmp_path):
+    monkeypatch.setattr('sys.argv', ['sweep', '--grid', 'seed=1,2', '--rollouts', '2',
+                                     '--output', str(tmp_path / 'sweep.csv')])
+    with pytest.raises(SystemExit) as exc:
+        sweep.main()
+    assert exc.value.code == 2
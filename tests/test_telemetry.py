@@ -0,0 +1,74 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from differential_drive.recorder import RECORD
+from differential_drive.robot import GoToGoalRobot
+from differential_drive.telemetry import Subscriber, TelemetryServer, address, subscribe
+
+FIELDS = len(RECORD.names)
+
+
+def _record(t):
+    return (float(t),) + (0.0,) * (FIELDS - 1)
+
+
+def test_address():
+    assert address('8765') == {'host': '127.0.0.1', 'port': 8765}
+    assert address('0.0.0.0:9000') == {'host': '0.0.0.0', 'port': 9000}
+    assert address('/tmp/sim.sock') == {'path': '/tmp/sim.sock'}
+
+
+def test_pending_records_drop_oldest():
+    server = TelemetryServer(queue_size=4)
+    for t in range(10):
+        server.publish_record(_record(t))
+    assert server.published == 10
+    assert server.dropped == 6
+    received = np.frombuffer(b''.join(server.pending), dtype=RECORD)
+    np.testing.assert_array_equal(received['t'], [6, 7, 8, 9])
+
+
+def test_publish_is_decimated():
+    server = TelemetryServer(every=5)
+    robot = GoToGoalRobot(200, 600, 0, 800, 200)
+    for k in range(23):
+        server.publish(k * 0.005, robot)
+    assert server.published == 4
+
+
+def test_subscriber_queue_drops_oldest():
+    async def fill():
+        subscriber = Subscriber(writer=None, queue_size=3)
+        subscriber.put([b'a', b'b'])
+        subscriber.put([b'c', b'd', b'e'])
+        return subscriber
+
+    subscriber = asyncio.run(fill())
+    assert list(subscriber.queue) == [b'c', b'd', b'e']
+    assert subscriber.dropped == 2
+
+
+def test_stream_round_trip():
+    received = []
+
+    async def listen(port):
+        async for records in subscribe(port=port):
+            received.extend(records['t'].tolist())
+
+    with TelemetryServer(port=0, flush_interval=0.001) as server:
+        thread = threading.Thread(target=lambda: asyncio.run(listen(server.port)))
+        thread.start()
+        assert server.wait(1, timeout=5)
+        for t in range(100):
+            server.publish_record(_record(t))
+    thread.join(timeout=5)
+    assert received == list(range(100))
+
+
+def test_start_raises_bind_errors():
+    with TelemetryServer(port=0) as server:
+        with pytest.raises(OSError):
+            TelemetryServer(port=server.port).start()
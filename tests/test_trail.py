@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from differential_drive.trail import TrailBuffer
+
+
+def test_points_are_oldest_first_after_wraparound():
+    trail = TrailBuffer(4)
+    wraps = [trail.append(i, -i) for i in range(10)]
+    assert wraps == [False, False, False, True, False, False, False, True, False, False]
+    assert len(trail) == 4
+    np.testing.assert_array_equal(trail.points(), [[6, -6], [7, -7], [8, -8], [9, -9]])
+    np.testing.assert_array_equal(trail.last(), [9, -9])
+
+
+def test_partially_filled_and_cleared():
+    trail = TrailBuffer(4)
+    assert trail.last() is None
+    trail.append(1, 2)
+    trail.append(3, 4)
+    np.testing.assert_array_equal(trail.points(), [[1, 2], [3, 4]])
+    trail.clear()
+    assert len(trail) == 0
+    assert len(trail.points()) == 0
+
+
+def test_capacity_of_at_least_two_points():
+    with pytest.raises(ValueError):
+        TrailBuffer(1)
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from differential_drive.robot import TrackingRobot
+from differential_drive.trajectory import TRACKERS, Trajectory
+
+
+@pytest.fixture
+def wave():
+    s = np.linspace(0, 1500, 5000)
+    return Trajectory(300 + s, 300 + 100 * np.sin(s / 200))
+
+
+def test_arc_length_index():
+    trajectory = Trajectory([0, 3, 3], [0, 4, 10])
+    np.testing.assert_array_equal(trajectory.s, [0, 5, 11])
+    assert trajectory.length == 11
+    assert trajectory.index_at(5) == 1
+    assert trajectory.index_at(7) == 2
+    assert trajectory.index_at(100) == 2
+    resampled = trajectory.resample(1)
+    assert len(resampled) == 12
+    assert resampled.length == pytest.approx(11)
+
+
+@pytest.mark.parametrize('name', sorted(TRACKERS))
+def test_tracking_error_stays_small(wave, name):
+    x, y = wave.x[0] + 20, wave.y[0] - 20
+    robot = TrackingRobot(x, y, wave.heading[0], TRACKERS[name](wave, speed=50))
+    errors = []
+    for _ in range(1000):
+        robot.step()
+        errors.append(abs(robot.cross_track()))
+    assert errors[0] > 20
+    assert max(errors[300:]) < 5
+    assert robot.tracker.index > len(wave) // 4
+
+
+def test_windowed_index_matches_global_search(wave):
+    tracker = TRACKERS['stanley'](wave, window=64)
+    for i in range(0, len(wave), 97):
+        x, y = wave.x[i] + 3, wave.y[i] - 2
+        assert tracker.update_index(x, y) == wave.nearest(x, y)
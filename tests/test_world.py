@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from differential_drive.batch import RobotBatch
+from differential_drive.world import SpatialHash, World
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(3)
+    return rng.uniform(-200, 1400, 400), rng.uniform(-100, 800, 400)
+
+
+def _brute_pairs(x, y, radius):
+    d = np.hypot(x[:, None] - x[None, :], y[:, None] - y[None, :])
+    i, j = np.nonzero(np.triu(d <= radius, k=1))
+    return set(zip(i.tolist(), j.tolist()))
+
+
+@pytest.mark.parametrize('cell_size, radius', [(40, 40), (25, 60), (100, 30)])
+def test_pairs_match_brute_force(points, cell_size, radius):
+    x, y = points
+    grid = SpatialHash(cell_size)
+    grid.build(x, y)
+    i, j = grid.pairs(radius)
+    found = list(zip(i.tolist(), j.tolist()))
+    assert len(found) == len(set(found))
+    assert set(found) == _brute_pairs(x, y, radius)
+
+
+def test_neighbors_match_brute_force(points):
+    x, y = points
+    grid = SpatialHash(50)
+    grid.build(x, y)
+    for k in range(0, 400, 37):
+        expected = np.nonzero(np.hypot(x - x[k], y - y[k]) <= 80)[0]
+        np.testing.assert_array_equal(grid.neighbors(x[k], y[k], 80), expected)
+
+
+def test_world_collisions(points):
+    x, y = points
+    robots = RobotBatch(x, y, np.zeros(len(x)))
+    obstacles = [(600, 300, 50), (100, 700, 20)]
+    world = World(robots, obstacles, robot_radius=10)
+    world.update()
+
+    expected = _brute_pairs(x, y, 20)
+    assert set(zip(*(part.tolist() for part in world.robot_collisions))) == expected
+
+    hit = set()
+    for k, (ox, oy, radius) in enumerate(obstacles):
+        hit |= {(i, k) for i in np.nonzero(np.hypot(x - ox, y - oy) <= 10 + radius)[0].tolist()}
+    assert set(zip(*(part.tolist() for part in world.obstacle_collisions))) == hit
+
+    mask = np.zeros(len(x), dtype=bool)
+    for i, j in expected:
+        mask[[i, j]] = True
+    mask[[i for i, _ in hit]] = True
+    np.testing.assert_array_equal(world.colliding(), mask)
+
+    neighbors = world.neighbors(5, 100)
+    assert 5 not in neighbors
+    np.testing.assert_array_equal(neighbors, np.setdiff1d(np.nonzero(np.hypot(x - x[5], y - y[5]) <= 100)[0], [5]))